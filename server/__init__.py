@@ -1,25 +1,45 @@
+import threading
+
 from flask import Flask
 from flask_cors import CORS
 
 from .benchmark.sr.constants import BM_DATA_DIR, BM_RES_DIR
 
-from .config.constants import TEMP_DIR
-from .config.env_config import UI_URL
+from .config.chat_config import get_chat_base
+from .config.env_config import MODEL_WARMUP, UI_URL
 from .endpoints.chat import chat_bp
+from .endpoints.metrics import metrics_bp
 from .endpoints.parcel_finder import parcel_finder_bp
+from .utils.model_registry import warm_up_models
 from .utils.parcel_finder_utils import reset_dir
+from .utils.workspace_utils import cleanup_expired_workspaces
 
 def create_app():
     app = Flask(__name__)
     CORS(app, resources={r"/*": {"origins": UI_URL}})
     
-    # Reset temp and benchmark dirs
-    reset_dir(TEMP_DIR)
+    # Clean expired request workspaces (other workers may be serving requests) and reset benchmark dirs
+    cleanup_expired_workspaces()
     reset_dir(BM_DATA_DIR)
     reset_dir(BM_RES_DIR)
 
+    # Load SR models and the Gemini chat in the background so startup isn't blocked
+    if MODEL_WARMUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
     # Register Blueprints
     app.register_blueprint(chat_bp)
     app.register_blueprint(parcel_finder_bp)
+    app.register_blueprint(metrics_bp)
     
-    return app
\ No newline at end of file
+    return app
+
+def warm_up():
+    """
+    Loads the lazily initialised resources (SR models, Gemini chat) ahead of the first request.
+    """
+    warm_up_models()
+    try:
+        get_chat_base()
+    except Exception as e:
+        print(f"⚠️ Could not set up the chat: {e}")
@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+PERF_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = PERF_DIR / "fixtures"  # recorded SIGPAC, cubo, MinIO and Gemini responses (see `stand_ins.py`)
+PERF_RES_DIR = PERF_DIR / "res"
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Synthetic stand-ins, for runs without recorded fixtures
+SYNTHETIC_LLM_LATENCY = 1.0  # s per Gemini call
+SYNTHETIC_LLM_TEXT = "Synthetic response used for performance benchmarking."
+SYNTHETIC_CUBE_DATES = 3  # acquisitions per synthetic cube
+
+DEFAULT_CHAT_INPUTS = [
+    "What crops are suitable for this parcel?",
+    "Which eco-schemes could apply to it?",
+    "How much water would an olive grove need here?",
+]
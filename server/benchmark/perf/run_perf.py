@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .constants import DEFAULT_CHAT_INPUTS, FIXTURES_DIR, PERCENTILES, PERF_RES_DIR
+from .stand_ins import FixtureStore, use_stand_ins
+from ...utils.metrics_utils import add_span_listener, remove_span_listener
+
+def run_perf(scenario: str = "parcel", requests: int = 10, concurrency: int = 1, date: str = None, cadastral_references: list = None,
+             fixtures_dir: Path | str = FIXTURES_DIR, mode: str = "replay", latency_scale: float = 1.0, synthetic: bool = False,
+             cold_cache: bool = True) -> dict:
+    """
+    Replays requests through the Flask app with the external services swapped for local stand-ins (see `stand_ins.py`),
+    and measures latency, throughput and resource usage.
+    Arguments:
+        scenario (str): _Optional_; `parcel` (`/find-parcel`) or `chat` (`/send-user-input` + `/get-input-suggestion`). Default is `parcel`.
+        requests (int): _Optional_; Number of requests. Default is `10`.
+        concurrency (int): _Optional_; Requests in flight at once. Default is `1`.
+        date (str): _Optional_; Parcel image date (`YYYY-MM-DD`). Default is today.
+        cadastral_references (list): _Optional_; Parcels to request, in turn. Default: every parcel in the SIGPAC fixtures.
+        fixtures_dir (Path | str): _Optional_; Recorded responses. Default is `FIXTURES_DIR`.
+        mode (str): _Optional_; `replay` or `record`. Default is `replay`.
+        latency_scale (float): _Optional_; Factor applied to the recorded network latencies. Default is `1.0`.
+        synthetic (bool): _Optional_; Generate the cubes and Gemini answers missing from the fixtures.
+        cold_cache (bool): _Optional_; Run with empty SR image and band caches. Default is `True`.
+    Returns:
+        results (dict): Run config, request latency percentiles, throughput, per-stage latency percentiles, CPU time and peak RSS.
+    """
+    from ... import create_app
+
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    if scenario == "parcel":
+        cadastral_references = cadastral_references or list(FixtureStore(fixtures_dir, "sigpac").index)
+        if not cadastral_references:
+            raise ValueError("No parcels to request: pass cadastral references or record SIGPAC fixtures first")
+        payloads = [("/find-parcel", {"cadastralReference": cadastral_references[i % len(cadastral_references)], "selectedDate": date, "isFromCadastralReference": "True"})
+                    for i in range(requests)]
+    elif scenario == "chat":
+        payloads = [("/send-user-input", {"userInput": DEFAULT_CHAT_INPUTS[i % len(DEFAULT_CHAT_INPUTS)]}) if i % 2 == 0 else ("/get-input-suggestion", {"lang": "en"})
+                    for i in range(requests)]
+    else:
+        raise ValueError(f"Unknown scenario '{scenario}', expected `parcel` or `chat`")
+
+    spans, spans_lock = {}, threading.Lock()
+    def record_span(name, seconds, status):
+        with spans_lock:
+            spans.setdefault(name, []).append(seconds)
+
+    with tempfile.TemporaryDirectory() as cache_dir, use_stand_ins(fixtures_dir, mode, latency_scale, synthetic):
+        if cold_cache:
+            use_empty_caches(Path(cache_dir))
+        app = create_app()
+
+        def send(payload):
+            path, form = payload
+            start = time.perf_counter()
+            response = app.test_client().post(path, data=form)
+            return {"path": path, "status": response.status_code, "seconds": time.perf_counter() - start}
+
+        add_span_listener(record_span)
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                responses = list(executor.map(send, payloads))
+        finally:
+            wall_s = time.perf_counter() - start
+            remove_span_listener(record_span)
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    failed = [response for response in responses if response["status"] >= 400]
+    results = {
+        "commit": get_git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {"scenario": scenario, "requests": requests, "concurrency": concurrency, "date": date, "mode": mode,
+                   "latency_scale": latency_scale, "synthetic": synthetic, "cold_cache": cold_cache},
+        "wall_s": wall_s,
+        "throughput_rps": len(responses) / wall_s if wall_s else 0.0,
+        "errors": len(failed),
+        "latency": summarize([response["seconds"] for response in responses]),
+        "stages": {name: summarize(seconds) for name, seconds in sorted(spans.items())},
+        "cpu_s": (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime),
+        "peak_rss_mb": usage_after.ru_maxrss / 1024,  # KiB on Linux
+    }
+    print_results(results)
+    return results
+
+def use_empty_caches(cache_dir: Path):
+    """
+    Points the persistent SR image and band caches to an empty dir for this run.
+    """
+    from ...services.sen2sr import sr_image_cache
+    from ...utils.band_cache_utils import BAND_CACHE
+
+    sr_image_cache.SR_IMAGE_CACHE.root = cache_dir / "sr_parcel_images"
+    sr_image_cache.WINDOWS_DIR = sr_image_cache.SR_IMAGE_CACHE.root / ".windows"
+    BAND_CACHE.root = cache_dir / "minio_bands"
+
+def summarize(values: list) -> dict:
+    """
+    Count, mean and percentiles (`PERCENTILES`) of durations in seconds.
+    """
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": float(np.mean(values)), "max": float(np.max(values))}
+    summary.update({f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES})
+    return summary
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: dict):
+    latency = results["latency"]
+    print(f"\n⏱️  {results['config']['scenario']}: {latency['count']} requests x{results['config']['concurrency']} in {results['wall_s']:.1f}s "
+          f"({results['throughput_rps']:.2f} req/s, {results['errors']} errors)")
+    print(f"   latency p50 {latency.get('p50', 0):.2f}s, p95 {latency.get('p95', 0):.2f}s | CPU {results['cpu_s']:.1f}s | peak RSS {results['peak_rss_mb']:.0f} MB")
+    print(f"\n{'stage':<24}{'count':>6}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+    for name, stage in results["stages"].items():
+        print(f"{name:<24}{stage['count']:>6}{stage['p50']:>10.3f}{stage['p95']:>10.3f}{stage['max']:>10.3f}")
+
+def save_results(results: dict) -> str:
+    os.makedirs(PERF_RES_DIR, exist_ok=True)
+    json_path = os.path.join(PERF_RES_DIR, f"perf_{results['config']['scenario']}_{results['commit'] or 'nocommit'}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Saved results to: {json_path}")
+    return json_path
+
+def compare_results(base_path: str, new_path: str, percentile: int = 95) -> dict:
+    """
+    Prints the change in throughput, request latency and per-stage latency (at `percentile`) between two runs.
+    Returns:
+        deltas (dict): Stage (or `request`) → relative change of its percentile (`0.1` = 10% slower).
+    """
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    key = f"p{percentile}"
+    rows = [("request", base["latency"], new["latency"])]
+    rows += [(name, base["stages"].get(name, {}), new["stages"].get(name, {})) for name in sorted(set(base["stages"]) | set(new["stages"]))]
+    print(f"{base['commit']} → {new['commit']}: throughput {base['throughput_rps']:.2f} → {new['throughput_rps']:.2f} req/s, "
+          f"peak RSS {base['peak_rss_mb']:.0f} → {new['peak_rss_mb']:.0f} MB")
+    print(f"\n{'stage':<24}{key + ' before':>12}{key + ' after':>12}{'change':>9}")
+    deltas = {}
+    for name, before, after in rows:
+        if key not in before or key not in after:
+            print(f"{name:<24}{before.get(key, float('nan')):>12.3f}{after.get(key, float('nan')):>12.3f}{'n/a':>9}")
+            continue
+        deltas[name] = (after[key] - before[key]) / before[key] if before[key] else 0.0
+        print(f"{name:<24}{before[key]:>12.3f}{after[key]:>12.3f}{deltas[name]:>+9.0%}")
+    return deltas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end latency/throughput benchmark with recorded external services.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Replay (or record) a scenario and save its results as JSON.")
+    run_parser.add_argument("--scenario", choices=("parcel", "chat"), default="parcel")
+    run_parser.add_argument("--requests", type=int, default=10)
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--date", help="Parcel image date (YYYY-MM-DD). Default: today.")
+    run_parser.add_argument("--parcels", nargs="*", help="Cadastral references. Default: those in the SIGPAC fixtures.")
+    run_parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    run_parser.add_argument("--mode", choices=("replay", "record"), default="replay")
+    run_parser.add_argument("--latency-scale", type=float, default=1.0, help="Scale of the replayed network latencies (0: none).")
+    run_parser.add_argument("--synthetic", action="store_true", help="Generate the cubes and Gemini answers that were not recorded.")
+    run_parser.add_argument("--warm-cache", action="store_true", help="Use the persistent SR image and band caches.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two saved runs.")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--percentile", type=int, default=95, choices=PERCENTILES)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        save_results(run_perf(args.scenario, args.requests, args.concurrency, args.date, args.parcels, args.fixtures, args.mode,
+                              args.latency_scale, args.synthetic, not args.warm_cache))
+    else:
+        compare_results(args.base, args.new, args.percentile)
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from .constants import FIXTURES_DIR, SYNTHETIC_CUBE_DATES, SYNTHETIC_LLM_LATENCY, SYNTHETIC_LLM_TEXT
+from ...config.constants import DEFAULT_SESSION_ID, RESOLUTION
+from ...utils.chat_session_utils import ChatSession
+
+class FixtureStore:
+    """
+    Recorded responses of one external service, in `root/name/`: an `index.json` with keyed entries (SIGPAC, cubes)
+    or sequences replayed in order (Gemini), plus any binary files the entries point to.
+    """
+    def __init__(self, root: Path | str, name: str):
+        self.dir = Path(root) / name
+        self.index_path = self.dir / "index.json"
+        self.lock = threading.Lock()
+        self.cursors = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+
+    def get(self, key: str) -> dict | None:
+        return self.index.get(key)
+
+    def put(self, key: str, entry: dict):
+        with self.lock:
+            self.index[key] = entry
+            self.save()
+
+    def append(self, kind: str, entry: dict):
+        with self.lock:
+            self.index.setdefault(kind, []).append(entry)
+            self.save()
+
+    def next(self, kind: str) -> dict | None:
+        """
+        Next entry of a sequence, starting over once all have been replayed.
+        """
+        with self.lock:
+            entries = self.index.get(kind) or []
+            if not entries:
+                return None
+            cursor = self.cursors.get(kind, 0)
+            self.cursors[kind] = cursor + 1
+            return entries[cursor % len(entries)]
+
+    def path(self, filename: str) -> Path:
+        return self.dir / filename
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+def fixture_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def wait(latency_s: float, latency_scale: float):
+    """
+    Replays a recorded network latency, scaled (`0` replays responses instantly).
+    """
+    if latency_s and latency_scale > 0:
+        time.sleep(latency_s * latency_scale)
+
+@contextmanager
+def use_stand_ins(fixtures_dir: Path | str = FIXTURES_DIR, mode: str = "replay", latency_scale: float = 1.0, synthetic: bool = False):
+    """
+    Swaps the external services of the server (SIGPAC, STAC/cubo, MinIO, Gemini) for local stand-ins while the block runs.
+    Arguments:
+        fixtures_dir (Path | str): _Optional_; Dir of the recorded responses. Default is `FIXTURES_DIR`.
+        mode (str): _Optional_; `replay` answers from the fixtures, `record` calls the real services and stores their responses. Default is `replay`.
+        latency_scale (float): _Optional_; Factor applied to the recorded latencies when replaying. Default is `1.0`.
+        synthetic (bool): _Optional_; When replaying, generate cubes and Gemini answers that were not recorded instead of failing.
+    """
+    if mode not in ("replay", "record"):
+        raise ValueError(f"Unknown stand-in mode '{mode}', expected `replay` or `record`")
+    from ...endpoints import chat as chat_endpoints
+    from ...services import chat_service, parcel_batch_service, parcel_finder_service
+    from ...services.sen2sr import get_sr_image
+    from ...utils import parcel_finder_utils
+
+    record = mode == "record"
+    sigpac = SigpacStandIn(FixtureStore(fixtures_dir, "sigpac"), latency_scale, parcel_finder_service.find_from_cadastral_registry if record else None)
+    cubes = CuboStandIn(FixtureStore(fixtures_dir, "cubo"), latency_scale, get_sr_image.create_cubo if record else None, synthetic)
+    minio = MinioStandIn(Path(fixtures_dir) / "minio", parcel_finder_utils.minioClient if record else None)
+    gemini = FixtureStore(fixtures_dir, "gemini")
+    chat = GeminiChatStandIn(gemini, latency_scale, chat_service.get_chat() if record else None, synthetic)
+    client = GeminiClientStandIn(gemini, latency_scale, chat_service.get_client() if record else None, synthetic)
+
+    with ExitStack() as stack:
+        for module in (parcel_finder_service, parcel_batch_service):
+            stack.enter_context(mock.patch.object(module, "find_from_cadastral_registry", sigpac))
+        stack.enter_context(mock.patch.object(get_sr_image, "create_cubo", cubes))
+        stack.enter_context(mock.patch.object(parcel_finder_utils, "minioClient", minio))
+        stack.enter_context(mock.patch.object(parcel_finder_utils, "read_minio_window", minio.read_window))
+        for module in (chat_service, chat_endpoints):
+            stack.enter_context(mock.patch.object(module, "get_chat", lambda session_id=None: chat))
+        session = ChatSession(DEFAULT_SESSION_ID, chat)
+        stack.enter_context(mock.patch.object(chat_service, "get_chat_session", lambda session_id=None: session))
+        stack.enter_context(mock.patch.object(chat_service, "get_session_history", lambda chat: chat.get_history()))
+        stack.enter_context(mock.patch.object(chat_service, "get_client", lambda: client))
+        print(f"🎭 External services {'recorded to' if record else 'replayed from'} {fixtures_dir} (latency x{latency_scale})")
+        yield
+
+class SigpacStandIn:
+    """
+    `find_from_cadastral_registry` answered from recorded geometries and metadata.
+    """
+    def __init__(self, store: FixtureStore, latency_scale: float, find=None):
+        self.store, self.latency_scale, self.find = store, latency_scale, find
+
+    def __call__(self, cadastral_reg: str):
+        if self.find:
+            start = time.perf_counter()
+            geometry, metadata = self.find(cadastral_reg)
+            self.store.put(cadastral_reg, {"geometry": geometry, "metadata": metadata, "latency_s": time.perf_counter() - start})
+            return geometry, metadata
+        entry = self.store.get(cadastral_reg)
+        if entry is None:
+            raise ValueError(f"No SIGPAC fixture for {cadastral_reg}; record it first (`--mode record`)")
+        wait(entry["latency_s"], self.latency_scale)
+        return entry["geometry"], entry["metadata"]
+
+class CuboStandIn:
+    """
+    `create_cubo` answered from recorded cubes (NetCDF), or with synthetic cloud-free cubes.
+    """
+    def __init__(self, store: FixtureStore, latency_scale: float, create_cubo=None, synthetic: bool = False):
+        self.store, self.latency_scale, self.create_cubo, self.synthetic = store, latency_scale, create_cubo, synthetic
+
+    def __call__(self, lat, lon, bands, start_date, end_date, size, resolution=RESOLUTION):
+        import xarray as xr
+
+        key = fixture_key(round(lat, 6), round(lon, 6), list(bands), start_date, end_date, size, resolution)
+        if self.create_cubo:
+            start = time.perf_counter()
+            da = self.create_cubo(lat, lon, bands, start_date, end_date, size, resolution).compute()
+            latency_s = time.perf_counter() - start
+            # Keep the dims and plain attributes only: cubo's STAC metadata coords don't serialise
+            da = xr.DataArray(da.values, dims=da.dims, coords={dim: da[dim].values for dim in da.dims},
+                              attrs={k: v for k, v in da.attrs.items() if isinstance(v, (str, int, float))})
+            self.store.dir.mkdir(parents=True, exist_ok=True)
+            da.to_netcdf(self.store.path(f"{key}.nc"))
+            self.store.put(key, {"file": f"{key}.nc", "latency_s": latency_s, "nbytes": int(da.nbytes)})
+            return da
+
+        entry = self.store.get(key)
+        if entry is None:
+            if not self.synthetic:
+                raise ValueError(f"No cubo fixture for ({lat}, {lon}, {start_date} → {end_date}, {size}px); record it first or use `--synthetic`")
+            return synthetic_cube(lat, lon, bands, start_date, end_date, size, resolution)
+        wait(entry["latency_s"], self.latency_scale)
+        return xr.open_dataarray(self.store.path(entry["file"])).load()
+
+def synthetic_cube(lat, lon, bands, start_date, end_date, size, resolution=RESOLUTION):
+    """
+    Cloud-free cube (SCL = vegetation) with random reflectances, on the UTM grid cubo would return.
+    """
+    import xarray as xr
+    from pyproj import Transformer
+
+    from ...services.sen2sr.utils import lonlat_to_utm_epsg
+
+    crs = lonlat_to_utm_epsg(lon, lat)
+    x0, y0 = Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform(lon, lat)
+    half = size * resolution / 2
+    x = x0 - half + resolution * (np.arange(size) + 0.5)
+    y = y0 + half - resolution * (np.arange(size) + 0.5)
+    start, end = np.datetime64(start_date, "s"), np.datetime64(end_date, "s")
+    times = start + (np.linspace(0, 1, SYNTHETIC_CUBE_DATES) * (end - start).astype(int)).astype("timedelta64[s]")
+
+    rng = np.random.default_rng(int(fixture_key(lat, lon, size), 16))
+    data = rng.integers(300, 4000, (len(times), len(bands), size, size)).astype("float32")
+    if "SCL" in bands:
+        data[:, list(bands).index("SCL")] = 4
+    return xr.DataArray(data, dims=("time", "band", "y", "x"), coords={"time": times, "band": list(bands), "y": y, "x": x},
+                        attrs={"epsg": int(crs.split(":")[1]), "resolution": resolution})
+
+class MinioStandIn:
+    """
+    MinIO client serving the band composites stored under `root/<bucket>/<object name>`.
+    When recording, objects are fetched from the real client into `root` first.
+    """
+    def __init__(self, root: Path, client=None):
+        self.root, self.client = Path(root), client
+
+    def list_objects(self, bucket_name, prefix="", recursive=True):
+        if self.client:
+            yield from self.client.list_objects(bucket_name, prefix=prefix, recursive=recursive)
+            return
+        bucket_dir = self.root / bucket_name
+        for path in sorted(bucket_dir.glob(f"{prefix}**/*" if recursive else f"{prefix}*")):
+            if path.is_file():
+                stat = path.stat()
+                yield SimpleNamespace(object_name=path.relative_to(bucket_dir).as_posix(), size=stat.st_size,
+                                      etag=fixture_key(stat.st_size, stat.st_mtime))
+
+    def fget_object(self, bucket_name, object_name, file_path):
+        shutil.copyfile(self.local_object(bucket_name, object_name), file_path)
+
+    def read_window(self, bucket_name, object_name, bounds, local_file_path, **kwargs):
+        from ...utils.minio_window_utils import read_raster_window
+
+        return read_raster_window(str(self.local_object(bucket_name, object_name)), bounds, local_file_path, **kwargs)
+
+    def local_object(self, bucket_name, object_name) -> Path:
+        path = self.root / bucket_name / object_name
+        if self.client and not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.client.fget_object(bucket_name, object_name, str(path))
+        if not path.exists():
+            raise FileNotFoundError(f"No MinIO fixture for {bucket_name}/{object_name}; record it first (`--mode record`)")
+        return path
+
+class GeminiChatStandIn:
+    """
+    Gemini chat replaying recorded answers in order (keeps its own history).
+    """
+    def __init__(self, store: FixtureStore, latency_scale: float, chat=None, synthetic: bool = False):
+        self.store, self.latency_scale, self.chat, self.synthetic = store, latency_scale, chat, synthetic
+        self.history = []
+        self.lock = threading.Lock()
+
+    def send_message(self, message, *args, **kwargs):
+        if self.chat:
+            return record_call(self.store, "chat", lambda: self.chat.send_message(message, *args, **kwargs))
+        response = replay_call(self.store, "chat", self.latency_scale, self.synthetic)
+        with self.lock:
+            text = message if isinstance(message, str) else " ".join(part for part in message if isinstance(part, str))
+            self.history += [content("user", text), content("model", response.text)]
+        return response
+
+    def send_message_stream(self, message, *args, **kwargs):
+        """
+        Replays an answer as word chunks, with the recorded latency before the first one.
+        """
+        if self.chat:
+            start, chunks = time.perf_counter(), []
+            for chunk in self.chat.send_message_stream(message, *args, **kwargs):
+                chunks.append(chunk.text or "")
+                yield chunk
+            self.store.append("chat", {"text": "".join(chunks), "latency_s": time.perf_counter() - start})
+            return
+        response = self.send_message(message)
+        for word in response.text.split(" "):
+            yield SimpleNamespace(text=word + " ")
+
+    def get_history(self):
+        if self.chat:
+            return self.chat.get_history()
+        with self.lock:
+            return list(self.history)
+
+class GeminiClientStandIn:
+    """
+    Gemini client whose `models.generate_content` replays recorded answers in order.
+    """
+    def __init__(self, store: FixtureStore, latency_scale: float, client=None, synthetic: bool = False):
+        self.store, self.latency_scale, self.client, self.synthetic = store, latency_scale, client, synthetic
+        self.models = self
+
+    def generate_content(self, *args, **kwargs):
+        if self.client:
+            return record_call(self.store, "generate_content", lambda: self.client.models.generate_content(*args, **kwargs))
+        return replay_call(self.store, "generate_content", self.latency_scale, self.synthetic)
+
+def record_call(store: FixtureStore, kind: str, call):
+    start = time.perf_counter()
+    response = call()
+    store.append(kind, {"text": response.text, "latency_s": time.perf_counter() - start})
+    return response
+
+def replay_call(store: FixtureStore, kind: str, latency_scale: float, synthetic: bool):
+    entry = store.next(kind)
+    if entry is None:
+        if not synthetic:
+            raise ValueError(f"No Gemini `{kind}` fixtures; record them first or use `--synthetic`")
+        entry = {"text": SYNTHETIC_LLM_TEXT, "latency_s": SYNTHETIC_LLM_LATENCY}
+    wait(entry["latency_s"], latency_scale)
+    return SimpleNamespace(text=entry["text"])
+
+def content(role: str, text: str):
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text)])
@@ -0,0 +1,68 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from datetime import datetime
+
+from ..sr.constants import BM_RES_DIR
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+STARTUP_CODE = "import time; t = time.perf_counter(); from server import create_app; create_app(); print(f'create_app:{time.perf_counter() - t}')"
+
+def profile_startup(top: int = 25) -> list[dict]:
+    """
+    Imports `server` and runs `create_app()` in a fresh interpreter with `-X importtime`, and reports per-module import times.
+    Arguments:
+        top (int): Number of modules to print, slowest (cumulative) first.
+    Returns:
+        rows (list[dict]): One row per imported module: `module`, `depth`, `self_ms` and `cumulative_ms`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Server startup failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                "module": module,
+                "depth": (len(indent) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+    startup_s = float(next(line for line in result.stdout.splitlines() if line.startswith("create_app:")).split(":")[1])
+
+    top_level = [row for row in rows if row["depth"] == 0]
+    print(f"⏱️  Server startup (imports + create_app): {startup_s:.2f}s, {len(rows)} modules imported")
+    print(f"   Top-level imports: {sum(row['cumulative_ms'] for row in top_level) / 1000:.2f}s")
+    print(f"\n{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    for row in sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:top]:
+        print(f"{row['cumulative_ms']:>16.1f} {row['self_ms']:>10.1f}  {'  ' * row['depth']}{row['module']}")
+    return rows
+
+def save_report(rows: list[dict]) -> str:
+    os.makedirs(BM_RES_DIR, exist_ok=True)
+    csv_path = os.path.join(BM_RES_DIR, f"startup_import_times_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("module,depth,self_ms,cumulative_ms\n")
+        for row in rows:
+            f.write(f"{row['module']},{row['depth']},{row['self_ms']},{row['cumulative_ms']}\n")
+    print(f"\n📁 Saved import times to: {csv_path}")
+    return csv_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import time report for the server startup.")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest modules to print.")
+    parser.add_argument("--csv", action="store_true", help="Also save every module's import time as CSV.")
+    args = parser.parse_args()
+
+    rows = profile_startup(args.top)
+    if args.csv:
+        save_report(rows)
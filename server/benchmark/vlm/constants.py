@@ -1,8 +1,6 @@
 from pathlib import Path
 import os
 
-from flask import json
-
 from ...config.constants import BASE_PROMPTS_PATH
 
 BM_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
@@ -21,10 +19,7 @@ BM_PROMPT_LIST_DATA = {
         "examples": "response_examples"
     }
 }
-
-# (Optional) write to file:
-with BM_PROMPT_LIST_FILE.open("w") as f:
-    json.dump(BM_PROMPT_LIST_DATA, f, indent=4)
+# Written to `BM_PROMPT_LIST_FILE` on first use (see `llm_setup.write_bm_prompt_list`)
 
 # AgrIA Paper data
 CADASTRAL_REF_LIST_PAPER = ["26002A001000010000EQ", "41004A033000290000IG","46113A023000420000RL", "06900A766000030000WA"]
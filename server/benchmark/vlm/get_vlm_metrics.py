@@ -11,13 +11,12 @@ from google import genai
 from google.genai import types
 
 from ..sr.utils import copy_file_to_dir
-from ...config.constants import SEN2SR_SR_DIR, TEMP_DIR
-from ...config.llm_client import client
+from ...config.llm_client import get_client
 from ...services.parcel_finder_service import download_sen2sr_parcel_image
-from ...services.sen2sr.constants import GEOJSON_FILEPATH
 from ...services.sigpac_tools_v2.find import find_from_cadastral_registry
 from ...utils.chat_utils import generate_image_context_data
 from ...utils.parcel_finder_utils import reset_dir
+from ...utils.workspace_utils import Workspace, create_workspace
 
 
 from .constants import BM_JSON_DIR, BM_LLM_DIR, BM_SR_IMAGES_DIR, CADASTRAL_REF_LIST_PAPER, DATES_PAPER, FULL_DESC_SYS_INSTR_EN, FULL_DESC_SYS_INSTR_ES, USE_PAPER_DATA, LANG, OG_CLASSIFICATION_FILEPATH
@@ -52,14 +51,12 @@ def setup_ndates(n_dates:int, to_date: datetime=datetime.today(), delta_days: in
     
     return dates
 
-def get_parcel_data_and_description(cadastral_ref: str, image_date: str, lang: str=LANG):
+def get_parcel_data_and_description(cadastral_ref: str, image_date: str, workspace: Workspace, lang: str=LANG):
     if not lang:
         lang = LANG
     # Get parcel metadata and geometry
     geometry, metadata = find_from_cadastral_registry(cadastral_ref)
-    os.makedirs(SEN2SR_SR_DIR, exist_ok=True)
-    with open(GEOJSON_FILEPATH, "w") as file:
-        file.write(str(geometry).replace("'", '"').replace("(","[").replace(")","]"))  # format GeoJSON correctly
+    workspace.write_geometry(geometry)
     logger.debug(f"Metadata keys: {list(metadata.keys())}")
 
     # Get parcel's description
@@ -77,9 +74,9 @@ def get_parcel_data_and_description(cadastral_ref: str, image_date: str, lang: s
  
     return geometry, parcel_desc
 
-def get_parcel_image(cadastral_ref, geometry, image_date):    
+def get_parcel_image(cadastral_ref, geometry, image_date, workspace: Workspace):    
     # Get and save SR parcel image
-    sr_image_filepath = os.path.join(TEMP_DIR, download_sen2sr_parcel_image(geometry, image_date))
+    sr_image_filepath = os.path.join(workspace.public_dir, download_sen2sr_parcel_image(geometry, image_date, workspace))
     logger.debug(f"SR image downloaded: {sr_image_filepath}")
     image_filepath = copy_file_to_dir(str(sr_image_filepath), BM_SR_IMAGES_DIR)
     
@@ -120,7 +117,7 @@ def get_llm_full_desc(image_filepath: str, parcel_desc: str, lang: str=LANG, cla
 
     # logger.debug(f"LLM instructions: {sys_ins}")
 
-    llm_response = client.models.generate_content(
+    llm_response = get_client().models.generate_content(
         model="gemini-2.5-flash",
         config=types.GenerateContentConfig(
             system_instruction=sys_ins
@@ -193,11 +190,12 @@ def run_vlm_benchmark(use_vlm_only: bool=False, lang: str=LANG, use_paper_data:
             if len(cadastral_ref) != 20:
                 continue
             init_time = datetime.now()
+            workspace = create_workspace()
         
         # Get parcel input data
             image_date = dates[i]
-            geometry, parcel_desc = get_parcel_data_and_description(cadastral_ref, image_date, lang)
-            image_filepath = get_parcel_image(cadastral_ref, geometry, image_date)
+            geometry, parcel_desc = get_parcel_data_and_description(cadastral_ref, image_date, workspace, lang)
+            image_filepath = get_parcel_image(cadastral_ref, geometry, image_date, workspace)
         
         # Add data to input df
             new_row = pd.DataFrame([{
@@ -210,7 +208,7 @@ def run_vlm_benchmark(use_vlm_only: bool=False, lang: str=LANG, use_paper_data:
             input_df = pd.concat([input_df, new_row], ignore_index=True)
             logger.debug(f"Input DataFrame updated ({len(input_df)} entries)")
         
-            reset_dir(TEMP_DIR)
+            workspace.cleanup()
         
         # Run LLM and get response
             raw_text, json_data = get_llm_full_desc(image_filepath, parcel_desc, lang)
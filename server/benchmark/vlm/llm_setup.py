@@ -1,7 +1,23 @@
 from ...utils.llm_utils import load_prompt_from_json
+from ...utils.prompt_registry_utils import PROMPT_REGISTRY
 from ...config.constants import PROMPT_LIST_FILE, CALCULATIONS_RULE, EXCLUSIVITY_RULE
-from .constants import BM_DIR, BM_PROMPT_LIST_FILE
+from .constants import BM_DIR, BM_PROMPT_LIST_DATA, BM_PROMPT_LIST_FILE
 
+import json
+import os
+
+def write_bm_prompt_list(prompt_json_path: str=BM_PROMPT_LIST_FILE):
+    """
+    Writes the benchmark prompt list JSON (`BM_PROMPT_LIST_DATA`) that `generate_system_instructions` reads, unless it's
+    already up to date (rewriting it would invalidate its `PROMPT_REGISTRY` entry on every call).
+    """
+    data = json.dumps(BM_PROMPT_LIST_DATA, indent=4)
+    if os.path.isfile(prompt_json_path):
+        with open(prompt_json_path, "r") as f:
+            if f.read() == data:
+                return
+    with open(prompt_json_path, "w") as f:
+        f.write(data)
 
 def generate_system_instructions(prompt_json_path: str=BM_PROMPT_LIST_FILE):
     """
@@ -13,6 +29,9 @@ def generate_system_instructions(prompt_json_path: str=BM_PROMPT_LIST_FILE):
     Returns:
         system_instructions (str): All system instructions for AgrIA as raw text.
     """
+    if prompt_json_path == BM_PROMPT_LIST_FILE:
+        write_bm_prompt_list()
+
     # Upload files and read role and description files
     # role_prompt = load_prompt_from_json(PROMPT_LIST_FILE)
     role_prompt = "You are AgrIA, an agricultural Imaging Assistant and your job is to classify fields and parcels based on their visual an written data into the different eco-schemes regimes if they fulfill the conditions. You will communicate in English os Spanish. Here is some more information on how to do the classification:\n"
@@ -23,5 +42,7 @@ def generate_system_instructions(prompt_json_path: str=BM_PROMPT_LIST_FILE):
     classification_instruction = "\n\nThese is the Eco-scheme's classification data for each possible land use. There is an English and Spanish version. Use these to fill out the JSON data whenever you are prompted to describe a parcel and are provided with its info:\n\n" + classification_data
     examples_instructions = "\n\nThese are 3 examples of expected responses for parcel descriptions. Use them as a reference for formatting and content whenever you are prompted to describe a parcel. Use exactly the same keys and return nothing but the JSON as your reply:\n\n" + examples_data
     system_instructions = role_prompt + EXCLUSIVITY_RULE + CALCULATIONS_RULE + classification_instruction + examples_instructions
+    PROMPT_REGISTRY.record_sections("vlm_benchmark", {"role": role_prompt + EXCLUSIVITY_RULE + CALCULATIONS_RULE,
+                                                      "classification": classification_instruction, "examples": examples_instructions})
 
     return system_instructions
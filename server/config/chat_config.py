@@ -1,20 +1,122 @@
+import threading
+import weakref
+
+from dataclasses import dataclass
 from google.genai import types
-from ..utils.llm_utils import generate_system_instructions, set_initial_history
-from.llm_client import client
-from .constants import MODEL_NAME
+from ..utils.chat_session_utils import ChatSession, ChatSessionManager
+from ..utils.context_cache_utils import ContextCache
+from ..utils.llm_utils import generate_system_instructions, get_prompts_fingerprint, set_initial_history
+from.llm_client import get_client
+from .constants import CHAT_MAX_HISTORY, CHAT_SESSION_STORE_TTL, CHAT_SESSION_TTL, CHAT_SESSIONS_DIR, CONTEXT_CACHE_REFRESH_MARGIN, CONTEXT_CACHE_TTL, DEFAULT_SESSION_ID, MODEL_NAME
+from .env_config import CHAT_MAX_SESSIONS, CONTEXT_CACHE_ENABLED
+
+@dataclass
+class ChatBase:
+    fingerprint: str  # of the prompt files the system instructions were built from
+    system_instructions: str
+    initial_history: list
+
+@dataclass
+class ChatPrefix:
+    fingerprint: str
+    cached_content: str | None  # context cache name, or `None` if the prefix was sent inline
+    length: int  # initial history entries in the chat's own history
+
+CHAT_BASE: ChatBase | None = None
+CHAT_BASE_LOCK = threading.Lock()
+CHAT_PREFIXES = weakref.WeakKeyDictionary()  # chat → ChatPrefix
+
+CONTEXT_CACHE = ContextCache(get_client, MODEL_NAME, CONTEXT_CACHE_TTL, CONTEXT_CACHE_REFRESH_MARGIN)
+
+def get_chat_base() -> ChatBase:
+    """
+    Returns the system instructions and initial history shared by every chat session. They are built (and the context
+    documents uploaded) on first use, and the system instructions are rebuilt when a prompt file changes.
+    """
+    global CHAT_BASE
+    fingerprint = get_prompts_fingerprint()
+    if CHAT_BASE is None or CHAT_BASE.fingerprint != fingerprint:
+        with CHAT_BASE_LOCK:
+            if CHAT_BASE is None or CHAT_BASE.fingerprint != fingerprint:
+                if CHAT_BASE is not None:
+                    print("🔄 Prompt files changed, rebuilding the system instructions")
+                system_instructions = generate_system_instructions()
+                with open("sys_ins.md", 'w') as f:
+                    f.write(system_instructions)
+                initial_history = CHAT_BASE.initial_history if CHAT_BASE is not None else set_initial_history()
+                CHAT_BASE = ChatBase(fingerprint, system_instructions, initial_history)
+    return CHAT_BASE
 
-def create_chat():
-    chat = client.chats.create(
+def get_cached_content(base: ChatBase) -> str | None:
+    """
+    Name of the context cache holding `base`, or `None` if caching is disabled or unavailable.
+    """
+    if not CONTEXT_CACHE_ENABLED:
+        return None
+    return CONTEXT_CACHE.get(base.fingerprint, base.system_instructions, base.initial_history)
+
+def create_chat(history: list = None):
+    """
+    Creates a chat with the shared system instructions and initial history, followed by a session's own `history`.
+    The shared prefix is referenced from the context cache when there is one, and sent inline otherwise.
+    """
+    base = get_chat_base()
+    cached_content = get_cached_content(base)
+    if cached_content:
+        config = types.GenerateContentConfig(cached_content=cached_content)
+        prefix = []
+    else:
+        config = types.GenerateContentConfig(system_instruction=base.system_instructions)
+        prefix = base.initial_history
+    chat = get_client().chats.create(
         model=MODEL_NAME,
-        config=types.GenerateContentConfig(
-            system_instruction= generate_system_instructions()
-        ),
-        history=set_initial_history()
+        config=config,
+        history=prefix + list(history or [])
     )
+    CHAT_PREFIXES[chat] = ChatPrefix(base.fingerprint, cached_content, len(prefix))
     return chat
 
-CHAT = create_chat()
-# CHAT = None
+def get_session_history(chat) -> list:
+    """
+    A chat's history without the shared initial turns.
+    """
+    return chat.get_history()[CHAT_PREFIXES[chat].length:]
+
+def is_chat_outdated(chat) -> bool:
+    """
+    Whether a chat was built from older prompt files or another context cache (expired, recreated or now available).
+    Also extends the context cache's TTL while chats use it.
+    """
+    prefix = CHAT_PREFIXES[chat]
+    base = get_chat_base()
+    return prefix.fingerprint != base.fingerprint or prefix.cached_content != get_cached_content(base)
+
+def dump_content(content: types.Content) -> dict:
+    """
+    Serialises a history entry for the session store. Inline image bytes are replaced by a placeholder to keep it compact.
+    """
+    parts = [{"text": "[image]"} if part.inline_data else part.model_dump(mode="json", exclude_none=True) for part in content.parts or []]
+    return {"role": content.role, "parts": parts}
+
+def load_content(data: dict) -> types.Content:
+    return types.Content.model_validate(data)
+
+CHAT_SESSIONS = ChatSessionManager(
+    create_chat, get_session_history, dump_content, load_content, CHAT_SESSIONS_DIR,
+    max_sessions=CHAT_MAX_SESSIONS, ttl=CHAT_SESSION_TTL, max_history=CHAT_MAX_HISTORY, store_ttl=CHAT_SESSION_STORE_TTL,
+    is_outdated=is_chat_outdated,
+)
+
+def get_chat(session_id: str = DEFAULT_SESSION_ID):
+    """
+    Returns the chat of a session, creating it (system instructions + context document uploads, once per process) on first use.
+    Arguments:
+        session_id (str): _Optional_; Session id sent by the client. Default is `DEFAULT_SESSION_ID`, shared by clients that send none.
+    """
+    return CHAT_SESSIONS.get(session_id or DEFAULT_SESSION_ID)
 
-with open("sys_ins.md", 'w') as f:
-    f.write(generate_system_instructions())
\ No newline at end of file
+def get_chat_session(session_id: str = DEFAULT_SESSION_ID) -> ChatSession:
+    """
+    Like `get_chat`, but returns the whole session (chat, trimmed entries and per-session state).
+    """
+    return CHAT_SESSIONS.session(session_id or DEFAULT_SESSION_ID)
@@ -1,7 +1,7 @@
 from pathlib import Path
-import json
 
 MODEL_NAME = "gemini-2.0-flash-lite"
+SUGGESTION_MODEL_NAME = "gemini-2.0-flash"
 BASE_CONTEXT_PATH = Path("./assets/LLM_assets/context")
 BASE_PROMPTS_PATH = Path("./assets/LLM_assets/prompts")
 
@@ -9,6 +9,7 @@ CONTEXT_DOCUMENTS_FILE = "context_document_links.json"
 PROMPT_LIST_FILE = "prompt_list.json"
 
 TEMP_DIR = Path('temp/')
+CACHE_DIR = Path('cache/')
 
 EXCLUSIVITY_RULE = """\n\n
 **CRITICAL EXCLUSIVITY DIRECTIVE FOR CALCULATION:**
@@ -45,24 +46,65 @@ MIME_TYPES = {
     'png': 'image/png',
 }
 
-SPAIN_JSON = Path("./assets/geojson_assets/spain.json")
-with open(SPAIN_JSON, 'r') as file:
-    SPAIN_ZONES = json.load(file)
+SPAIN_JSON = Path("./assets/geojson_assets/spain.json")  # loaded on first use, see `load_spain_zones`
 
 ANDALUSIA_TILES = ["29SPC", "29SQC", "30STH", "30SUH", "30SVH", "30SWH", "30SXH", "30SYH", "30SXG", 
         "30SWG", "30SVG", "30SUG", "30STG", "29SQB" ,"29SPB", "30STF", "30SUF", 
         "30SVF", "30SWF"]
 
 SR_BANDS = ["B02", "B03", "B04", "B08"]
-BANDS_DIR = TEMP_DIR / "bands"
-MERGED_BANDS_DIR = TEMP_DIR / "merged_bands"
-MASKS_DIR = TEMP_DIR / "masks"
-SR5M_DIR = TEMP_DIR / "sr_5m"
 RESOLUTION = 10
 
-SEN2SR_SR_DIR = TEMP_DIR / "sr_2.5m"
+# Request-scoped working directories (see `server/utils/workspace_utils.py`)
+WORKSPACES_DIR = TEMP_DIR / "workspaces"
+WORKSPACE_TTL = 60 * 60  # seconds a workspace (and its published images) are kept before GC
+WORKSPACE_CLEANUP_INTERVAL = 5 * 60  # seconds between two GC runs triggered by requests
+
+# Asynchronous parcel jobs (see `server/services/parcel_job_service.py`)
+PARCEL_JOB_STAGES = ["geometry", "download", "cloud_selection", "sr", "crop"]
+PARCEL_JOB_TTL = WORKSPACE_TTL  # seconds a finished job is kept for polling
+
+# Persistent cache of cropped SR parcel images (see `server/services/sen2sr/sr_image_cache.py`)
+SR_IMAGE_CACHE_DIR = CACHE_DIR / "sr_parcel_images"
+SR_IMAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+SR_IMAGE_CACHE_WINDOW_TTL = 6 * 60 * 60  # seconds a date window that reaches today is trusted to resolve to the same image
+
+# Sentinel-2 tile grid spatial index, built from `GEOMETRY_FILE` (see `server/utils/tile_index_utils.py`)
+TILE_INDEX_FILE = CACHE_DIR / "tile_index.npz"
+
+# Shared cache of whole MinIO band composites, validated by object ETag (see `server/utils/band_cache_utils.py`)
+BAND_CACHE_DIR = CACHE_DIR / "minio_bands"
+
+# Windowed reads of MinIO composites (see `server/utils/minio_window_utils.py`): pixels read around the parcel bbox
+MINIO_WINDOW_PAD_PX = 16
 
 GET_SR_BENCHMARK = False
 
 if GET_SR_BENCHMARK:
     print("⚠️  WARNING: SUPER-RES BENCHMARK IS ACTIVE. This will execute both SR4S and SEN2SR pipelines (in that order), which will slow down all parcel fetching processes. To deactivate it, set the `GET_SR_BENCHMARK` to `False` in the `Agria_server/server/config/constants.py` file")
+
+# Batch parcel jobs (see `server/services/parcel_batch_service.py`)
+BATCH_MAX_PARCELS = 500
+BATCH_CELL_SIZE = 5120  # m; parcels of the same tile and date whose centroids share a cell are super-resolved from one cube (512 px at 10 m)
+BATCH_CUBE_PAD_PX = 16  # px added around the parcels of a group
+BATCH_GEOMETRY_WORKERS = 8  # concurrent SIGPAC lookups
+
+# Span duration histogram buckets, in seconds (see `server/utils/metrics_utils.py`)
+METRICS_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+# Per-session chats (see `server/utils/chat_session_utils.py`)
+DEFAULT_SESSION_ID = "default"  # shared by clients that send no `X-Session-Id` header / `sessionId` field
+CHAT_SESSIONS_DIR = CACHE_DIR / "chat_sessions"  # sessions evicted from memory, rehydrated on their next message
+CHAT_SESSION_TTL = 30 * 60  # seconds a session may stay idle in memory
+CHAT_SESSION_STORE_TTL = 7 * 24 * 60 * 60  # seconds an evicted session is kept on disk
+CHAT_MAX_HISTORY = 40  # contents kept per session, after the shared initial history
+
+# Explicit Gemini context cache of the system instructions and initial history (see `server/utils/context_cache_utils.py`)
+CONTEXT_CACHE_TTL = 60 * 60  # seconds; extended while chats use it
+CONTEXT_CACHE_REFRESH_MARGIN = 10 * 60  # seconds before expiry at which the TTL is extended
+
+# Prompt files registry (see `server/utils/prompt_registry_utils.py`): characters per token used to estimate the size of each instructions section
+PROMPT_CHARS_PER_TOKEN = 4
+
+# Input suggestions: characters of each new message folded into a session's rolling summary
+SUMMARY_MAX_MESSAGE_CHARS = 2000
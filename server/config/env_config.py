@@ -6,5 +6,47 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 UI_URL = os.getenv("UI_URL", "http://localhost:4200")
 
+# Parcel job queue: worker threads running parcel jobs, and how many of them may run SR inference at once (GPU/CPU bound)
+PARCEL_JOB_WORKERS = int(os.getenv("PARCEL_JOB_WORKERS", 2))
+SR_MAX_CONCURRENCY = int(os.getenv("SR_MAX_CONCURRENCY", 1))
+
+# SR4S (L1BSR) tiled inference: tile size in px (0 disables tiling), overlap, tiles per batch, concurrent batches
+# and torch CPU threads (0 keeps torch's default). Tiling is off by default: tiled RCAN output differs from un-tiled output,
+# and `TILING_TOLERANCE` hasn't been validated on real parcels yet (see `server/services/sr4s/sr/README.md`)
+SR_TILE_SIZE = int(os.getenv("SR_TILE_SIZE", 0))
+SR_TILE_OVERLAP = int(os.getenv("SR_TILE_OVERLAP", 32))
+SR_TILE_BATCH = int(os.getenv("SR_TILE_BATCH", 4))
+SR_TILE_WORKERS = int(os.getenv("SR_TILE_WORKERS", 1))
+SR_NUM_THREADS = int(os.getenv("SR_NUM_THREADS", 0))
+SR_PRECISION = os.getenv("SR_PRECISION", "fp32")  # fp32 | bf16 | int8 (CPU only)
+
+# Sentinel Hub band downloads (parcels outside Andalusia): multiband | concurrent | sequential
+SH_DOWNLOAD_MODE = os.getenv("SH_DOWNLOAD_MODE", "multiband")
+
+# MinIO composites (Andalusia): `window` reads only the parcel window with range requests, `full` downloads whole tiles
+MINIO_READ_MODE = os.getenv("MINIO_READ_MODE", "window")
+# SR4S parcel pipeline intermediates (bands, mosaics, masks, SR image): `disk` writes GeoTIFFs to the request's workspace,
+# `memory` passes them between stages in memory (see `server/utils/memory_raster_utils.py`)
+RASTER_IO_MODE = os.getenv("RASTER_IO_MODE", "disk")
+# Byte budget of the on-disk MinIO band cache (0 disables it). Only `MINIO_READ_MODE=full` fills it
+BAND_CACHE_MAX_BYTES = int(os.getenv("BAND_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+
+# Export pipeline spans as OpenTelemetry traces (needs `opentelemetry-sdk` and `opentelemetry-exporter-otlp`, set up with the `OTEL_*` env vars)
+OTEL_TRACES_ENABLED = os.getenv("OTEL_TRACES_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Max chat sessions kept in memory; the least recently used are written to disk
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", 100))
+
+# Keep the system instructions in a Gemini context cache instead of sending them with every turn
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Compute each chat session's next input suggestion in the background after every model reply
+SUGGESTION_PREFETCH_ENABLED = os.getenv("SUGGESTION_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+SUGGESTION_PREFETCH_WORKERS = int(os.getenv("SUGGESTION_PREFETCH_WORKERS", 2))
+SUGGESTION_PREFETCH_TIMEOUT = float(os.getenv("SUGGESTION_PREFETCH_TIMEOUT", 10))  # seconds a request waits for a running prefetch
+
+# Load and warm up SR models and the Gemini chat at startup instead of on the first request
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "false").lower() in ("1", "true", "yes")
+
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY is not set in .env")
@@ -1,4 +1,11 @@
+from functools import lru_cache
+
 from google import genai
 from .env_config import GEMINI_API_KEY
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+@lru_cache(maxsize=1)
+def get_client() -> genai.Client:
+    """
+    Returns the process-wide Gemini client, created on first use.
+    """
+    return genai.Client(api_key=GEMINI_API_KEY)
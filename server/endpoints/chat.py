@@ -1,6 +1,7 @@
 import json
 import structlog
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from server.config.constants import DEFAULT_SESSION_ID
 from server.services.chat_service import *
 
 logger = structlog.get_logger()
@@ -13,12 +14,23 @@ def send_user_input():
         if not user_input:
             return jsonify({'error': 'No user input provided'}), 400
         
-        response_text = generate_user_response(user_input)
+        response_text = generate_user_response(user_input, get_session_id())
         
         return jsonify({'response': response_text})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@chat_bp.route('/send-user-input/stream', methods=['POST'])
+def stream_user_input():
+    """
+    Streaming version of `/send-user-input`: Server-Sent Events with the response's text `chunk`s as they are generated,
+    then `done` with the same response `/send-user-input` gives (or `error`).
+    """
+    user_input = request.form.get('userInput')
+    if not user_input:
+        return jsonify({'error': 'No user input provided'}), 400
+    return stream_chat_response(stream_user_response(user_input, get_session_id()), lambda text: text)
+
 @chat_bp.route('/send-image', methods=['POST'])
 def send_image():
     try:
@@ -27,7 +39,7 @@ def send_image():
         if not file:
             return jsonify({'error': 'No image file provided'}), 400
         
-        response_text = get_image_description(file, is_detailed_description)
+        response_text = get_image_description(file, is_detailed_description, get_session_id())
 
         return jsonify({'response': response_text})
     except Exception as e:
@@ -44,19 +56,37 @@ def send_parcel_info_to_chat():
         is_detailed_description: bool = "true" in str(request.form.get("isDetailedDescription")).lower()
         lang = request.form.get('lang')
 
-        response = get_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang)
+        response = get_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang, get_session_id())
 
         return jsonify({'response': response})
     except Exception as e:
         logger.exception("Error loading parcel to chat:\n")
         return jsonify({'error': str(e)}), 500
     
+@chat_bp.route('/load-parcel-data-to-chat/stream', methods=['POST'])
+def stream_parcel_info_to_chat():
+    """
+    Streaming version of `/load-parcel-data-to-chat`. Same events as `/send-user-input/stream`.
+    """
+    try:
+        image_date = request.form.get('imageDate').split("/")[-1]
+        land_uses = json.loads(request.form.get('landUses'))
+        query = json.loads(request.form.get('query'))
+        image_filename = request.form.get('imageFilename')
+        is_detailed_description: bool = "true" in str(request.form.get("isDetailedDescription")).lower()
+        lang = request.form.get('lang')
+
+        image_context_data, chunks = stream_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang, get_session_id())
+        return stream_chat_response(chunks, lambda text: {"text": text, "imageDesc": image_context_data})
+    except Exception as e:
+        logger.exception("Error loading parcel to chat:\n")
+        return jsonify({'error': str(e)}), 500
+
 @chat_bp.route('/get-input-suggestion', methods=['POST'])
 def get_input_suggestion():
     try:
         lang = request.form.get('lang')
-        chat_history = chat.get_history()
-        response = get_suggestion_for_chat(chat_history, lang)
+        response = get_suggestion_for_chat(lang, get_session_id())
         return jsonify({'response': response})
     except Exception as e:
         logger.exception("Error getting suggestion:\n")
@@ -65,9 +95,36 @@ def get_input_suggestion():
 @chat_bp.route('/load-active-chat-history', methods=['GET'])
 def load_active_chat_history():
     try:
-        chat_history = chat.get_history()
+        chat_history = get_chat(get_session_id()).get_history()
         response = get_role_and_content(chat_history)
         return jsonify({'response': response})
     except Exception as e:
         logger.exception("Error loading active history:\n")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def get_session_id() -> str:
+    """
+    Chat session of the request: the `X-Session-Id` header or `sessionId` form/query field, else the shared default session.
+    """
+    return request.headers.get('X-Session-Id') or request.values.get('sessionId') or DEFAULT_SESSION_ID
+
+def stream_chat_response(chunks, build_response) -> Response:
+    """
+    Streams a chat response as Server-Sent Events: one `chunk` event per text chunk, then `done` with
+    `build_response(full_text)` as `response`, or `error` if the model call fails midway.
+    """
+    def generate():
+        text = ""
+        try:
+            for chunk in chunks:
+                text += chunk
+                yield f"event: chunk\ndata: {json.dumps({'text': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'response': build_response(text)})}\n\n"
+        except Exception as e:
+            logger.exception("Error streaming chat response:\n")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
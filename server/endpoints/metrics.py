@@ -0,0 +1,62 @@
+from flask import Blueprint, Response
+
+from ..config.chat_config import CHAT_SESSIONS, CONTEXT_CACHE
+from ..services.chat_service import SUGGESTION_PREFETCHER
+from ..services.sen2sr.sr_image_cache import SR_IMAGE_CACHE
+from ..services.sigpac_tools_v2.session import RESPONSE_CACHE
+from ..utils.band_cache_utils import BAND_CACHE
+from ..utils.metrics_utils import register_collector, render_metrics, stats_samples
+from ..utils.model_registry import get_model_stats
+from ..utils.prompt_registry_utils import PROMPT_REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Exposes span durations (per pipeline stage and LLM call), counters, cache and model stats in the Prometheus text format.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+def collect_cache_metrics() -> list:
+    """
+    Hit/miss counters and sizes of the SR image, MinIO band and SIGPAC response caches.
+    """
+    samples = []
+    for cache in (SR_IMAGE_CACHE, BAND_CACHE):
+        samples += stats_samples("agria_cache", cache.stats(), cache=cache.name)
+    samples += stats_samples("agria_cache", RESPONSE_CACHE.stats(), cache="sigpac_responses")
+    return samples
+
+def collect_model_metrics() -> list:
+    """
+    Load state, load/warm-up time and memory footprint of the registered SR models.
+    """
+    samples = []
+    for name, stats in get_model_stats().items():
+        samples += stats_samples("agria_model", stats, model=name)
+    return samples
+
+def collect_chat_session_metrics() -> list:
+    """
+    Live and stored chat sessions, evictions and rehydrations, Gemini context cache creations and refreshes, and
+    suggestion prefetch hits and misses.
+    """
+    samples = stats_samples("agria_chat_sessions", CHAT_SESSIONS.stats())
+    samples += stats_samples("agria_context_cache", CONTEXT_CACHE.stats())
+    samples += stats_samples("agria_suggestion_prefetch", SUGGESTION_PREFETCHER.stats())
+    return samples
+
+def collect_prompt_metrics() -> list:
+    """
+    Estimated tokens per section of the system instructions, and prompt file reads served from memory.
+    """
+    samples = stats_samples("agria_prompt_registry", PROMPT_REGISTRY.stats())
+    for instructions, sections in PROMPT_REGISTRY.sections.copy().items():
+        samples += [("agria_prompt_tokens", {"instructions": instructions, "section": section}, float(tokens)) for section, tokens in sections.items()]
+    return samples
+
+register_collector(collect_cache_metrics)
+register_collector(collect_model_metrics)
+register_collector(collect_chat_session_metrics)
+register_collector(collect_prompt_metrics)
@@ -1,9 +1,13 @@
+import json
 import os
-from datetime import datetime
-from ..config.constants import TEMP_DIR
-from ..utils.parcel_finder_utils import check_cadastral_data, is_coord_in_zones, reset_dir
+from ..config.constants import BATCH_MAX_PARCELS, TEMP_DIR
+from ..utils.metrics_utils import span
+from ..utils.model_registry import get_model_stats
+from ..utils.parcel_finder_utils import check_cadastral_data, is_coord_in_zones
+from ..utils.workspace_utils import cleanup_expired_workspaces_throttled, create_workspace
 from ..services.parcel_finder_service import get_parcel_image
-from flask import Blueprint, make_response, request, jsonify, send_from_directory
+from ..services.parcel_job_service import get_job, iter_job_events, submit_batch_job, submit_parcel_job
+from flask import Blueprint, Response, make_response, request, jsonify, send_from_directory, stream_with_context
 
 parcel_finder_bp = Blueprint('find_parcel', __name__)
 
@@ -42,49 +46,146 @@ def find_parcel():
         3. Integrates with the L1BSR super-resolution pre-trained model to obtain a super-resolved image for the parcel and date.
         4. Sends super-resolved image to the upload directory.
         5. Constructs a response containing the cadastral reference, geometry, image URL, and metadata.
+    Each request works inside its own workspace, so several parcels can be fetched in parallel. Expired workspaces are garbage-collected on the way in, at most every `WORKSPACE_CLEANUP_INTERVAL`.
     Returns:
         response: A JSON response with the parcel data or an error message and appropriate HTTP status code.
     """
-    reset_dir(TEMP_DIR)
-    init = datetime.now()
+    cleanup_expired_workspaces_throttled()
+    workspace = create_workspace()
     try:
-        cadastral_reference = request.form.get('cadastralReference')
-        selected_date = request.form.get('selectedDate')
-        is_from_cadastral_reference = "True" in request.form.get('isFromCadastralReference')
-        parcel_geometry = None if request.form.get('parcelGeometry') == 'None' else request.form.get('parcelGeometry')
-        parcel_metadata = request.form.get('parcelMetadata')
-        coordinates = None if request.form.get('coordinates') is None else list(map(float, request.form.get('coordinates').split(',')))
-        province = request.form.get('province')
-        municipality = request.form.get('municipality')
-        polygon = request.form.get('polygon')
-        parcel_id = request.form.get('parcelId')
-        if is_from_cadastral_reference:
-            cadastral_reference = check_cadastral_data(cadastral_reference, province, municipality, polygon, parcel_id)
-
-        if not selected_date:
+        parcel_args = get_parcel_args_from_form(request.form)
+        if not parcel_args['date']:
             return jsonify({'error': 'No date provided'}), 400
         
         # Get image and store it for display
-        geometry, metadata, url_image_address = get_parcel_image(
-            cadastral_reference,
-            selected_date,
-            is_from_cadastral_reference,
-            parcel_geometry,
-            parcel_metadata,
-            coordinates,
-            get_sr_image=True
-            )
+        with span("find_parcel"):
+            geometry, metadata, url_image_address = get_parcel_image(**parcel_args, workspace=workspace)
 
         response = { 
-            "cadastralReference": cadastral_reference,
+            "cadastralReference": parcel_args['cadastral_reference'],
             "geometry": geometry,
             "imagePath": url_image_address,
             "metadata": metadata,
+            "stacDecodedBytes": workspace.stac_decoded_bytes,
         }
-        print(f"\nTOTAL TIME TAKEN: {datetime.now() - init}\n")
         return jsonify({'response': response})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        workspace.discard_intermediates()
+
+@parcel_finder_bp.route('/parcel-jobs', methods=['POST'])
+def submit_parcel_job_request():
+    """
+    Queues a parcel image job and returns immediately. Takes the same form data as `/find-parcel`.
+    Returns:
+        response: `202` with the job id and the URLs to poll or stream its progress.
+    """
+    try:
+        parcel_args = get_parcel_args_from_form(request.form)
+        if not parcel_args['date']:
+            return jsonify({'error': 'No date provided'}), 400
+
+        cleanup_expired_workspaces_throttled()
+        job = submit_parcel_job(parcel_args)
+        response = {
+            "jobId": job.id,
+            "statusUrl": f"/parcel-jobs/{job.id}",
+            "eventsUrl": f"/parcel-jobs/{job.id}/events",
+        }
+        return jsonify({'response': response}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@parcel_finder_bp.route('/parcel-batches', methods=['POST'])
+def submit_parcel_batch_request():
+    """
+    Queues a batch of parcels as one job. Expects a JSON body with a `parcels` list of `{cadastralReference, selectedDate}`
+    (`selectedDate` may be given once at the top level instead). Progress and results are read like any parcel job.
+    Returns:
+        response: `202` with the job id and the URLs to poll or stream its progress.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        default_date = data.get('selectedDate')
+        parcels = [{
+            "cadastral_reference": parcel.get('cadastralReference'),
+            "date": parcel.get('selectedDate') or default_date,
+        } for parcel in data.get('parcels') or []]
+        if not parcels:
+            return jsonify({'error': 'No parcels provided'}), 400
+        if len(parcels) > BATCH_MAX_PARCELS:
+            return jsonify({'error': f'Too many parcels ({len(parcels)} > {BATCH_MAX_PARCELS})'}), 400
+        if not all(parcel['cadastral_reference'] and parcel['date'] for parcel in parcels):
+            return jsonify({'error': 'Every parcel needs a cadastral reference and a date'}), 400
+
+        cleanup_expired_workspaces_throttled()
+        job = submit_batch_job(parcels)
+        response = {
+            "jobId": job.id,
+            "parcels": len(parcels),
+            "statusUrl": f"/parcel-jobs/{job.id}",
+            "eventsUrl": f"/parcel-jobs/{job.id}/events",
+        }
+        return jsonify({'response': response}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@parcel_finder_bp.route('/parcel-jobs/<job_id>', methods=['GET'])
+def get_parcel_job_status(job_id):
+    """
+    Returns a parcel job's status, stage history and, once done, the same response `/find-parcel` gives.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify({'response': job.to_dict()}), 200
+
+@parcel_finder_bp.route('/parcel-jobs/<job_id>/events', methods=['GET'])
+def stream_parcel_job_events(job_id):
+    """
+    Streams a parcel job's stage changes as Server-Sent Events. The last event is `done` (with the result) or `failed`.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+
+    def generate():
+        for event in iter_job_events(job):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            if event['stage'] in ('done', 'failed'):
+                event = {**job.to_dict(), **event}
+            yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+def get_parcel_args_from_form(form) -> dict:
+    """
+    Reads the parcel request form data shared by `/find-parcel` and `/parcel-jobs`.
+    Arguments:
+        form (ImmutableMultiDict): Request form data.
+    Returns:
+        parcel_args (dict): Keyword arguments for `get_parcel_image`.
+    """
+    cadastral_reference = form.get('cadastralReference')
+    is_from_cadastral_reference = "True" in str(form.get('isFromCadastralReference'))
+    if is_from_cadastral_reference:
+        cadastral_reference = check_cadastral_data(cadastral_reference, form.get('province'), form.get('municipality'), form.get('polygon'), form.get('parcelId'))
+
+    return {
+        "cadastral_reference": cadastral_reference,
+        "date": form.get('selectedDate'),
+        "is_from_cadastral_reference": is_from_cadastral_reference,
+        "parcel_geometry": None if form.get('parcelGeometry') == 'None' else form.get('parcelGeometry'),
+        "parcel_metadata": form.get('parcelMetadata'),
+        "coordinates": None if form.get('coordinates') is None else list(map(float, form.get('coordinates').split(','))),
+        "get_sr_image": True,
+    }
 
 @parcel_finder_bp.route('/is-coord-in-zone', methods=['POST'])
 def is_coord_in_zone():
@@ -96,6 +197,13 @@ def is_coord_in_zone():
 
     return jsonify({"response": is_coord_in_zones(lng, lat)}), 200
 
+@parcel_finder_bp.route('/sr-models', methods=['GET'])
+def sr_models():
+    """
+    Returns load state, load/warm-up time and memory footprint of the process-wide SR models.
+    """
+    return jsonify(get_model_stats()), 200
+
 @parcel_finder_bp.route('/uploads/<filename>')
 def uploaded_file(filename):
     response = make_response(
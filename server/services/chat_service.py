@@ -1,28 +1,101 @@
+import json
+import time
 import structlog
 
 from PIL import Image
-from google.genai.types import Content
+from google.genai.types import GenerateContentConfig
 
 from ..benchmark.vlm.ecoscheme_classif_algorithm import calculate_ecoscheme_payment_exclusive
-from ..config.chat_config import CHAT as chat
-from ..config.constants import FULL_DESC_TRIGGER, SHORT_DESC_TRIGGER, TEMP_DIR
-from ..config.llm_client import client
+from ..config.chat_config import get_chat, get_chat_session, get_session_history
+from ..config.constants import DEFAULT_SESSION_ID, FULL_DESC_TRIGGER, SHORT_DESC_TRIGGER, SUGGESTION_MODEL_NAME, SUMMARY_MAX_MESSAGE_CHARS, TEMP_DIR
+from ..config.env_config import CHAT_MAX_SESSIONS, SUGGESTION_PREFETCH_ENABLED, SUGGESTION_PREFETCH_TIMEOUT, SUGGESTION_PREFETCH_WORKERS
+from ..config.llm_client import get_client
 from ..utils.chat_utils import generate_image_context_data, save_image_and_get_path
+from ..utils.metrics_utils import counter, histogram, span
+from ..utils.suggestion_prefetch_utils import SuggestionPrefetcher
 
 logger = structlog.getLogger()
 
-def generate_user_response(user_input: str) -> str:
+LLM_TTFT_SECONDS = histogram("agria_llm_ttft_seconds", "Time to the first streamed token of a Gemini reply.")
+LLM_TOKENS = counter("agria_llm_tokens_total", "Gemini tokens per call, by kind (prompt, cached, output).")
+
+# Next suggestion of each session, computed in the background after each model reply
+SUGGESTION_PREFETCHER = SuggestionPrefetcher(lambda session, lang: generate_suggestion(session, lang), SUGGESTION_PREFETCH_WORKERS, CHAT_MAX_SESSIONS, SUGGESTION_PREFETCH_TIMEOUT)
+
+# Structured output of the suggestion call (see `generate_suggestion`)
+SUGGESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"summary": {"type": "STRING"}, "suggestion": {"type": "STRING"}},
+    "required": ["summary", "suggestion"],
+}
+
+def generate_user_response(user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
     """
     Sends user input to chat and retrieves output.
     Args:
         user_input (str): User input fron frontend.
+        session_id (str): _Optional_; Chat session. Default is `DEFAULT_SESSION_ID`.
     Returns:
         response.text (str): Response from model.
     """
-    response = chat.send_message(user_input,)
+    with span("llm_chat"):
+        SUGGESTION_PREFETCHER.cancel(session_id)
+        response = get_chat(session_id).send_message(user_input,)
+    record_token_usage(response, "llm_chat")
+    prefetch_suggestion(session_id)
     return response.text
 
-def get_image_description(file, is_detailed_description):
+def stream_user_response(user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Streaming version of `generate_user_response`.
+    Args:
+        user_input (str): User input fron frontend.
+        session_id (str): _Optional_; Chat session. Default is `DEFAULT_SESSION_ID`.
+    Yields:
+        chunk (str): Text of the model's response, as it is generated.
+    """
+    yield from stream_chat_message(user_input, "llm_chat_stream", session_id)
+
+def stream_chat_message(message, name: str, session_id: str = DEFAULT_SESSION_ID, lang: str = None):
+    """
+    Sends a message to the chat with the SDK's streaming API, recording the time to first token in `agria_llm_ttft_seconds`.
+    Args:
+        message (str | list): Message (text, or image and text parts).
+        name (str): Span/metric name of the call.
+        session_id (str): _Optional_; Chat session. Default is `DEFAULT_SESSION_ID`.
+        lang (str): _Optional_; Interface language, for the suggestion prefetched once the response is complete.
+    Yields:
+        chunk (str): Non-empty text chunks of the response.
+    """
+    with span(name):
+        start = time.perf_counter()
+        first_token = True
+        last_chunk = None
+        SUGGESTION_PREFETCHER.cancel(session_id)
+        for chunk in get_chat(session_id).send_message_stream(message):
+            last_chunk = chunk
+            if not chunk.text:
+                continue
+            if first_token:
+                LLM_TTFT_SECONDS.observe(time.perf_counter() - start, call=name)
+                first_token = False
+            yield chunk.text
+        record_token_usage(last_chunk, name)
+    prefetch_suggestion(session_id, lang)
+
+def record_token_usage(response, name: str):
+    """
+    Adds a Gemini response's token counts to `agria_llm_tokens_total`. `cached` tokens come from the context cache and
+    are also part of `prompt`.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, count in (("prompt", usage.prompt_token_count), ("cached", usage.cached_content_token_count), ("output", usage.candidates_token_count)):
+        if count:
+            LLM_TOKENS.inc(count, call=name, kind=kind)
+
+def get_image_description(file, is_detailed_description, session_id: str = DEFAULT_SESSION_ID):
     """
     Handles the image upload and description generation.
     """
@@ -33,11 +106,15 @@ def get_image_description(file, is_detailed_description):
     image_desc_prompt =  FULL_DESC_TRIGGER +"\n" if is_detailed_description else SHORT_DESC_TRIGGER
     image_desc_prompt += image_context_prompt
 
-    response = chat.send_message([image, image_desc_prompt],)
+    with span("llm_image_description"):
+        SUGGESTION_PREFETCHER.cancel(session_id)
+        response = get_chat(session_id).send_message([image, image_desc_prompt],)
+    record_token_usage(response, "llm_image_description")
+    prefetch_suggestion(session_id)
 
     return response.text
 
-def get_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang):
+def get_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang, session_id: str = DEFAULT_SESSION_ID):
     """
     Handles the parcel information reading and description.
     Args:
@@ -47,29 +124,19 @@ def get_parcel_description(image_date, land_uses, query, image_filename, is_deta
         image_filename (str): Name of the image file.
         is_detailed_description (bool): If True, generates a detailed description; otherwise, a short one.
         lang (str): Current interface language (`es`/ `en`).
+        session_id (str): _Optional_; Chat session. Default is `DEFAULT_SESSION_ID`.
     Returns:
         response (dict:{text:str, imagedesc:str}): Contains the text response and image description.
     """
     try:
-        logger.info("Retrieveing parcel data...")
-        image_context_data = generate_image_context_data(image_date, land_uses, query)
-        json_data = calculate_ecoscheme_payment_exclusive(image_context_data[lang], lang)
-        logger.debug(f"JSON DATA:\n{json_data}")
-        # Insert image context prompt and read image desc file
-        desc_trigger =  FULL_DESC_TRIGGER if is_detailed_description else SHORT_DESC_TRIGGER
-        image_desc_prompt = desc_trigger+"\n"+image_context_data[lang]
-
-        image_indication_options ={
-            'es': "Estas son las características de la parcela cuya imagen te paso. Tenlo en cuenta para tu descripción en español. Comprueba el siguiente prompt para ver si es necesario cambiar el idioma:",
-            'en': "These are the parcel's features whose image I am sending you. Take them into account for your description in English. Check next prompt for language change if needed:"
-        }
-        image_indication_prompt  = str(f"{desc_trigger}\n{image_indication_options[lang]}\n\n{json_data}")
-        # Open image from path
-        image_path = TEMP_DIR / str(image_filename).split("?")[0]
-        image = Image.open(image_path)
-
+        message, image_context_data = get_parcel_description_message(image_date, land_uses, query, image_filename, is_detailed_description, lang)
+        with span("llm_parcel_description"):
+            SUGGESTION_PREFETCHER.cancel(session_id)
+            chat_response = get_chat(session_id).send_message(message,)
+        record_token_usage(chat_response, "llm_parcel_description")
+        prefetch_suggestion(session_id, lang)
         response = {
-            "text": chat.send_message([image, image_indication_prompt],).text,
+            "text": chat_response.text,
             "imageDesc":image_context_data
         }
 
@@ -78,53 +145,136 @@ def get_parcel_description(image_date, land_uses, query, image_filename, is_deta
         print(f"Error while getting parcel description:\t{e}")
         raise
 
-def get_suggestion_for_chat(chat_history: list[Content], lang: str):
+def stream_parcel_description(image_date, land_uses, query, image_filename, is_detailed_description, lang, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Streaming version of `get_parcel_description`.
+    Returns:
+        image_context_data (dict): Image description data, per language.
+        chunks (generator): Text chunks of the model's description, as they are generated.
+    """
+    message, image_context_data = get_parcel_description_message(image_date, land_uses, query, image_filename, is_detailed_description, lang)
+    return image_context_data, stream_chat_message(message, "llm_parcel_description_stream", session_id, lang)
+
+def get_parcel_description_message(image_date, land_uses, query, image_filename, is_detailed_description, lang):
+    """
+    Builds the parcel description message: the parcel image, and a prompt with its features and eco-scheme payments.
+    Returns:
+        message (list): Image and prompt to send to the chat.
+        image_context_data (dict): Image description data, per language.
+    """
+    logger.info("Retrieveing parcel data...")
+    image_context_data = generate_image_context_data(image_date, land_uses, query)
+    json_data = calculate_ecoscheme_payment_exclusive(image_context_data[lang], lang)
+    logger.debug(f"JSON DATA:\n{json_data}")
+    # Insert image context prompt and read image desc file
+    desc_trigger =  FULL_DESC_TRIGGER if is_detailed_description else SHORT_DESC_TRIGGER
+    image_desc_prompt = desc_trigger+"\n"+image_context_data[lang]
+
+    image_indication_options ={
+        'es': "Estas son las características de la parcela cuya imagen te paso. Tenlo en cuenta para tu descripción en español. Comprueba el siguiente prompt para ver si es necesario cambiar el idioma:",
+        'en': "These are the parcel's features whose image I am sending you. Take them into account for your description in English. Check next prompt for language change if needed:"
+    }
+    image_indication_prompt  = str(f"{desc_trigger}\n{image_indication_options[lang]}\n\n{json_data}")
+    # Open image from path
+    image_path = TEMP_DIR / str(image_filename).split("?")[0]
+    image = Image.open(image_path)
+
+    return [image, image_indication_prompt], image_context_data
+
+def get_suggestion_for_chat(lang: str, session_id: str = DEFAULT_SESSION_ID):
     """
     Provides a suggested input for the model's last chat output.
     Args:
-        last_chat_output (str): Model's last chat output.
+        lang (str): Current interface language (`es`/ `en`).
+        session_id (str): _Optional_; Chat session. Default is `DEFAULT_SESSION_ID`.
     Returns:
         suggestion (str): Suggestion for the user to input.
     """
     try:
-        last_user_content_entry = chat_history[-1]
-        last_message = ""
-        for part in last_user_content_entry.parts:
-            if part.text is not None:
-                last_message = part.text
-                break
-        summarised_chat = "### CHAT_SUMMARY_START ###\n" + get_summarised_chat(chat_history) + "\n### CHAT_SUMMARY_END ###"
-        last_chat_output = "### LAST_OUTPUT_START ###\n" + str(last_message) + "### LAST_OUTPUT_END ###"
-        language = "Spanish" if lang == "es" else "English"
-        suggestion_prompt = f"Using the summary as context, provide an appropiate 300-character max response in {language} to this chat output. You are acting as a user. Do not use any data not mentioned. Questions are heavily encouraged. Limit the use of expressions such as 'Genial','Excelente', etc..:\n\n"
-        suggestion = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[suggestion_prompt, summarised_chat, last_chat_output]
-        )
-        return suggestion.text
+        session = get_chat_session(session_id)
+        session.state["lang"] = lang
+        suggestion = SUGGESTION_PREFETCHER.get(session.id, get_history_marker(session), lang)
+        return suggestion if suggestion is not None else generate_suggestion(session, lang)
     except Exception as e:
         print(f"Error getting suggestion:\t{e}")
 
-def get_summarised_chat(chat_history):
+def prefetch_suggestion(session_id: str, lang: str = None):
+    """
+    Starts computing the session's next suggestion in the background (see `SuggestionPrefetcher`), in `lang` or else
+    the language of its last suggestion. Does nothing if neither is known yet.
+    """
+    if not SUGGESTION_PREFETCH_ENABLED:
+        return
+    try:
+        session = get_chat_session(session_id)
+        if lang:
+            session.state["lang"] = lang
+        if session.state.get("lang"):
+            SUGGESTION_PREFETCHER.schedule(session, get_history_marker(session), session.state["lang"])
+    except Exception as e:
+        print(f"⚠️ Could not prefetch the suggestion:\t{e}")
+
+def get_history_marker(session) -> int:
     """
-    Provides a summary of the chat history.
+    Position of the end of a session's history, counting the entries trimmed from it.
+    """
+    return session.trimmed + len(get_session_history(session.chat))
+
+def generate_suggestion(session, lang: str) -> str:
+    """
+    Generates a suggestion with a single Gemini call, which also folds the turns since the previous call into the
+    session's rolling summary (`state["summary"]`), so the history is never summarised from scratch. The summary is
+    only replaced by one covering more of the history.
     Args:
-        chat_history (list[genai.types.Content]): Chat history.
+        session (ChatSession): Chat session.
+        lang (str): Current interface language (`es`/ `en`).
     Returns:
-        summarised_chat.text (str): The summary of the history.
+        suggestion (str): Suggestion for the user to input.
     """
-    try:
-        chat_message_history = get_role_and_content(chat_history)
-        summarised_chat = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[
-                "Summarise this chat history in 100 words aprox. If too long, make emphasis on the last 5 items of the chat:",
-                str(chat_message_history)
-            ]
+    chat_history = session.chat.get_history()
+    session_history = get_session_history(session.chat)
+    marker = session.trimmed + len(session_history)
+    summary = session.state.get("summary", "")
+    # History entries (counting those trimmed) already in the summary
+    summarised = session.state.get("summarised", 0)
+    new_messages = [
+        {"role": message["role"], "content": message["content"][:SUMMARY_MAX_MESSAGE_CHARS]}
+        for message in get_role_and_content(session_history[max(summarised - session.trimmed, 0):])
+    ]
+    last_message = ""
+    for part in chat_history[-1].parts:
+        if part.text is not None:
+            last_message = part.text
+            break
+
+    summary_prompt = "### CHAT_SUMMARY_START ###\n" + summary + "\n### CHAT_SUMMARY_END ###"
+    new_messages_prompt = "### NEW_MESSAGES_START ###\n" + str(new_messages) + "\n### NEW_MESSAGES_END ###"
+    last_chat_output = "### LAST_OUTPUT_START ###\n" + str(last_message) + "### LAST_OUTPUT_END ###"
+    language = "Spanish" if lang == "es" else "English"
+    suggestion_prompt = (
+        "Return a JSON object with two fields:\n"
+        "- `summary`: the chat summary updated with the new messages, in 100 words aprox. If too long, make emphasis on the last 5 items of the chat.\n"
+        f"- `suggestion`: using the summary as context, an appropiate 300-character max response in {language} to the last chat output. You are acting as a user. Do not use any data not mentioned. Questions are heavily encouraged. Limit the use of expressions such as 'Genial','Excelente', etc..\n\n"
+    )
+    with span("llm_suggestion"):
+        response = get_client().models.generate_content(
+            model=SUGGESTION_MODEL_NAME,
+            contents=[suggestion_prompt, summary_prompt, new_messages_prompt, last_chat_output],
+            config=GenerateContentConfig(response_mime_type="application/json", response_schema=SUGGESTION_SCHEMA)
         )
-        return summarised_chat.text
-    except Exception as e:
-        print(f"Error while summarising chat:\t{e}")
+    record_token_usage(response, "llm_suggestion")
+
+    try:
+        data = json.loads(response.text)
+        summary, suggestion = data.get("summary") or summary, data["suggestion"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        # Not the requested JSON: use the whole reply as the suggestion and keep the summary
+        return response.text
+    with session.lock:
+        # A prefetch still running when a newer call finished must not roll the summary back
+        if marker > session.state.get("summarised", 0):
+            session.state.update(summary=summary, summarised=marker)
+    return suggestion
 
 def get_role_and_content(chat_history):
     """
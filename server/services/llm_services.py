@@ -1,5 +1,5 @@
 from ..config.constants import MIME_TYPES
-from ..config.llm_client import client
+from ..config.llm_client import get_client
 import pathlib
 
 def upload_context_document(context_file_path: str) -> str:
@@ -16,7 +16,7 @@ def upload_context_document(context_file_path: str) -> str:
     if context_file_path and pathlib.Path(context_file_path).exists():
         try:
             mime_type = MIME_TYPES.get(context_file_path.split(".")[-1].lower(), 'application/octet-stream')
-            uploaded_file = client.files.upload(
+            uploaded_file = get_client().files.upload(
                 file=pathlib.Path(context_file_path),
                 config=dict(mime_type=mime_type, display_name= pathlib.Path(context_file_path).name)
             )
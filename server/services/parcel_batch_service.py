@@ -0,0 +1,107 @@
+import os
+import time
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+from shapely.geometry import mapping, shape
+from shapely.ops import unary_union
+
+from .parcel_finder_service import get_sr_date_window
+from .sen2sr.constants import BANDS
+from .sen2sr.get_sr_image import crop_parcel_from_sr_tif, download_sentinel_cubo, super_resolve_cube
+from .sen2sr.utils import lonlat_to_utm_epsg, reorder_bands, save_to_tif
+from .sigpac_tools_v2.find import find_from_cadastral_registry
+from ..config.constants import BATCH_GEOMETRY_WORKERS
+from ..utils.job_utils import report_stage
+from ..utils.metrics_utils import span
+from ..utils.parcel_batch_utils import ParcelGroup, plan_parcel_groups
+from ..utils.tile_index_utils import get_tiles_for_geometries
+from ..utils.workspace_utils import create_workspace
+
+def process_parcel_batch(parcels: list[dict]) -> list[dict]:
+    """
+    Gets the SR images of many parcels at once. Parcels sharing a Sentinel-2 tile, a date and a neighbourhood
+    (see `plan_parcel_groups`) are fetched as one cube and super-resolved in one model pass, then cropped one by one.
+    A parcel that fails does not fail the batch: its result carries the `error` instead.
+    Arguments:
+        parcels (list[dict]): Parcels to process, each with its `cadastral_reference` and `date` (`YYYY-MM-DD`).
+    Returns:
+        results (list[dict]): One result per parcel, in input order, like the `/find-parcel` response (`cadastralReference`, `geometry`, `imagePath`, `metadata`) plus `date` and `error`.
+    """
+    report_stage("geometry", parcels=len(parcels))
+    results = resolve_parcel_geometries(parcels)
+    found = [result for result in results if not result["error"]]
+
+    with span("tile_lookup"):
+        groups = plan_parcel_groups(found, get_tiles_for_geometries([result["geometry"] for result in found])) if found else []
+    print(f"📦 Batch of {len(parcels)} parcels: {len(found)} found, {len(groups)} cubes to super-resolve")
+    for i, group in enumerate(groups):
+        try:
+            with span("parcel_group", parcels=len(group.parcels)):
+                process_parcel_group(group, i)
+        except Exception as e:
+            traceback.print_exc()
+            for result in group.parcels:
+                result["error"] = str(e)
+
+    print(f"✅ Batch done ({sum(not result['error'] for result in results)}/{len(parcels)} parcels)")
+    return results
+
+def resolve_parcel_geometries(parcels: list[dict]) -> list[dict]:
+    """
+    Looks up the geometry and metadata of every parcel in SIGPAC, `BATCH_GEOMETRY_WORKERS` at a time.
+    Returns the (partial) results of `process_parcel_batch`.
+    """
+    def resolve(parcel: dict) -> dict:
+        result = {
+            "cadastralReference": parcel["cadastral_reference"],
+            "date": parcel["date"],
+            "geometry": None,
+            "metadata": None,
+            "imagePath": None,
+            "error": None,
+        }
+        try:
+            with span("sigpac_lookup"):
+                result["geometry"], result["metadata"] = find_from_cadastral_registry(parcel["cadastral_reference"])
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    with ThreadPoolExecutor(max_workers=BATCH_GEOMETRY_WORKERS) as executor:
+        return list(executor.map(resolve, parcels))
+
+def process_parcel_group(group: ParcelGroup, index: int = 0):
+    """
+    Downloads the cloudless cube covering a group's parcels, super-resolves it and crops each parcel from it.
+    Fills the parcels' `imagePath` in place.
+    """
+    lon, lat = group.center_lonlat()
+    size = group.cube_size()
+    crs = lonlat_to_utm_epsg(lon, lat)
+    start_date, end_date = get_sr_date_window(group.date)
+    union = mapping(unary_union([shape(result["geometry"]) for result in group.parcels]))
+
+    report_stage("download", group=index, tiles=sorted(group.tiles), parcels=len(group.parcels), size=size)
+    cloudless_image_data, sample_date, decoded_bytes = download_sentinel_cubo(lat, lon, BANDS, start_date, end_date, size, crs, geometry=union)
+
+    report_stage("sr", group=index, size=size, decoded_bytes=decoded_bytes)
+    original_s2_numpy, superX = super_resolve_cube(cloudless_image_data, size)
+    _, superX_reordered = reorder_bands(original_s2_numpy, superX)
+    workspace = create_workspace()
+    try:
+        save_to_tif(superX_reordered, workspace.sr_tif_filepath, cloudless_image_data, crs)
+
+        report_stage("crop", group=index, parcels=len(group.parcels))
+        for result in group.parcels:
+            parcel_workspace = create_workspace()
+            try:
+                parcel_workspace.write_geometry(result["geometry"])
+                image_path = crop_parcel_from_sr_tif(workspace.sr_tif_filepath, sample_date, parcel_workspace)
+                result["imagePath"] = f"{os.getenv('API_URL')}/uploads/{os.path.basename(image_path)}?v={int(time.time())}"
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                parcel_workspace.discard_intermediates()
+    finally:
+        workspace.discard_intermediates()
@@ -0,0 +1,164 @@
+import threading
+import time
+import traceback
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .parcel_batch_service import process_parcel_batch
+from .parcel_finder_service import get_parcel_image
+from ..config.constants import PARCEL_JOB_TTL
+from ..config.env_config import PARCEL_JOB_WORKERS
+from ..utils.job_utils import stage_listener
+from ..utils.workspace_utils import create_workspace
+
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=PARCEL_JOB_WORKERS, thread_name_prefix="parcel-job")
+JOBS: dict = {}
+JOBS_LOCK = threading.Lock()
+
+@dataclass
+class ParcelJob:
+    """
+    State of a parcel image job. `status` goes `queued` → `running` → `done` | `failed`, and
+    `events` records every pipeline stage reached, in order.
+    """
+    id: str
+    status: str = "queued"
+    stage: str | None = None
+    events: list = field(default_factory=list)
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    condition: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def add_event(self, stage: str, details: dict = None):
+        with self.condition:
+            self.stage = stage
+            self.events.append({"stage": stage, "timestamp": time.time(), **(details or {})})
+            self.condition.notify_all()
+
+    def finish(self, status: str, result: dict = None, error: str = None):
+        with self.condition:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append({"stage": status, "timestamp": self.finished_at})
+            self.condition.notify_all()
+
+    def to_dict(self) -> dict:
+        with self.condition:
+            return {
+                "jobId": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "events": list(self.events),
+                "result": self.result,
+                "error": self.error,
+            }
+
+def submit_parcel_job(parcel_args: dict) -> ParcelJob:
+    """
+    Queues a parcel image job on the bounded job worker pool.
+    Arguments:
+        parcel_args (dict): Keyword arguments for `get_parcel_image` (without `workspace`).
+    Returns:
+        job (ParcelJob): The queued job. Poll it with `get_job`.
+    """
+    return submit_job(run_parcel_job, parcel_args)
+
+def submit_batch_job(parcels: list[dict]) -> ParcelJob:
+    """
+    Queues a batch of parcels (see `process_parcel_batch`) as a single job.
+    Arguments:
+        parcels (list[dict]): Parcels, each with its `cadastral_reference` and `date`.
+    Returns:
+        job (ParcelJob): The queued job. Its result is `{"parcels": [...]}`.
+    """
+    return submit_job(run_batch_job, parcels)
+
+def submit_job(run, *args) -> ParcelJob:
+    prune_finished_jobs()
+    job = ParcelJob(id=uuid.uuid4().hex)
+    with JOBS_LOCK:
+        JOBS[job.id] = job
+    JOB_EXECUTOR.submit(run, job, *args)
+    return job
+
+def run_parcel_job(job: ParcelJob, parcel_args: dict):
+    """
+    Runs `get_parcel_image` for a job in its own workspace, recording each stage reached.
+    """
+    token = stage_listener.set(job.add_event)
+    workspace = create_workspace()
+    try:
+        with job.condition:
+            job.status = "running"
+        geometry, metadata, url_image_address = get_parcel_image(**parcel_args, workspace=workspace)
+        job.finish("done", result={
+            "cadastralReference": parcel_args.get("cadastral_reference"),
+            "geometry": geometry,
+            "imagePath": url_image_address,
+            "metadata": metadata,
+            "stacDecodedBytes": workspace.stac_decoded_bytes,
+        })
+    except Exception as e:
+        traceback.print_exc()
+        job.finish("failed", error=str(e))
+    finally:
+        workspace.discard_intermediates()
+        stage_listener.reset(token)
+
+def run_batch_job(job: ParcelJob, parcels: list[dict]):
+    """
+    Runs `process_parcel_batch` for a job, recording each stage reached.
+    """
+    token = stage_listener.set(job.add_event)
+    try:
+        with job.condition:
+            job.status = "running"
+        job.finish("done", result={"parcels": process_parcel_batch(parcels)})
+    except Exception as e:
+        traceback.print_exc()
+        job.finish("failed", error=str(e))
+    finally:
+        stage_listener.reset(token)
+
+def get_job(job_id: str) -> ParcelJob | None:
+    with JOBS_LOCK:
+        return JOBS.get(job_id)
+
+def iter_job_events(job: ParcelJob, heartbeat: float = 15.0):
+    """
+    Yields the job's events as they happen, until the job finishes.
+    Yields `None` every `heartbeat` seconds without news so streams can send keep-alives.
+    """
+    sent = 0
+    while True:
+        with job.condition:
+            if sent == len(job.events) and not job.is_finished:
+                job.condition.wait(timeout=heartbeat)
+            new_events = job.events[sent:]
+            finished = job.is_finished
+        sent += len(new_events)
+        if new_events:
+            yield from new_events
+        elif not finished:
+            yield None
+        if finished and sent == len(job.events):
+            return
+
+def prune_finished_jobs(ttl: int = PARCEL_JOB_TTL):
+    """
+    Drops finished jobs older than `ttl` seconds.
+    """
+    expiry = time.time() - ttl
+    with JOBS_LOCK:
+        for job_id in [job_id for job_id, job in JOBS.items() if job.finished_at and job.finished_at < expiry]:
+            del JOBS[job_id]
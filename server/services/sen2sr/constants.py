@@ -1,25 +1,23 @@
 import pathlib as Path
 import os
 
-from ...config.constants import SEN2SR_SR_DIR
-
 CURR_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CURR_SCRIPT_DIR = Path.Path(CURR_SCRIPT_DIR)
 
 MODEL_DIR = str(CURR_SCRIPT_DIR / "model")
-PNG_DIR = SEN2SR_SR_DIR / "png"
-TIF_DIR = SEN2SR_SR_DIR / "tif"
-
-OG_TIF_FILEPATH = TIF_DIR / "original.tif"
-SR_TIF_FILEPATH = TIF_DIR / "superres.tif"
+MODEL_ID = "SEN2SRLite/NonReference_RGBN_x4"
+MODEL_URL = f"https://huggingface.co/tacofoundation/sen2sr/resolve/main/{MODEL_ID}/mlm.json"
+WARMUP_SIZE = 128  # px; SEN2SR patch size, also used as the warm-up input
 
-OG_PNG_FILEPATH = str(OG_TIF_FILEPATH).replace("tif", "png")
-SR_PNG_FILEPATH = str(SR_TIF_FILEPATH).replace("tif", "png")
-COMPARISON_PNG_FILEPATH = SEN2SR_SR_DIR / "OG-SR_comparison.png"
+BANDS = ["B08", "B02", "B03", "B04", "SCL"]  # NIR + RGB + SCL
 
-GEOJSON_FILEPATH = SEN2SR_SR_DIR / "polygon.geojson"
+# Scene Classification (SCL) values: no data, and unclassified / cloud medium & high probability / thin cirrus
+SCL_NO_DATA = 0
+SCL_CLOUD_CLASSES = [7, 8, 9, 10]
+SCL_RESOLUTION = 20  # m; SCL's native resolution
 
-BANDS = ["B08", "B02", "B03", "B04", "SCL"]  # NIR + RGB + SCL
+# Fetch the SCL band first to choose the date, then the spectral bands of that date only (see `download_sentinel_cubo`)
+TWO_PHASE_FETCH = True
 
 # Bounding box for mainland Spain (lon_min, lat_min, lon_max, lat_max)
 SPAIN_MAINLAND = (-9.3, 36.0, 3.3, 43.8)
@@ -1,7 +1,7 @@
+import math
 import time
 import cubo
 import json
-import mlstac
 import rasterio
 import rioxarray  # needed to access .rio on xarray objects
 import sen2sr
@@ -11,12 +11,20 @@ import numpy as np
 
 from datetime import datetime, timedelta
 from rasterio.mask import mask
+from typing import Callable
 
 from .constants import *
-from .utils import lonlat_to_utm_epsg, save_to_png, save_to_tif, get_cloudless_time_indices, make_pixel_faithful_comparison, reorder_bands
-from ...config.constants import RESOLUTION, TEMP_DIR
+from .model_loader import DEVICE, get_sen2sr_model
+from .sr_image_cache import get_cached_parcel_image, get_cached_parcel_image_for_window, get_geometry_digest, get_parcel_image_key, get_window_key, remember_window, store_parcel_image
+from .utils import lonlat_to_utm_epsg, save_to_png, save_to_tif, get_cloudless_time_indices, get_parcel_mask, make_pixel_faithful_comparison, reorder_bands
+from ...config.constants import GET_SR_BENCHMARK, RESOLUTION
+from ...utils.job_utils import report_stage, sr_inference_slot
+from ...utils.metrics_utils import counter, span, timed
+from ...utils.workspace_utils import Workspace, create_workspace
 
-def get_sr_image(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int):
+STAC_DECODED_BYTES = counter("agria_stac_decoded_bytes_total", "Decoded size of the imagery read from the STAC source (in-memory pixels, not bytes transferred).")
+
+def get_sr_image(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int, workspace: Workspace = None, use_cache: bool = not GET_SR_BENCHMARK):
     """
     Get SR image from downloaded Sentinel's imagery data and load up SEN2SR model from HuggingFace to Super-Resolve it
     Arguments:
@@ -26,66 +34,107 @@ def get_sr_image(lat: float, lon: float, bands: list, start_date: str, end_date:
         start_date (str): Intial date in search range
         end_date (str): Final date in search range
         size (int): Image size in px.
+        workspace (Workspace): _Optional_; Request-scoped working dir. A new one is created if not provided.
+        use_cache (bool): _Optional_; Look up and store the cropped SR parcel image in the persistent SR image cache. Disabled while benchmarking.
     Returns:
         sr_image_filepath (str): Local filepath to SR image.
     """
+    workspace = workspace or create_workspace()
     try:
         # Ensure sizeis right (minimum for SEN2SR)
         print(f"Image size {size}x{size}px")
-        # Download model
-        if not os.path.exists(MODEL_DIR) or len(os.listdir(MODEL_DIR)) == 0:
-            mlstac.download(
-                file="https://huggingface.co/tacofoundation/sen2sr/resolve/main/SEN2SRLite/NonReference_RGBN_x4/mlm.json",
-                output_dir= MODEL_DIR,
-            )
-       
+        if use_cache:
+            geometry_digest = get_geometry_digest(workspace.geojson_filepath)
+            window_key = get_window_key(geometry_digest, start_date, end_date, size)
+            cached_image_filepath = get_cached_parcel_image_for_window(window_key, end_date, workspace)
+            if cached_image_filepath:
+                return str(cached_image_filepath)
+
         # Prepare data
         crs = lonlat_to_utm_epsg(lon, lat)
-        cloudless_image_data, sample_date = download_sentinel_cubo(lat, lon, bands, start_date, end_date, size, crs)
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        original_s2_numpy = (cloudless_image_data.compute().to_numpy() / 10_000).astype("float32")
-        X = torch.from_numpy(original_s2_numpy).float().to(device)
-        X = torch.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
-
-        # Load
-        model = mlstac.load((MODEL_DIR)).compiled_model(device=device)
-        
-        # Apply model for normal or large size images
-        if  size <= 128:
-            superX = model(X[None]).squeeze(0)
-        else:
-            superX = sen2sr.predict_large(
-                model=model,
-                X=X, # The input tensor
-                overlap=32, # The overlap between the patches
-            )
+        restored = []
+        def restore_cached_image(acq_date: str) -> bool:
+            # Called once the acquisition date is chosen (two-phase fetch), before the spectral bands are fetched
+            cached_image_filepath = get_cached_parcel_image(get_parcel_image_key(geometry_digest, acq_date, size), workspace)
+            if cached_image_filepath:
+                restored.append(cached_image_filepath)
+            return cached_image_filepath is not None
+
+        cloudless_image_data, sample_date, decoded_bytes = download_sentinel_cubo(lat, lon, bands, start_date, end_date, size, crs, geometry=read_parcel_geometry(workspace), skip_date=restore_cached_image if use_cache else None)
+        workspace.stac_decoded_bytes += decoded_bytes
+        if use_cache:
+            image_key = get_parcel_image_key(geometry_digest, sample_date, size)
+            cached_image_filepath = restored[0] if restored else get_cached_parcel_image(image_key, workspace)
+            if cached_image_filepath:
+                remember_window(window_key, image_key)
+                return str(cached_image_filepath)
+            print(f"🆕 SR parcel image not cached ({image_key[:12]}…)")
+
+        report_stage("sr", size=size, decoded_bytes=decoded_bytes)
+        original_s2_numpy, superX = super_resolve_cube(cloudless_image_data, size)
 
         # Reorder bands ( [NIR, B, G, R] -> [R, G, B, NIR])
         original_s2_reordered, superX_reordered = reorder_bands(original_s2_numpy, superX)
         
         # Save original and super-res images in TIF & PNG
-        save_to_tif(original_s2_reordered, OG_TIF_FILEPATH, cloudless_image_data, crs)
-        save_to_tif(superX_reordered, SR_TIF_FILEPATH, cloudless_image_data, crs)
+        save_to_tif(original_s2_reordered, workspace.og_tif_filepath, cloudless_image_data, crs)
+        save_to_tif(superX_reordered, workspace.sr_tif_filepath, cloudless_image_data, crs)
 
-        save_to_png(original_s2_reordered, OG_PNG_FILEPATH, lat)
-        save_to_png(superX_reordered, SR_PNG_FILEPATH, lat)
+        save_to_png(original_s2_reordered, workspace.og_png_filepath, lat)
+        save_to_png(superX_reordered, workspace.sr_png_filepath, lat)
 
         # Make comparison grid
-        make_pixel_faithful_comparison(original_s2_reordered, superX_reordered)
+        make_pixel_faithful_comparison(original_s2_reordered, superX_reordered, output_path=workspace.comparison_png_filepath)
 
         # Get and save cropped sr parcel image
-        sr_image_filepath = str(crop_parcel_from_sr_tif(SR_TIF_FILEPATH, sample_date))
+        report_stage("crop")
+        sr_image_filepath = str(crop_parcel_from_sr_tif(workspace.sr_tif_filepath, sample_date, workspace))
+        if use_cache:
+            store_parcel_image(image_key, sr_image_filepath, workspace.tif_dir / f"SR_{sample_date}.tif", {
+                "acquisition_date": sample_date,
+                "size": size,
+                "model_id": MODEL_ID,
+            }, window_key)
         return sr_image_filepath
     except Exception as e:
         print(f"An error occurred (get_sr_image SEN2SR): {str(e)}")
         raise
 
+def super_resolve_cube(cloudless_image_data, size: int):
+    """
+    Runs SEN2SR on a cloudless `[NIR, B, G, R]` image. Images larger than the model's patch are processed patch by patch (`sen2sr.predict_large`).
+    Arguments:
+        cloudless_image_data (DataArray): Image from `download_sentinel_cubo`, in reflectance x 10000.
+        size (int): Image size in px.
+    Returns:
+        original_s2_numpy (np.ndarray): Input image (bands, H, W), in reflectance.
+        superX (torch.Tensor): SR image (bands, 4H, 4W).
+    """
+    original_s2_numpy = (cloudless_image_data.compute().to_numpy() / 10_000).astype("float32")
+    X = torch.from_numpy(original_s2_numpy).float().to(DEVICE)
+    X = torch.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # Load (once per process, see `model_loader.py`)
+    model = get_sen2sr_model()
+    with sr_inference_slot(), span("sen2sr_inference", size=size):
+        # Apply model for normal or large size images
+        if  size <= 128:
+            superX = model(X[None]).squeeze(0)
+        else:
+            superX = sen2sr.predict_large(
+                model=model,
+                X=X, # The input tensor
+                overlap=32, # The overlap between the patches
+            )
+    return original_s2_numpy, superX
+
 # --------------------
 # Sentinel-2 cube
 # --------------------
-def download_sentinel_cubo(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int, crs: str, cloud_threshold: float = 0.01, max_retries: int = 3, retry_days_shift: int = 15):
+def download_sentinel_cubo(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int, crs: str, cloud_threshold: float = 0.01, max_retries: int = 3, retry_days_shift: int = 15, geometry: dict = None, two_phase: bool = TWO_PHASE_FETCH, skip_date: Callable[[str], bool] = None):
     """
     Download Sentinel's imagery data cubo and uses SCL band to filter the least cloudy data within date range.
+    In two phases by default: an SCL-only cube (at SCL's native `SCL_RESOLUTION`) to choose the date, then the spectral bands of that date only.
     Arguments:
         lat (float): Latitude component
         lat (float): Longitude component
@@ -95,37 +144,50 @@ def download_sentinel_cubo(lat: float, lon: float, bands: list, start_date: str,
         size (int): Image size in px.
         crs (str): Coordinate Reference System for the image
         cloud_threshold (float): Tolerated cloud density percentage
+        geometry (dict): _Optional_; Parcel GeoJSON geometry. If given, dates are chosen by the clouds over the parcel, not the whole image.
+        two_phase (bool): _Optional_; Fetch the SCL band first and the spectral bands for the chosen date only. If `False`, all bands
+            are fetched for the whole date range. Default is `TWO_PHASE_FETCH`.
+        skip_date (Callable): _Optional_; Called with the chosen acquisition date (`YYYY-MM-DD`) before the spectral bands are
+            fetched (two-phase only). If it returns `True`, they are not fetched and `cloudless_image_data` is `None`.
 
     Returns:
-        cloudless_image_data (array): Cloudless image data array
+        cloudless_image_data (array | None): Cloudless image data array, or `None` if `skip_date` skipped it
+        acq_date (str): Acquisition date (`YYYY-MM-DD`)
+        decoded_bytes (int): Decoded size of the imagery read from the STAC source (in-memory pixels, not bytes transferred)
     """
     for attempt in range(max_retries):
         try:
             print(f"🌍 Attempt {attempt+1}/{max_retries}: {start_date} → {end_date}")
+            report_stage("download", start_date=start_date, end_date=end_date, attempt=attempt + 1)
             
-            da = cubo.create(
-                lat=lat,
-                lon=lon,
-                collection="sentinel-2-l2a",
-                bands=bands,
-                start_date=start_date,
-                end_date=end_date,
-                edge_size=size,
-                resolution=RESOLUTION,
-            )
+            if two_phase and "SCL" in bands:
+                cloudless_image_data, acq_date_str, decoded_bytes = fetch_cloudless_image_two_phase(lat, lon, bands, start_date, end_date, size, crs, cloud_threshold, geometry, skip_date)
+            else:
+                da = create_cubo(lat, lon, bands, start_date, end_date, size)
+
+                # Find cloudless time index
+                report_stage("cloud_selection")
+                scl = da.sel(band="SCL")
+                with span("cloud_selection"):
+                    parcel_mask = get_parcel_mask(scl, geometry, crs) if geometry else None
+                    cloudless_indices, __ = get_cloudless_time_indices(scl, cloud_threshold, parcel_mask)
+                cloudless_date = cloudless_indices[-1]
+                cloudless_image_data = da.isel(time=cloudless_date).sel(band=bands[:-1])  # drop SCL band
+                decoded_bytes = scl.nbytes + cloudless_image_data.nbytes
 
-            # Find cloudless time index
-            scl = da.sel(band="SCL")
-            cloudless_date = get_cloudless_time_indices(scl, cloud_threshold)[-1]
-            cloudless_image_data = da.isel(time=cloudless_date).sel(band=bands[:-1])  # drop SCL band
+                # Get acquisition date
+                acq_date = cloudless_image_data["time"].values
+                acq_date_str = np.datetime_as_string(acq_date, unit='D')
 
-            # Get acquisition date and reproject
-            acq_date = cloudless_image_data["time"].values
-            acq_date_str = np.datetime_as_string(acq_date, unit='D')
-            cloudless_image_data = cloudless_image_data.rio.write_crs(crs).rio.reproject(crs)
+            # Reproject (the lazy cube is fetched here too)
+            if cloudless_image_data is not None:
+                with span("reproject", size=size):
+                    cloudless_image_data = cloudless_image_data.rio.write_crs(crs).rio.reproject(crs)
+            STAC_DECODED_BYTES.inc(decoded_bytes)
+            print(f"📦 Decoded {decoded_bytes / 1024 ** 2:.2f} MB of imagery from the STAC source")
 
             print(f"☁️ Cloudless image found on {acq_date_str}!")
-            return cloudless_image_data, str(acq_date_str)
+            return cloudless_image_data, str(acq_date_str), decoded_bytes
 
         except ValueError as e:
             print(f"⚠️ {e}")
@@ -140,14 +202,70 @@ def download_sentinel_cubo(lat: float, lon: float, bands: list, start_date: str,
                 print("❌ No valid images found after all retries.")
                 raise
 
+def create_cubo(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int, resolution: int = RESOLUTION):
+    """
+    Sentinel-2 L2A cube of `size x size` px centered on the coordinates.
+    """
+    return cubo.create(
+        lat=lat,
+        lon=lon,
+        collection="sentinel-2-l2a",
+        bands=bands,
+        start_date=start_date,
+        end_date=end_date,
+        edge_size=size,
+        resolution=resolution,
+    )
+
+def fetch_cloudless_image_two_phase(lat: float, lon: float, bands: list, start_date: str, end_date: str, size: int, crs: str, cloud_threshold: float, geometry: dict = None, skip_date: Callable[[str], bool] = None):
+    """
+    Chooses the cloudless date on an SCL-only cube, then fetches the spectral bands for that date only.
+    See `download_sentinel_cubo`.
+    Returns:
+        result (tuple): `(cloudless_image_data, acq_date, decoded_bytes)`; the image is not reprojected yet, and is `None` if `skip_date` skipped it.
+    Raises:
+        ValueError: If no date is cloudless enough.
+    """
+    # Phase 1: SCL at its native resolution, over the whole date range
+    scl_size = math.ceil(size * RESOLUTION / SCL_RESOLUTION)
+    scl = create_cubo(lat, lon, ["SCL"], start_date, end_date, scl_size, SCL_RESOLUTION).sel(band="SCL")
+    report_stage("cloud_selection")
+    with span("cloud_selection"):
+        parcel_mask = get_parcel_mask(scl, geometry, crs) if geometry else None
+        cloudless_indices, __ = get_cloudless_time_indices(scl, cloud_threshold, parcel_mask)
+    acq_time = scl["time"].values[cloudless_indices[-1]]
+    acq_date = datetime.fromisoformat(str(np.datetime_as_string(acq_time, unit="D")))
+    if skip_date is not None and skip_date(acq_date.strftime("%Y-%m-%d")):
+        return None, acq_date.strftime("%Y-%m-%d"), scl.nbytes
+
+    # Phase 2: spectral bands of the chosen date
+    spectral_bands = [band for band in bands if band != "SCL"]
+    report_stage("download", date=acq_date.strftime("%Y-%m-%d"), bands=spectral_bands)
+    da = create_cubo(lat, lon, spectral_bands, acq_date.strftime("%Y-%m-%d"), (acq_date + timedelta(days=1)).strftime("%Y-%m-%d"), size)
+    cloudless_image_data = da.sel(time=acq_time, method="nearest").sel(band=spectral_bands)
+    return cloudless_image_data, acq_date.strftime("%Y-%m-%d"), scl.nbytes + cloudless_image_data.nbytes
+
+def read_parcel_geometry(workspace: Workspace) -> dict | None:
+    """
+    Parcel geometry stored in the workspace, or `None` if there is none.
+    """
+    try:
+        with open(workspace.geojson_filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
 # --------------------
 # Cropping SR parcel with polygon
 # --------------------
-def crop_parcel_from_sr_tif(raster_path:str, date): 
+@timed("crop")
+def crop_parcel_from_sr_tif(raster_path:str, date, workspace: Workspace): 
     """
     Crops the parcel from the SR image, using the stored parcel's geometry and`rasterio`
     Arguments:
         raster_path (str): Path to uncropped SR image.
+        date (str): Image acquisition date (`YYYY-MM-DD`).
+        workspace (Workspace): Request-scoped working dir holding the parcel's GeoJSON.
     Returns:
         out_png_path (str): Path to cropped SR parcel image
     """
@@ -155,8 +273,7 @@ def crop_parcel_from_sr_tif(raster_path:str, date):
         
         raster_crs = src.crs
         print(f"SR Raster CRS: {raster_crs}")
-        gdf = gpd.read_file(GEOJSON_FILEPATH)
-        gdf = gpd.read_file(GEOJSON_FILEPATH)
+        gdf = gpd.read_file(workspace.geojson_filepath)
         print("Original GeoJSON CRS:", gdf.crs)
         print("Original polygon bounds:", gdf.total_bounds)
         if raster_crs:
@@ -186,11 +303,11 @@ def crop_parcel_from_sr_tif(raster_path:str, date):
     year, month, day = date.split("-")
     filename = f"SR_{year}-{month}-{day}"
 
-    out_tif_path = TIF_DIR / f"{filename}.tif"
+    out_tif_path = workspace.tif_dir / f"{filename}.tif"
     with rasterio.open(out_tif_path, "w", **out_meta) as dest:
         dest.write(out_image)
 
-    out_png_path= TEMP_DIR / f"{filename}.png"
+    out_png_path= workspace.public_path(f"{filename}.png")
     save_to_png(out_image, out_png_path, apply_gamma_correction=True)
 
     print(f"✅ Clipped raster saved to {out_tif_path} and PNG saved to {out_png_path}")
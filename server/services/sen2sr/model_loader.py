@@ -0,0 +1,36 @@
+import os
+
+import mlstac
+import torch
+
+from .constants import MODEL_DIR, MODEL_URL, WARMUP_SIZE
+from ...utils.model_registry import get_model, register_model
+
+MODEL_NAME = "sen2sr"
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+def load_sen2sr_model():
+    """
+    Downloads the SEN2SR model from HuggingFace (first run only) and loads it on `DEVICE`.
+    """
+    if not os.path.exists(MODEL_DIR) or len(os.listdir(MODEL_DIR)) == 0:
+        mlstac.download(
+            file=MODEL_URL,
+            output_dir=MODEL_DIR,
+        )
+    return mlstac.load(MODEL_DIR).compiled_model(device=DEVICE)
+
+def warm_up_sen2sr_model(model):
+    """
+    Runs the model once on a dummy `WARMUP_SIZE`x`WARMUP_SIZE` RGBN tensor.
+    """
+    with torch.no_grad():
+        model(torch.zeros(1, 4, WARMUP_SIZE, WARMUP_SIZE, device=DEVICE))
+
+def get_sen2sr_model():
+    """
+    Returns the process-wide SEN2SR model, loading it on first use.
+    """
+    return get_model(MODEL_NAME)
+
+register_model(MODEL_NAME, load_sen2sr_model, warm_up_sen2sr_model)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from datetime import date
+
+from .constants import MODEL_ID
+from ...config.constants import SR_IMAGE_CACHE_DIR, SR_IMAGE_CACHE_MAX_BYTES, SR_IMAGE_CACHE_WINDOW_TTL
+from ...utils.cache_utils import DiskLRUCache
+from ...utils.workspace_utils import Workspace
+
+SR_IMAGE_CACHE = DiskLRUCache(SR_IMAGE_CACHE_DIR, SR_IMAGE_CACHE_MAX_BYTES, name="sr_parcel_images")
+
+# Date window → image key aliases. Dot-prefixed, so the LRU scan of the cache ignores it.
+WINDOWS_DIR = SR_IMAGE_CACHE_DIR / ".windows"
+
+PNG_FILENAME = "parcel.png"
+TIF_FILENAME = "parcel.tif"
+
+def get_geometry_digest(geojson_filepath) -> str:
+    """
+    Hashes a parcel GeoJSON file in a canonical form (sorted keys, no whitespace).
+    """
+    with open(geojson_filepath, "r", encoding="utf-8") as f:
+        geometry = json.load(f)
+    canonical = json.dumps(geometry, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def get_parcel_image_key(geometry_digest: str, acquisition_date: str, size: int, model_id: str = MODEL_ID) -> str:
+    """
+    Content address of a cropped SR parcel image: same parcel, same Sentinel-2 acquisition, same size and model.
+    """
+    return _hash(geometry_digest, acquisition_date, size, model_id)
+
+def get_window_key(geometry_digest: str, start_date: str, end_date: str, size: int, model_id: str = MODEL_ID) -> str:
+    """
+    Key of a request's date window, used to skip the download and cloud selection on repeated requests.
+    """
+    return _hash("window", geometry_digest, start_date, end_date, size, model_id)
+
+def get_cached_parcel_image(key: str, workspace: Workspace):
+    """
+    Restores a cached SR parcel image into the workspace.
+    Arguments:
+        key (str): Image key from `get_parcel_image_key`.
+        workspace (Workspace): Request-scoped working dir.
+    Returns:
+        out_png_path (Path | None): Path to the published parcel PNG, or `None` on a miss.
+    """
+    entry_dir = SR_IMAGE_CACHE.get(key)
+    if entry_dir is None:
+        return None
+    metadata = SR_IMAGE_CACHE.read_metadata(key) or {}
+    filename = f"SR_{metadata.get('acquisition_date', 'cached')}"
+    try:
+        os.makedirs(workspace.tif_dir, exist_ok=True)
+        shutil.copyfile(entry_dir / TIF_FILENAME, workspace.tif_dir / f"{filename}.tif")
+        out_png_path = workspace.public_path(f"{filename}.png")
+        shutil.copyfile(entry_dir / PNG_FILENAME, out_png_path)
+    except FileNotFoundError:
+        # Evicted by another process while restoring
+        return None
+    print(f"⚡ SR parcel image served from cache ({key[:12]}…)")
+    return out_png_path
+
+def get_cached_parcel_image_for_window(window_key: str, end_date: str, workspace: Workspace):
+    """
+    Restores the image a previous request with the same date window resolved to.
+    Windows ending today or later can still get new acquisitions, so they are only trusted for `SR_IMAGE_CACHE_WINDOW_TTL` seconds.
+    Returns:
+        out_png_path (Path | None): Path to the published parcel PNG, or `None` if unknown.
+    """
+    try:
+        with open(WINDOWS_DIR / f"{window_key}.json", "r", encoding="utf-8") as f:
+            window = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    is_closed_window = date.fromisoformat(end_date) < date.today()
+    if not is_closed_window and time.time() - window["created"] > SR_IMAGE_CACHE_WINDOW_TTL:
+        return None
+    return get_cached_parcel_image(window["key"], workspace)
+
+def store_parcel_image(key: str, png_path, tif_path, metadata: dict, window_key: str = None):
+    """
+    Caches a cropped SR parcel image (PNG + GeoTIFF) and, optionally, the date window that resolved to it.
+    """
+    SR_IMAGE_CACHE.put(key, {PNG_FILENAME: png_path, TIF_FILENAME: tif_path}, metadata)
+    if window_key:
+        remember_window(window_key, key)
+
+def remember_window(window_key: str, key: str):
+    """
+    Records that a date window resolved to the image stored under `key`.
+    """
+    os.makedirs(WINDOWS_DIR, exist_ok=True)
+    tmp_path = WINDOWS_DIR / f".{window_key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "created": time.time()}, f)
+    os.replace(tmp_path, WINDOWS_DIR / f"{window_key}.json")
+
+def _hash(*parts) -> str:
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
@@ -2,17 +2,21 @@ import math
 import os
 import cv2
 import rasterio
+import rioxarray  # needed to access .rio on xarray objects
 
 import numpy as np
 
+from rasterio.features import geometry_mask
 from rasterio.transform import from_bounds
-from xarray import DataArray
+from rasterio.warp import transform_geom
+from xarray import DataArray, Dataset
 from PIL import Image, ImageEnhance
 
 from ...config.constants import GET_SR_BENCHMARK
+from ...utils.metrics_utils import timed
 
 from ...benchmark.sr.utils import copy_file_to_dir
-from .constants import BRIGHTNESS_FACTOR, COMPARISON_PNG_FILEPATH, GAMMA, PNG_DIR, SPAIN_MAINLAND, TIF_DIR
+from .constants import BRIGHTNESS_FACTOR, GAMMA, SCL_CLOUD_CLASSES, SCL_NO_DATA, SPAIN_MAINLAND
 
 # --------------------
 # GeoTIFF + PNG export
@@ -50,7 +54,7 @@ def save_tif(image_nparray, filepath, adjust_transform, crs:str="EPSG:32630"):
     Uses `rasterio` to save a GeoTIFF image
     """
     # Create output TIF dir
-    os.makedirs(TIF_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
     # Save as TIF
     with rasterio.open(
         filepath, "w",
@@ -75,6 +79,7 @@ def save_tif(image_nparray, filepath, adjust_transform, crs:str="EPSG:32630"):
 
     print(f"✅ Saved {filepath} with corrected band order")
 
+@timed("png_encode")
 def save_to_png(image_nparray, filepath, lat=None, apply_gamma_correction=False):
     """
     Wrapper for saving a NumPy RGB array as PNG, optionally applying
@@ -86,7 +91,7 @@ def save_to_png(image_nparray, filepath, lat=None, apply_gamma_correction=False)
         lat (float, optional): Latitude for brightness normalization
         apply_gamma_correction (bool): Whether to apply gamma correction
     """
-    os.makedirs(PNG_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
     # Apply latitude-based brightness normalization if latitude provided
     if lat is not None:
@@ -149,35 +154,63 @@ def brighten(img, factor=BRIGHTNESS_FACTOR):
 def apply_gamma(img, gamma = GAMMA):
     return np.clip(img ** (1 / gamma), 0, 1)
 
-def get_cloudless_time_indices(scl: DataArray, cloud_threshold = 0.01):
+def get_parcel_mask(da: DataArray, geometry: dict, crs: str) -> np.ndarray:
+    """
+    Rasterizes the parcel's polygon on the cube's pixel grid.
+    Arguments:
+        da (DataArray): Sentinel-2 cube (or one of its bands) with `y`/`x` coords.
+        geometry (dict): Parcel GeoJSON geometry (EPSG:4326, unless it has a `CRS` key).
+        crs (str): CRS of the cube.
+    Returns:
+        parcel_mask (np.ndarray): `y x x` boolean array, `True` inside the parcel.
+    """
+    parcel = transform_geom(geometry.get("CRS", "EPSG:4326"), crs, {"type": geometry["type"], "coordinates": geometry["coordinates"]})
+    return geometry_mask([parcel], out_shape=(da.sizes["y"], da.sizes["x"]), transform=da.rio.transform(), invert=True, all_touched=True)
+
+def get_cloud_cover(scl: DataArray, parcel_mask: np.ndarray = None):
+    """
+    Cloud fraction and number of valid (not no-data) pixels of every date, computed in a single pass over the cube.
+    Arguments:
+        scl (DataArray): SCL band info (`time x y x x`).
+        parcel_mask (np.ndarray): _Optional_; `y x x` boolean array. If given, only pixels inside the parcel are scored.
+    Returns:
+        cloud_fractions (np.ndarray): Cloud fraction of the valid pixels of each date (1.0 if it has none).
+        valid_counts (np.ndarray): Number of valid pixels of each date.
+    """
+    valid = scl != SCL_NO_DATA
+    if parcel_mask is not None:
+        valid = valid & DataArray(parcel_mask, dims=("y", "x"))
+    cloudy = valid & scl.isin(SCL_CLOUD_CLASSES)
+    spatial_dims = [dim for dim in scl.dims if dim != "time"]
+    # One compute (one dask graph) for every date, instead of one per time slice
+    counts = Dataset({"cloudy": cloudy.sum(spatial_dims), "valid": valid.sum(spatial_dims)}).compute()
+    cloud_counts = counts["cloudy"].to_numpy()
+    valid_counts = counts["valid"].to_numpy()
+    cloud_fractions = np.divide(cloud_counts, valid_counts, out=np.ones(len(valid_counts)), where=valid_counts > 0)
+    return cloud_fractions, valid_counts
+
+def get_cloudless_time_indices(scl: DataArray, cloud_threshold = 0.01, parcel_mask: np.ndarray = None):
     """
     Uses the SCL band and combs over the image data within date range to find the least cloudy.
     Arguments:
         scl (DataArray): SCL band info
         cloud_threshold (float): Tolerated cloud density percentage. Default: 0.01 (0.00-1.00)
+        parcel_mask (np.ndarray): _Optional_; `y x x` boolean array (see `get_parcel_mask`). If given, dates are scored on the parcel's pixels only.
     Returns:
         valid_indices (list): List of all valid dates' indices within acceptable cloud threshold
+        valid_counts (np.ndarray): Number of valid (not no-data) pixels scored for each date
     """
-    valid_indices = []
-    min_threshold = 1  # 100%
-    min_index = -1
-    for t in range(scl.shape[0]):  # iterate over time dimension
-        scl_slice = scl.isel(time=t).compute().to_numpy()
-        # Get cloud image coverage
-        total_pixels = scl_slice.size
-        cloud_pixels = np.isin(scl_slice, [7, 8, 9, 10]).sum()
-        cloud_fraction = cloud_pixels / total_pixels
-        
-        print(f"Time {t}: cloud_fraction={cloud_fraction:.3%}")
-        
-        if cloud_fraction <= cloud_threshold:
-            valid_indices.append(t)
-        elif cloud_fraction < min_threshold:
-            min_threshold = cloud_fraction
-            min_index = t
-    
+    cloud_fractions, valid_counts = get_cloud_cover(scl, parcel_mask)
+    for t, (cloud_fraction, valid_count) in enumerate(zip(cloud_fractions, valid_counts)):
+        print(f"Time {t}: cloud_fraction={cloud_fraction:.3%} ({valid_count} valid px)")
+
+    has_data = valid_counts > 0
+    valid_indices = np.flatnonzero(has_data & (cloud_fractions <= cloud_threshold)).tolist()
+    min_threshold = cloud_fractions[has_data].min() if has_data.any() else 1  # 100%
+
     if len(valid_indices) == 0:
-        if min_index > -1:
+        if has_data.any() and min_threshold < 1:
+            min_index = int(np.flatnonzero(has_data & (cloud_fractions == min_threshold))[0])
             print(f"No time indices with cloud fraction <= {cloud_threshold:.3%}. Using index {min_index} with minimum cloud fraction {min_threshold:.3%}.")
             valid_indices.append(min_index)
         else:
@@ -187,7 +220,7 @@ def get_cloudless_time_indices(scl: DataArray, cloud_threshold = 0.01):
                 f"for the selected area and date range (original threshold = {cloud_threshold:.2%})."
             ) 
     print(f"Valid time indices (cloud = {min_threshold:.2%}):", valid_indices)
-    return valid_indices
+    return valid_indices, valid_counts
 
 def prepare_rgb(arr, is_tensor=False):
     """
@@ -204,7 +237,7 @@ def prepare_rgb(arr, is_tensor=False):
     rgb_norm = (rgb - rgb.min()) / (rgb.max() - rgb.min() + 1e-6)
     return (rgb_norm * 255).astype(np.uint8)
 
-def make_pixel_faithful_comparison(original_arr, sr_arr, output_path=COMPARISON_PNG_FILEPATH, apply_brightness=True, apply_gamma=False, border=15, spacing=5, bg_color=(255, 255, 255)):
+def make_pixel_faithful_comparison(original_arr, sr_arr, output_path, apply_brightness=True, apply_gamma=False, border=15, spacing=5, bg_color=(255, 255, 255)):
     """
     Create a side-by-side comparison between original and SR images with
     white borders and padding. The original is upscaled with nearest-neighbor
@@ -1,10 +1,21 @@
 from pathlib import Path
 import os
 
-# URL from SIGPAC service
-BASE_URL = "https://sigpac-hubcloud.es"
+# URL from SIGPAC service (overridable, e.g. to point tests at a local stub server)
+BASE_URL = os.getenv("SIGPAC_BASE_URL", "https://sigpac-hubcloud.es")
 QUERY_URL = "servicioconsultassigpac/query"
 
+# HTTP client settings (see `session.py`)
+TIMEOUT = (5, 30)  # seconds (connect, read)
+MAX_RETRIES = 3  # on connection errors and 429/5xx responses
+RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+POOL_SIZE = 10  # keep-alive connections kept open to SIGPAC
+
+# Response cache
+CACHE_TTL = int(os.getenv("SIGPAC_CACHE_TTL", 24 * 60 * 60))  # seconds
+CACHE_MAX_ENTRIES = 1024
+COORDS_CACHE_DECIMALS = 5  # ~1 m: `recinfobypoint` lookups closer than this share a cache entry
+
 # Provinces divided into communities
 # https://www.ine.es/daco/daco42/codmun/cod_ccaa_provincia.htm
 PROVINCES_BY_COMMUNITY = {
@@ -1,9 +1,9 @@
-import requests
 import structlog
 
 from ...utils.parcel_finder_utils import build_cadastral_reference
 
-from ._globals import BASE_URL,QUERY_URL
+from ._globals import COORDS_CACHE_DECIMALS, QUERY_URL
+from .session import get_json
 
 logger = structlog.get_logger()
 
@@ -33,13 +33,13 @@ def generate_cadastral_ref_from_coords(lat: float, lon: float, crs: str = "4258"
     """
     # Search enclosure by coords
     logger.info(f"Retrieving info from parcel at coordinates: {lat}, {lon}")
-    base_endpoint = f"{BASE_URL}/{QUERY_URL}/recinfobypoint/{crs}/{lon}/{lat}.json"
-    logger.debug(f"SIGPAC request URL: {base_endpoint}")
-    response = requests.get(base_endpoint)
+    # Round coordinates so that nearby lookups share a cache entry
+    lat, lon = round(lat, COORDS_CACHE_DECIMALS), round(lon, COORDS_CACHE_DECIMALS)
+    endpoint = f"{QUERY_URL}/recinfobypoint/{crs}/{lon}/{lat}.json"
 
     try:
-        response = response.json()[0]
-    except Exception as e:
+        response = get_json(endpoint, cache_key=("recinfobypoint", crs, lat, lon))[0]
+    except (ValueError, IndexError, KeyError, TypeError) as e:
         logger.exception(f"Failed to parse SIGPAC JSON response: {e}")
         raise ValueError("Invalid JSON returned by SIGPAC")
 
@@ -1,8 +1,7 @@
-import requests
 import structlog
 
 from ...utils.parcel_finder_utils import build_cadastral_reference
-from ._globals import BASE_URL, QUERY_URL
+from ._globals import QUERY_URL
 from .utils import find_community, get_parcel_metadata_and_geometry, read_cadastral_registry
 
 logger = structlog.get_logger()
@@ -45,8 +44,8 @@ def search(data: dict) -> dict:
 
     if comm and provi and muni and polg and parc:
         logger.info("Searching for specified parcel.")
-        base_endpoint = f"{BASE_URL}/{QUERY_URL}/recinfoparc/{provi}/{muni}/0/0/{polg}/{parc}.geojson"
-        geometry, metadata = get_parcel_metadata_and_geometry(base_endpoint)
+        endpoint = f"{QUERY_URL}/recinfoparc/{provi}/{muni}/0/0/{polg}/{parc}.geojson"
+        geometry, metadata = get_parcel_metadata_and_geometry(endpoint, cache_key=("recinfoparc", provi, muni, polg, parc))
         return geometry, metadata
     else:
         raise ValueError(
@@ -0,0 +1,126 @@
+import copy
+import threading
+import time
+import requests
+import structlog
+
+from collections import OrderedDict
+from functools import lru_cache
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import _globals
+from ._globals import CACHE_MAX_ENTRIES, CACHE_TTL, MAX_RETRIES, POOL_SIZE, RETRY_BACKOFF, TIMEOUT
+
+logger = structlog.get_logger()
+
+
+class TTLCache:
+    """Thread-safe in-memory cache whose entries expire after `ttl` seconds.
+
+    Holds at most `max_entries` entries, dropping the least recently used ones first.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+RESPONSE_CACHE = TTLCache()
+
+
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Returns the shared SIGPAC HTTP session
+
+    Connections are kept alive and pooled, and idempotent requests are retried with exponential backoff
+    on connection errors and 429/5xx responses.
+
+    Returns
+    -------
+    requests.Session
+        Session shared by every SIGPAC request of the process
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_json(endpoint: str, cache_key: tuple = None):
+    """Gets a SIGPAC endpoint as JSON, through the response cache
+
+    Parameters
+    ----------
+    endpoint : str
+        Endpoint path, relative to `BASE_URL`
+    cache_key : tuple
+        Key to cache the response under. Responses are not cached if not provided
+
+    Returns
+    -------
+    dict | list
+        Parsed JSON response. Cached responses are returned as copies, so callers may modify them
+
+    Raises
+    ------
+    requests.HTTPError
+        If SIGPAC still answers with an error status after all retries
+    ValueError
+        If the response is not valid JSON
+    """
+    if cache_key is not None:
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            logger.debug(f"SIGPAC cache hit: {cache_key}")
+            return copy.deepcopy(cached)
+
+    url = f"{_globals.BASE_URL}/{endpoint}"
+    logger.debug(f"SIGPAC request URL: {url}")
+    response = get_session().get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+
+    if cache_key is not None:
+        RESPONSE_CACHE.set(cache_key, copy.deepcopy(data))
+    return data
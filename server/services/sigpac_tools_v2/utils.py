@@ -1,4 +1,3 @@
-import requests
 import structlog
 
 from collections import defaultdict
@@ -7,6 +6,7 @@ from shapely.geometry import shape, mapping
 from shapely.ops import unary_union
 
 from ._globals import PROVINCES_BY_COMMUNITY
+from .session import get_json
 
 logger = structlog.get_logger()
 
@@ -84,12 +84,13 @@ def read_cadastral_registry(registry: str) -> dict:
         "control": reg_control,
     }
 
-def get_parcel_metadata_and_geometry(base_endpoint: str) -> dict:
+def get_parcel_metadata_and_geometry(endpoint: str, cache_key: tuple = None) -> dict:
     """Extract parcel metadata and geometry and returns them in a single JSON.
     
     Parameters
     ----------
-        base_endpoint (str): Base SIGPAC endpoint
+        endpoint (str): SIGPAC endpoint, relative to `BASE_URL`
+        cache_key (tuple): Key to cache the SIGPAC response under (see `session.get_json`)
 
     Returns
     -------
@@ -100,10 +101,8 @@ def get_parcel_metadata_and_geometry(base_endpoint: str) -> dict:
         ValueError: If the reference is not valid
         NotImplementedError: If the reference is urban
     """
-    logger.debug(f"Base endpoint:\t{base_endpoint}")
-    response = requests.get(base_endpoint)
-    response.raise_for_status()
-    full_json = response.json()
+    logger.debug(f"Endpoint:\t{endpoint}")
+    full_json = get_json(endpoint, cache_key)
 
     geometry = get_geometry(full_json)
     metadata = get_metadata(full_json)
@@ -1,45 +1,42 @@
-import time
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-from sentinelhub import SHConfig, DataCollection, MimeType, SentinelHubRequest, bbox_to_dimensions
-from .sh_config import CONFIG_NAME
+from sentinelhub import DataCollection, MimeType, SentinelHubRequest, bbox_to_dimensions
+from .sh_config import get_sh_config
 from .utils import *
-from ....config.constants import BANDS_DIR
+from ....config.env_config import SH_DOWNLOAD_MODE
+from ....utils.metrics_utils import span
 from ..constants import DELTA_DAYS, RESOLUTION, SIZE
 
 from contextvars import ContextVar
 
 request_date: ContextVar[str] = ContextVar("request_date", default="")
 
-config = SHConfig(CONFIG_NAME)
 
-if not config.sh_client_id or not config.sh_client_secret:
-    print("Warning! To use Process API, please provide the credentials (OAuth client ID and client secret).")
-
-def download_from_sentinel_hub(lat, lon, filename):
+def download_from_sentinel_hub(lat, lon, filename, bands_dir):
     """
     Downloads Sentinel band image _.tif_ files, specifically, B02, B03, B04 and B08.
     Arguments:
         lat (float): Latitude.
         lon (float): Longitude.
         filename (str): Base filename to save the images.
+        bands_dir (Path): Dir where the band files are saved.
     Returns:
         band_files_list (list): List of band file paths.
     """
-    start_time = time.time()
-    BANDS_DIR.mkdir(parents=True, exist_ok=True)
+    bands_dir.mkdir(parents=True, exist_ok=True)
     bands=['B02', 'B03', 'B04', 'B08']
     size = (SIZE,SIZE)
-    band_files_list = download_image_bands(lat, lon, size, filename, bands)
-    print(f"\nTotal time:\t{(time.time() - start_time)/60:.1f} minutes")
+    with span("sentinel_hub_download"):
+        band_files_list = download_image_bands(lat, lon, size, filename, bands, bands_dir)
     return band_files_list
     
 # ----------------------------
 # SENTINEL REQUEST
 # ----------------------------
-def download_sentinel_image(lat, lon, size, filename, evalscript):
+def download_sentinel_image(lat, lon, size, filename, evalscript, bands_dir):
     """
     Fetches a Sentinel image for the given lat, lon, size, and zoom level,
     and saves it to the specified filename.
@@ -51,6 +48,27 @@ def download_sentinel_image(lat, lon, size, filename, evalscript):
         zoom (int): Zoom level for the image.
         filename (str): Filename to save the image.
         evalscript (str): Javascript code that defines how the satellite data shall be retrieved and processed.
+        bands_dir (Path): Dir where the image is saved.
+    """
+    bbox, width, height, initial_date, final_date = get_request_window(lat, lon, size, filename)
+
+    # Retieve imagen band and save it
+    image = get_cloudless_image(evalscript, bbox, width, height, get_sh_config(), initial_date, final_date)
+    filepath = bands_dir / filename
+    save_tiff(image, filepath, bbox, crs="EPSG:4326")
+
+    print(f"Sentinel band image saved to {filepath}")
+
+def get_request_window(lat, lon, size, filename):
+    """
+    Gets the bounding box, size in px and date range (ending on the requested date) of a Sentinel request.
+    Arguments:
+        lat (float): Latitude of the location.
+        lon (float): Longitude of the location.
+        size (tuple): Size of the image in pixels (width, height).
+        filename (str): Band filename (`YYYY_MM-...`), the year and month of the request.
+    Returns:
+        window (tuple): `(bbox, width, height, initial_date, final_date)`.
     """
     bbox = get_bbox_from_center(lat, lon, size[0], size[-1], RESOLUTION)
     width, height = bbox_to_dimensions(bbox, resolution=RESOLUTION)
@@ -62,19 +80,22 @@ def download_sentinel_image(lat, lon, size, filename, evalscript):
     delta = DELTA_DAYS
     initial_date = str((date - timedelta(days=delta)).isoformat())
     final_date = str(date.isoformat())
-
-    # Retieve imagen band and save it
-    image = get_cloudless_image(evalscript, bbox, width, height, config, initial_date, final_date)
-    filepath = BANDS_DIR / filename
-    save_tiff(image, filepath, bbox, crs="EPSG:4326")
-
-    print(f"Sentinel band image saved to {filepath}")
-
+    return bbox, width, height, initial_date, final_date
 
 def get_cloudless_image(evalscript, bbox, width, height, config, initial_date, final_date, days_back=15, max_tries=5, maxcc=0.2, relax_clouds=True):
     """
     Retrieve Sentinel-2 imagery with adaptive backtracking and empty-image checks.
     """
+    img, __, __ = find_cloudless_image(evalscript, bbox, width, height, config, initial_date, final_date, days_back, max_tries, maxcc, relax_clouds)
+    return img
+
+def find_cloudless_image(evalscript, bbox, width, height, config, initial_date, final_date, days_back=15, max_tries=5, maxcc=0.2, relax_clouds=True):
+    """
+    Retrieve Sentinel-2 imagery with adaptive backtracking and empty-image checks.
+    Returns:
+        result (tuple): `(image, time_interval, maxcc)`, with the time interval and cloud cover that yielded the image,
+        so that other requests for the same scene can skip the search.
+    """
     attempt = 0
     current_initial = datetime.fromisoformat(initial_date)
     current_final = datetime.fromisoformat(final_date)
@@ -86,31 +107,10 @@ def get_cloudless_image(evalscript, bbox, width, height, config, initial_date, f
         )
 
         try:
-            sh_request = SentinelHubRequest(
-                evalscript=evalscript,
-                input_data=[
-                    SentinelHubRequest.input_data(
-                        DataCollection.SENTINEL2_L2A.define_from("s2l2a", service_url=config.sh_base_url),
-                        time_interval=(current_initial.date().isoformat(), current_final.date().isoformat()),
-                        maxcc=current_maxcc,
-                    )
-                ],
-                responses=[SentinelHubRequest.output_response("default", MimeType.TIFF)],
-                bbox=bbox,
-                size=(width, height),
-                config=config,
-            )
-
-            data = sh_request.get_data()
-            if not data or len(data[0].shape) < 2:
-                raise ValueError("Empty response (no imagery returned).")
-
-            img = data[0]
-            if np.all((img == 0) | np.isnan(img)):
-                raise ValueError("Received empty image (all zeros or NaNs).")
-
+            time_interval = (current_initial.date().isoformat(), current_final.date().isoformat())
+            img = request_sentinel_image(evalscript, bbox, width, height, config, time_interval, current_maxcc)
             print(f"✅ Found valid imagery on attempt {attempt+1}")
-            return img
+            return img, time_interval, current_maxcc
 
         except ValueError as e:
             print(f"⚠️  Attempt {attempt+1} failed: {e}")
@@ -127,7 +127,37 @@ def get_cloudless_image(evalscript, bbox, width, height, config, initial_date, f
 
     raise RuntimeError("❌ No valid Sentinel-2 image found after all attempts.")
 
-def download_image_bands(lat, lon, size, filename=None, bands=["B02", "B03", "B04"]):
+def request_sentinel_image(evalscript, bbox, width, height, config, time_interval, maxcc):
+    """
+    Single Sentinel Hub Process API request.
+    Raises:
+        ValueError: If no imagery is returned for the time interval.
+    """
+    sh_request = SentinelHubRequest(
+        evalscript=evalscript,
+        input_data=[
+            SentinelHubRequest.input_data(
+                DataCollection.SENTINEL2_L2A.define_from("s2l2a", service_url=config.sh_base_url),
+                time_interval=time_interval,
+                maxcc=maxcc,
+            )
+        ],
+        responses=[SentinelHubRequest.output_response("default", MimeType.TIFF)],
+        bbox=bbox,
+        size=(width, height),
+        config=config,
+    )
+
+    data = sh_request.get_data()
+    if not data or len(data[0].shape) < 2:
+        raise ValueError("Empty response (no imagery returned).")
+
+    img = data[0]
+    if np.all((img == 0) | np.isnan(img)):
+        raise ValueError("Received empty image (all zeros or NaNs).")
+    return img
+
+def download_image_bands(lat, lon, size, filename, bands, bands_dir, mode=SH_DOWNLOAD_MODE):
     """
     Downloads separate Sentinel image bandsfor the given latitude and longitude.
     
@@ -137,21 +167,58 @@ def download_image_bands(lat, lon, size, filename=None, bands=["B02", "B03", "B0
         size (tuple): Size of the image in pixels (width, height).
         filename (str): Filename to save the image.
         bands (list): List of bands to download (e.g., ["B02", "B03", "B04"]).
+        bands_dir (Path): Dir where the band files are saved.
+        mode (str): _Optional_; How bands are requested:
+            - `multiband`: one request with a multi-band evalscript, split into one file per band.
+            - `concurrent`: one request per band, in parallel. The cloud-free date range found for the first band is shared with the rest.
+            - `sequential`: one request (and date search) per band, one after the other.
+            Default is `SH_DOWNLOAD_MODE`.
     Returns:
         band_files_list (list): List of band file paths.
     """
-    band_files_list = []
-    for band in bands:
-        file_path = filename + f"-{band}_{RESOLUTION}m.tif" if filename is not None else f"{str(lat)[:8]}_{str(lon)[:8]}-{band}_{RESOLUTION}m.tif"
-        print(f"Fetching images for coordinates: {lat}, {lon}")
-        
-        # Get script that will retrieve  image bands
-        evalscript_band = generate_evalscript(
-            bands=[band],
-        )
+    file_paths = [filename + f"-{band}_{RESOLUTION}m.tif" if filename is not None else f"{str(lat)[:8]}_{str(lon)[:8]}-{band}_{RESOLUTION}m.tif" for band in bands]
+    print(f"Fetching images for coordinates: {lat}, {lon} ({mode})")
+
+    if mode == "multiband":
+        bbox, width, height, initial_date, final_date = get_request_window(lat, lon, size, file_paths[0])
+        image = get_cloudless_image(generate_evalscript(bands=bands), bbox, width, height, get_sh_config(), initial_date, final_date)
+        for i, file_path in enumerate(file_paths):
+            save_tiff(image[..., i], bands_dir / file_path, bbox, crs="EPSG:4326")
+            print(f"Sentinel band image saved to {bands_dir / file_path}")
+
+    elif mode == "concurrent":
+        # Dates are resolved on this thread: `request_date` is not visible from the worker threads
+        bbox, width, height, initial_date, final_date = get_request_window(lat, lon, size, file_paths[0])
+        config = get_sh_config()
+        first_image, time_interval, maxcc = find_cloudless_image(generate_evalscript(bands=[bands[0]]), bbox, width, height, config, initial_date, final_date)
+        save_tiff(first_image, bands_dir / file_paths[0], bbox, crs="EPSG:4326")
+
+        def download_band(band, file_path):
+            evalscript_band = generate_evalscript(bands=[band])
+            try:
+                image = request_sentinel_image(evalscript_band, bbox, width, height, config, time_interval, maxcc)
+            except ValueError:
+                # Scene missing for this band only: fall back to the full search
+                image = get_cloudless_image(evalscript_band, bbox, width, height, config, initial_date, final_date)
+            save_tiff(image, bands_dir / file_path, bbox, crs="EPSG:4326")
+            print(f"Sentinel band image saved to {bands_dir / file_path}")
+
+        with ThreadPoolExecutor(max_workers=max(1, len(bands) - 1)) as executor:
+            for future in [executor.submit(download_band, band, file_path) for band, file_path in zip(bands[1:], file_paths[1:])]:
+                future.result()
+
+    elif mode == "sequential":
+        for band, file_path in zip(bands, file_paths):
+            # Get script that will retrieve  image bands
+            evalscript_band = generate_evalscript(
+                bands=[band],
+            )
+
+            download_sentinel_image(lat, lon, size, file_path, evalscript_band, bands_dir)
+            print()
 
-        download_sentinel_image(lat, lon, size, file_path, evalscript_band)
-        print()
-        band_files_list.append(str(BANDS_DIR / file_path))
+    else:
+        raise ValueError(f"Unknown Sentinel Hub download mode '{mode}', expected `multiband`, `concurrent` or `sequential`")
 
+    band_files_list = [str(bands_dir / file_path) for file_path in file_paths]
     return band_files_list
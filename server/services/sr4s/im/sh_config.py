@@ -1,3 +1,4 @@
+from functools import lru_cache
 from sentinelhub import SHConfig
 from dotenv import load_dotenv
 
@@ -15,12 +16,20 @@ CLIENT_ID = os.getenv('COPERNICUS_CLIENT_ID')
 CLIENT_SECRET = os.getenv('COPERNICUS_CLIENT_SECRET')
 CONFIG_NAME = str(os.getenv('COPERNICUS_CONFIG_NAME'))
 
-# Setup config params for Copernicus dataspace Ecosystem users
-config = SHConfig()
+@lru_cache(maxsize=1)
+def get_sh_config() -> SHConfig:
+    """
+    Builds (and saves under `CONFIG_NAME`) the SentinelHub config for Copernicus Dataspace Ecosystem users, on first use.
+    """
+    config = SHConfig()
 
-config.sh_client_id = CLIENT_ID
-config.sh_client_secret = CLIENT_SECRET
-config.sh_base_url = 'https://sh.dataspace.copernicus.eu'
-config.sh_token_url = 'https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token'
+    config.sh_client_id = CLIENT_ID
+    config.sh_client_secret = CLIENT_SECRET
+    config.sh_base_url = 'https://sh.dataspace.copernicus.eu'
+    config.sh_token_url = 'https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token'
 
-config.save(CONFIG_NAME)
\ No newline at end of file
+    config.save(CONFIG_NAME)
+
+    if not config.sh_client_id or not config.sh_client_secret:
+        print("Warning! To use Process API, please provide the credentials (OAuth client ID and client secret).")
+    return config
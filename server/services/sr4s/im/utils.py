@@ -219,6 +219,8 @@ def save_tiff(image: np.ndarray, filename: str, bbox, crs="EPSG:4326"):
         bbox (sentinelhub.BBox): Bounding box used in the request.
         crs (str): Coordinate reference system (default WGS84).
     """
+    if image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
     height, width = image.shape[:2]
     count = 1 if image.ndim == 2 else image.shape[2]
 
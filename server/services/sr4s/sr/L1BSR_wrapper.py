@@ -1,27 +1,135 @@
 import numpy as np
 import os
+import rasterio
+import tempfile
+import threading
+import time
 import torch
 
 from typing import Optional
 
 from safetensors.torch import load_file as load_safetensors
 
+from .precision import PRECISION_MODES, quantize_conv_layers
 from .RCAN_wrapper import RCAN
+from .tiling import TilingConfig, get_tiling_error, tiled_super_resolve
 from .utils import to_torch_4ch, from_torch_to_u16
 
+SCALE = 2  # RCAN upscaling factor
+
 class L1BSR:
-    def __init__(self, weights_path: str, device: Optional[str] = None):
+    def __init__(self, weights_path: str, device: Optional[str] = None, tiling: Optional[TilingConfig] = None, num_threads: Optional[int] = None, precision: str = "fp32"):
         if device is None: device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device = torch.device(device)
         self.model = RCAN(n_colors=4).to(self.device).eval()
         if not os.path.isfile(weights_path): raise FileNotFoundError(f"Model file not found: {weights_path}")
+        self.weights_path = weights_path
         state = load_safetensors(weights_path, device="cpu")
         self.model.load_state_dict(state, strict=False)
         torch.set_grad_enabled(False)
+        self.tiling = tiling
+        if num_threads: torch.set_num_threads(num_threads)
+        self.int8_model = None
+        self._calibration_lock = threading.Lock()  # concurrent requests must not calibrate the int8 model twice
+        self.set_precision(precision)
+
+    def set_precision(self, precision: str, calibration_images: Optional[list] = None):
+        """
+        Selects the inference mode: `fp32`, `bf16` (CPU/GPU autocast) or `int8` (quantized conv layers, CPU only).
+        `int8` is calibrated on `calibration_images` (HxWx4 uint16), or on the first image super-resolved if none are given.
+        """
+        if precision not in PRECISION_MODES: raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISION_MODES}")
+        if precision == "int8" and self.device.type != "cpu": raise ValueError("int8 inference is only supported on CPU")
+        self.precision = precision
+        if precision == "int8" and calibration_images:
+            self.calibrate(calibration_images)
+
+    def calibrate(self, calibration_images: list):
+        """
+        Builds the int8 model, calibrating activation ranges on the given HxWx4 uint16 images.
+        """
+        inputs = [to_torch_4ch(img, self.device) for img in calibration_images]
+        self.int8_model = quantize_conv_layers(self.model, inputs)
+
+    def super_resolve(self, img_bgrn_u16: np.ndarray, tiled: Optional[bool] = None) -> np.ndarray:
+        """
+        Super-resolves an HxWx4 uint16 image. Images larger than the tile size are processed tile by tile (see `tiling.py`)
+        unless `tiled=False` or the engine was built without a `TilingConfig`.
+        """
+        if self.precision == "int8" and self.int8_model is None:
+            with self._calibration_lock:
+                if self.int8_model is None:
+                    self.calibrate([img_bgrn_u16])
+        return self._super_resolve(img_bgrn_u16, tiled)
 
     @torch.inference_mode()
-    def super_resolve(self, img_bgrn_u16: np.ndarray) -> np.ndarray:
+    def _super_resolve(self, img_bgrn_u16: np.ndarray, tiled: Optional[bool]) -> np.ndarray:
         ten = to_torch_4ch(img_bgrn_u16, self.device)
-        sr = self.model(ten)
+        if tiled is None:
+            tiled = self.tiling is not None and max(ten.shape[-2:]) > self.tiling.tile_size
+        if tiled:
+            sr_np = tiled_super_resolve(self._run_batch, ten[0].cpu().numpy(), SCALE, self.tiling)
+            sr = torch.from_numpy(sr_np)[None]
+        else:
+            sr = self._forward(ten)
         out = from_torch_to_u16(sr)
-        return out
\ No newline at end of file
+        return out
+
+    def check_precision(self, img_bgrn_u16: np.ndarray, precision: Optional[str] = None) -> dict:
+        """
+        Compares the output of a reduced-precision mode against fp32 with `compute_metrics_for_pair` (PSNR, SSIM, RMSE...),
+        and reports the speedup. Runs on its own engine (same weights, device and tiling), so the shared engine's mode
+        is never switched under requests in flight.
+        Arguments:
+            img_bgrn_u16 (np.ndarray): HxWx4 uint16 test image.
+            precision (str): _Optional_; Mode to check. Defaults to the engine's current mode.
+        Returns:
+            row (dict): Metrics row from `compute_metrics_for_pair`, plus `fp32_seconds`, `seconds` and `speedup`.
+        """
+        from ....benchmark.sr.compare_sr_metrics import compute_metrics_for_pair
+
+        precision = precision or self.precision
+        engine = L1BSR(self.weights_path, device=str(self.device), tiling=self.tiling)
+        outputs, seconds = {}, {}
+        for mode in ("fp32", precision):
+            engine.set_precision(mode)
+            if mode == "int8": engine.calibrate([img_bgrn_u16])  # keep calibration out of the timing
+            start = time.perf_counter()
+            outputs[mode] = engine.super_resolve(img_bgrn_u16)
+            seconds[mode] = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = {mode: os.path.join(tmp_dir, f"{mode}.tif") for mode in outputs}
+            for mode, path in paths.items():
+                _write_tif(outputs[mode], path)
+            row = compute_metrics_for_pair(paths["fp32"], paths[precision], model_name=f"L1BSR-{precision}", ratio=SCALE, auto_normalize=False)
+        row.update({
+            "fp32_seconds": seconds["fp32"],
+            "seconds": seconds[precision],
+            "speedup": seconds["fp32"] / seconds[precision],
+        })
+        return row
+
+    def tiling_error(self, img_bgrn_u16: np.ndarray) -> dict:
+        """
+        Runs the image tiled and un-tiled and reports the difference (see `tiling.TILING_TOLERANCE`).
+        """
+        return get_tiling_error(self.super_resolve(img_bgrn_u16, tiled=True), self.super_resolve(img_bgrn_u16, tiled=False))
+
+    @torch.inference_mode()
+    def _run_batch(self, batch: np.ndarray) -> np.ndarray:
+        # Called from the tiling worker threads: inference mode is thread-local
+        return self._forward(torch.from_numpy(batch).to(self.device)).cpu().numpy()
+
+    def _forward(self, ten: torch.Tensor) -> torch.Tensor:
+        if self.precision == "bf16":
+            with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16):
+                return self.model(ten).float()
+        if self.precision == "int8":
+            return self.int8_model(ten)
+        return self.model(ten)
+
+def _write_tif(img_u16: np.ndarray, path: str):
+    h, w, c = img_u16.shape
+    with rasterio.open(path, "w", driver="GTiff", height=h, width=w, count=c, dtype=rasterio.uint16) as dst:
+        dst.write(np.moveaxis(img_u16, -1, 0))
\ No newline at end of file
@@ -1,4 +1,3 @@
-from datetime import datetime
 import os
 import glob
 from pathlib import Path
@@ -10,21 +9,44 @@ import rasterio
 
 from PIL import Image
 
-from ....benchmark.sr.constants import BM_DATA_DIR
+from ....benchmark.sr.constants import BM_DATA_DIR, BM_SR_DIR
 
-from ....config.constants import GET_SR_BENCHMARK, SR_BANDS, SR5M_DIR
+from ....config.constants import GET_SR_BENCHMARK, SR_BANDS
 from ....benchmark.sr.utils import copy_file_to_dir
 
 from .utils import percentile_stretch, stack_bgrn, make_grid
 from .L1BSR_wrapper import L1BSR
+from .tiling import TilingConfig
+from ....config.env_config import SR_NUM_THREADS, SR_PRECISION, SR_TILE_BATCH, SR_TILE_OVERLAP, SR_TILE_SIZE, SR_TILE_WORKERS
+from ....utils.job_utils import sr_inference_slot
+from ....utils.memory_raster_utils import MemoryRaster, open_raster, raster_name
+from ....utils.metrics_utils import span
+from ....utils.model_registry import get_model, register_model
 
 CURR_SCRIPT_DIR = Path(__file__).resolve().parent
 
 # --- Device ---
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# --- Load model ---
-ENGINE = L1BSR(weights_path=CURR_SCRIPT_DIR / "REC_Real_L1B.safetensors", device=DEVICE)
+# --- Model (loaded on first use, see `server/utils/model_registry.py`) ---
+MODEL_NAME = "l1bsr"
+TILING = TilingConfig(SR_TILE_SIZE, SR_TILE_OVERLAP, SR_TILE_BATCH, SR_TILE_WORKERS) if SR_TILE_SIZE else None
+
+def load_l1bsr_engine() -> L1BSR:
+    return L1BSR(weights_path=CURR_SCRIPT_DIR / "REC_Real_L1B.safetensors", device=DEVICE, tiling=TILING, num_threads=SR_NUM_THREADS, precision=SR_PRECISION)
+
+def warm_up_l1bsr_engine(engine: L1BSR):
+    if engine.precision == "int8" and engine.int8_model is None:
+        return  # int8 calibrates on the first real image, not on a dummy one
+    engine.super_resolve(np.zeros((64, 64, 4), dtype=np.uint16))
+
+def get_l1bsr_engine() -> L1BSR:
+    """
+    Returns the process-wide L1BSR engine, loading the safetensors weights on first use.
+    """
+    return get_model(MODEL_NAME)
+
+register_model(MODEL_NAME, load_l1bsr_engine, warm_up_l1bsr_engine)
 
 def save_rgb_png(sr, out_path):
     """Save SR result as stretched RGB PNG"""
@@ -37,8 +59,14 @@ def save_multiband_tif(sr: np.ndarray, reference_band: str, out_path: str):
     Save SR result as multiband GeoTIFF using metadata from a reference band.
     Assumes sr has shape (H, W, 4).
     """
-    with rasterio.open(reference_band) as src:
-        profile = src.profile
+    to_multiband_raster(sr, reference_band, os.path.basename(out_path)).save(out_path)
+
+def to_multiband_raster(sr: np.ndarray, reference_band, name: str) -> MemoryRaster:
+    """
+    Builds the multiband raster of an SR result (H, W, C) in memory, georeferenced from a reference band (path or `MemoryRaster`).
+    """
+    with open_raster(reference_band) as src:
+        profile = src.profile.copy()
 
     h, w, c = sr.shape
     transform = profile["transform"]
@@ -60,6 +88,7 @@ def save_multiband_tif(sr: np.ndarray, reference_band: str, out_path: str):
     sr_clean = np.nan_to_num(sr, nan=0, posinf=0, neginf=0).astype(np.uint16)
 
     profile.update({
+        "driver": "GTiff",
         "height": h,
         "width": w,
         "transform": transform,
@@ -68,34 +97,41 @@ def save_multiband_tif(sr: np.ndarray, reference_band: str, out_path: str):
         "compress": "lzw",
         "nodata": 0,   # mark 0 as nodata
     })
+    return MemoryRaster(name, np.moveaxis(sr_clean, -1, 0), profile)
 
-    with rasterio.open(out_path, "w", **profile) as dst:
-        for i in range(c):
-            dst.write(sr_clean[..., i], i + 1)
-            dst.set_band_description(i + 1, f"B{i+1}")  # optional: label bands
-
-def process_directory(input_dir, output_dir=SR5M_DIR, save_as_tif=True):
+def process_directory(input_dir, output_dir, save_as_tif=True):
     """
     Process directory where image bands are found for all images found and super-resolves them.
     Saves SR image and comparison image between original and SR version.
     Generates output dir if it doesn't exist
     Arguments:
         input_dir (str | Path): Input directory path
-        output_dir (str | Path): Output directory path. Default is `sr/sr_5m`
+        output_dir (str | Path): Output directory path
         save_as_tif (bool): If `True`, saves uncropped SR image as TIF. Default to `True`.
     Returns:
         (str): SR PNG filename (even if also saved as TIF).
     """
-    start_time = datetime.now()
-
     all_files = glob.glob(os.path.join(input_dir, "*.tif*"))
+    return process_band_files(all_files, output_dir, save_as_tif)
+
+def process_band_files(band_files_list, output_dir, save_as_tif=True, in_memory=False):
+    """
+    Super-resolves every image whose SR bands are all in `band_files_list`. See `process_directory`.
+    Arguments:
+        band_files_list (list): Band files, or `MemoryRaster`s, named `{year}_{month}-{band}...`.
+        output_dir (str | Path): Output directory path
+        save_as_tif (bool): If `True`, saves uncropped SR image as TIF. Default to `True`.
+        in_memory (bool): If `True`, the SR image is returned as a `MemoryRaster` and nothing is written but the benchmark GeoTIFFs (`GET_SR_BENCHMARK`). Default to `False`.
+    Returns:
+        (str | MemoryRaster): SR PNG filename, or the SR image with `in_memory`.
+    """
     groups = {}
 
     sr_image_path = None
 
     # Group filenames with respective band file paths
-    for f in all_files:
-        base = os.path.basename(f)
+    for f in band_files_list:
+        base = raster_name(f)
         band = next((el for el in SR_BANDS if el in base), None)
         if band is None:
             continue
@@ -114,17 +150,7 @@ def process_directory(input_dir, output_dir=SR5M_DIR, save_as_tif=True):
             print(f"Skipping {sr_prefix}, missing bands: {missing}")
             continue
 
-        b02 = rasterio.open(band_files["B02"]).read(1)
-        b03 = rasterio.open(band_files["B03"]).read(1)
-        b04 = rasterio.open(band_files["B04"]).read(1)
-        b08 = rasterio.open(band_files["B08"]).read(1)
-
-        # Get original RGB image
-        rgb_before_u16 = np.stack([b04, b03, b02], axis=-1)
-        rgb_before_u8 = percentile_stretch(rgb_before_u16)
-        h, w, _ = rgb_before_u8.shape
-
-        rgb_before_u8_resized = np.array(Image.fromarray(rgb_before_u8).resize((w*2, h*2), cv2.INTER_NEAREST))
+        b02, b03, b04, b08 = (read_first_band(band_files[band]) for band in ("B02", "B03", "B04", "B08"))
 
         # Stack input
         img_bgrn = stack_bgrn(
@@ -135,13 +161,33 @@ def process_directory(input_dir, output_dir=SR5M_DIR, save_as_tif=True):
         )
 
         # Run SR
-        sr_u16 = ENGINE.super_resolve(img_bgrn)
+        with sr_inference_slot(), span("l1bsr_inference"):
+            sr_u16 = get_l1bsr_engine().super_resolve(img_bgrn)
+
+        if in_memory:
+            sr_image_path = to_multiband_raster(sr_u16, band_files["B02"], f"{sr_prefix}.tif")
+            print(f"SR image kept in memory: {sr_prefix}")
+            if GET_SR_BENCHMARK:
+                # Only the GeoTIFFs the benchmark reads back are written
+                timestamp = str(time.time())
+                print(f"Saved TIF: {sr_image_path.save(os.path.join(BM_SR_DIR, f'{timestamp}_SR4S.tif'))}")
+                og_out_tif = to_multiband_raster(img_bgrn, band_files["B02"], f"{timestamp}_{og_prefix}.tif").save(os.path.join(BM_DATA_DIR, f"{timestamp}_{og_prefix}.tif"))
+                print(f"Saved TIF: {og_out_tif}")
+            continue
+
+        # Get original RGB image
+        rgb_before_u16 = np.stack([b04, b03, b02], axis=-1)
+        rgb_before_u8 = percentile_stretch(rgb_before_u16)
+        h, w, _ = rgb_before_u8.shape
+
+        rgb_before_u8_resized = np.array(Image.fromarray(rgb_before_u8).resize((w*2, h*2), cv2.INTER_NEAREST))
 
         # Save PNG
         output_dir.mkdir(parents=True, exist_ok=True)
         out_png = os.path.join(output_dir, f"{sr_prefix}.png")
         sr_image_path = out_png
-        save_rgb_png(sr_u16, out_png)
+        with span("png_encode"):
+            save_rgb_png(sr_u16, out_png)
         print(f"Saved PNG: {out_png}")
 
         # Save TIF
@@ -166,6 +212,8 @@ def process_directory(input_dir, output_dir=SR5M_DIR, save_as_tif=True):
         )
         Image.fromarray(grid).save(comp_png)
         print(f"Saved comparison grid: {comp_png}")
-
-        print(f"\nTotal time taken:\t{datetime.now() - start_time}")
     return sr_image_path
+
+def read_first_band(source) -> np.ndarray:
+    with open_raster(source) as src:
+        return src.read(1)
@@ -0,0 +1,52 @@
+import copy
+import torch
+import torch.nn as nn
+
+from torch.ao.quantization import DeQuantStub, QuantStub, convert, get_default_qconfig, prepare
+
+PRECISION_MODES = ("fp32", "bf16", "int8")
+
+class QuantizedConv(nn.Module):
+    """
+    Runs a single conv layer in int8: quantizes its input and dequantizes its output, so the rest of RCAN
+    (residual adds, channel attention, pixel shuffle) stays in float32.
+    """
+    def __init__(self, conv: nn.Conv2d):
+        super().__init__()
+        self.quant = QuantStub()
+        self.conv = conv
+        self.dequant = DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.conv(self.quant(x)))
+
+def quantize_conv_layers(model: nn.Module, calibration_inputs: list, backend: str = "x86") -> nn.Module:
+    """
+    Returns an int8 copy of `model` in which every 3x3 conv (except the output conv) uses static post-training quantization.
+    Dynamic quantization only covers Linear/LSTM layers, and RCAN has none, so activation ranges are calibrated on `calibration_inputs`.
+    Arguments:
+        model (nn.Module): float32 model, on CPU.
+        calibration_inputs (list): `1 x C x H x W` float32 tensors representative of the inputs.
+        backend (str): _Optional_; Quantized engine (`x86`, `fbgemm` or `qnnpack` on ARM).
+    Returns:
+        quantized_model (nn.Module): CPU-only quantized model.
+    """
+    torch.backends.quantized.engine = backend
+    quantized_model = copy.deepcopy(model).cpu().eval()
+    qconfig = get_default_qconfig(backend)
+
+    convs = [(name, module) for name, module in quantized_model.named_modules()
+             if isinstance(module, nn.Conv2d) and module.kernel_size == (3, 3)]
+    for name, conv in convs[:-1]:  # keep the output conv in float32
+        parent_name, __, child_name = name.rpartition(".")
+        parent = quantized_model.get_submodule(parent_name) if parent_name else quantized_model
+        wrapper = QuantizedConv(conv)
+        wrapper.qconfig = qconfig
+        setattr(parent, child_name, wrapper)
+
+    prepare(quantized_model, inplace=True)
+    with torch.no_grad():  # not inference mode: observers must stay usable by `convert`
+        for ten in calibration_inputs:
+            quantized_model(ten.cpu())
+    convert(quantized_model, inplace=True)
+    return quantized_model
@@ -0,0 +1,112 @@
+import numpy as np
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+# Tiled output is not bit-exact: RCAN's channel attention pools over the whole input and its receptive field is wider than
+# the overlap. Accepted difference vs. the un-tiled output: mean absolute error below 1% of the un-tiled mean value.
+# Not yet measured on the real model over real parcels, which is why tiling is off by default (`SR_TILE_SIZE=0`).
+TILING_TOLERANCE = 0.01
+
+@dataclass
+class TilingConfig:
+    """
+    Tiled inference settings. Peak activation memory grows with `workers * batch_size * tile_size²` instead of the full image size.
+    """
+    tile_size: int = 256  # px (input resolution)
+    overlap: int = 32  # px shared by neighbouring tiles, blended with a linear feather
+    batch_size: int = 4  # tiles per forward pass
+    workers: int = 1  # batches run concurrently (each one uses torch's intra-op threads)
+
+def get_tile_origins(length: int, tile_size: int, overlap: int) -> list[int]:
+    """
+    Start offsets of tiles covering `[0, length)` with at least `overlap` px between neighbours.
+    The last tile is aligned to the end, so every tile has the same size (needed to batch them).
+    """
+    if length <= tile_size:
+        return [0]
+    stride = tile_size - overlap
+    if stride <= 0:
+        raise ValueError(f"Tile overlap ({overlap}) must be smaller than the tile size ({tile_size})")
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+def make_feather_weights(height: int, width: int, feather: int) -> np.ndarray:
+    """
+    Blending window for a tile: 1 in the centre, ramping linearly down towards the borders over `feather` px.
+    Weights never reach 0, so pixels covered by a single tile (image borders) keep their value after normalisation.
+    """
+    def ramp(length):
+        n = min(feather, length // 2)
+        if n == 0:
+            return np.ones(length, dtype=np.float32)
+        edge = (np.arange(n, dtype=np.float32) + 0.5) / n
+        ramp = np.ones(length, dtype=np.float32)
+        ramp[:n] = edge
+        ramp[length - n:] = edge[::-1]
+        return ramp
+    return np.outer(ramp(height), ramp(width))
+
+def tiled_super_resolve(run_batch: Callable[[np.ndarray], np.ndarray], image: np.ndarray, scale: int, config: TilingConfig = None) -> np.ndarray:
+    """
+    Super-resolves an image tile by tile and blends the overlapping tiles back together.
+    Arguments:
+        run_batch (Callable): Runs the model on a `N x C x h x w` float32 batch, returning `N x C x h*scale x w*scale`.
+        image (np.ndarray): `C x H x W` float32 input image.
+        scale (int): Model upscaling factor.
+        config (TilingConfig): _Optional_; Tile size, overlap, batch size and workers.
+    Returns:
+        sr (np.ndarray): `C x H*scale x W*scale` float32 SR image.
+    """
+    config = config or TilingConfig()
+    channels, height, width = image.shape
+    tile_h, tile_w = min(config.tile_size, height), min(config.tile_size, width)
+    tiles = [(y, x) for y in get_tile_origins(height, tile_h, config.overlap)
+                    for x in get_tile_origins(width, tile_w, config.overlap)]
+    batches = [tiles[i:i + config.batch_size] for i in range(0, len(tiles), config.batch_size)]
+
+    weights = make_feather_weights(tile_h * scale, tile_w * scale, config.overlap * scale)
+    sr = np.zeros((channels, height * scale, width * scale), dtype=np.float32)
+    weight_sum = np.zeros((height * scale, width * scale), dtype=np.float32)
+
+    def run(batch):
+        return run_batch(np.stack([image[:, y:y + tile_h, x:x + tile_w] for y, x in batch]).astype(np.float32))
+
+    def blend(batch, sr_batch):
+        for (y, x), sr_tile in zip(batch, sr_batch):
+            ys, xs = slice(y * scale, (y + tile_h) * scale), slice(x * scale, (x + tile_w) * scale)
+            sr[:, ys, xs] += sr_tile * weights
+            weight_sum[ys, xs] += weights
+
+    # Keep at most `workers` batches in flight; blending stays on this thread
+    workers = max(1, config.workers)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            pending.append((batch, executor.submit(run, batch)))
+            if len(pending) >= workers:
+                batch, future = pending.popleft()
+                blend(batch, future.result())
+        while pending:
+            batch, future = pending.popleft()
+            blend(batch, future.result())
+
+    return sr / weight_sum
+
+def get_tiling_error(tiled: np.ndarray, untiled: np.ndarray) -> dict:
+    """
+    Compares a tiled SR output against the un-tiled one (same shape, any dtype).
+    Returns:
+        error (dict): Max and mean absolute difference, mean difference relative to the un-tiled mean, and whether it is within `TILING_TOLERANCE`.
+    """
+    diff = np.abs(tiled.astype(np.float64) - untiled.astype(np.float64))
+    relative_error = float(diff.mean() / max(float(np.abs(untiled).mean()), 1e-12))
+    return {
+        "maxAbsError": float(diff.max()),
+        "meanAbsError": float(diff.mean()),
+        "relativeError": relative_error,
+        "withinTolerance": relative_error <= TILING_TOLERANCE,
+    }
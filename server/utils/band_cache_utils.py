@@ -0,0 +1,99 @@
+import os
+import shutil
+import threading
+import uuid
+
+from pathlib import Path
+
+from ..config.constants import BAND_CACHE_DIR
+from ..config.env_config import BAND_CACHE_MAX_BYTES
+from .cache_utils import DiskLRUCache
+
+# Whole band composites downloaded from MinIO, shared by every request (the request workspaces are short-lived)
+BAND_CACHE = DiskLRUCache(BAND_CACHE_DIR, BAND_CACHE_MAX_BYTES, name="minio_bands")
+
+BAND_FILENAME = "band.tif"
+
+# One lock per band key, so concurrent requests for the same composite share one download. The locks only apply within
+# one process: workers of another process may download the same composite at the same time (the cache stays consistent,
+# as entries are written to a temp file and moved into place, but the download is duplicated)
+KEY_LOCKS: dict[str, threading.Lock] = {}
+KEY_LOCKS_LOCK = threading.Lock()
+
+def get_band_key(zone, year, month_folder, band) -> str:
+    """
+    Cache key of a MinIO band composite: `{zone}_{year}_{month}_{band}`.
+    """
+    return f"{zone}_{year}_{month_folder}_{band}"
+
+def get_cached_band(key: str, etag: str) -> Path | None:
+    """
+    Path of a cached band composite, if it's still the current version of the MinIO object.
+    Arguments:
+        key (str): Band key from `get_band_key`.
+        etag (str): Current ETag of the MinIO object. Entries with another ETag are dropped.
+    Returns:
+        band_path (Path | None): Cached `.tif`, or `None` on a miss.
+    """
+    entry_dir = BAND_CACHE.get(key)
+    if entry_dir is None:
+        return None
+    metadata = BAND_CACHE.read_metadata(key) or {}
+    if metadata.get("etag") != etag:
+        print(f"♻️  Cached band {key} is outdated (ETag changed), downloading it again")
+        BAND_CACHE.delete(key)
+        return None
+    return entry_dir / BAND_FILENAME
+
+def fetch_band(client, bucket_name, file, key: str, local_file_path):
+    """
+    Gets a MinIO band composite through the band cache and links it to `local_file_path`.
+    Only one thread of this process downloads a given band at a time: the others wait for it and then read the cached copy.
+    Other processes aren't coordinated with, and may download the same band concurrently.
+    Arguments:
+        client (Minio): MinIO client.
+        bucket_name (str): MinIO bucket.
+        file (Object): Listed MinIO object (name, ETag and size).
+        key (str): Band key from `get_band_key`.
+        local_file_path (str): Path where the band is needed.
+    Returns:
+        local_file_path (str): Same as the argument.
+    """
+    with get_key_lock(key):
+        band_path = get_cached_band(key, file.etag)
+        if band_path is not None:
+            try:
+                link_or_copy(band_path, local_file_path)
+                print(f"⚡ Band {key} served from cache")
+                return local_file_path
+            except FileNotFoundError:
+                pass  # evicted by another process meanwhile
+
+        BAND_CACHE.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = BAND_CACHE.root / f".tmp-{uuid.uuid4().hex}.tif"
+        try:
+            client.fget_object(bucket_name, file.object_name, str(tmp_path))
+            # Link before caching: the entry may be evicted right away if it doesn't fit the budget
+            link_or_copy(tmp_path, local_file_path)
+            BAND_CACHE.put(key, {BAND_FILENAME: tmp_path}, {"etag": file.etag, "object_name": file.object_name, "size": file.size}, move=True)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return local_file_path
+
+def get_key_lock(key: str) -> threading.Lock:
+    with KEY_LOCKS_LOCK:
+        return KEY_LOCKS.setdefault(key, threading.Lock())
+
+def link_or_copy(src, dst):
+    """
+    Hard-links `src` to `dst` (no copy, and unaffected by a later eviction of `src`), copying if linking isn't possible.
+    """
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        shutil.copyfile(src, dst)
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from pathlib import Path
+
+METADATA_FILENAME = "meta.json"
+
+class DiskLRUCache:
+    """
+    Persistent, size-bounded on-disk cache. Each entry is a directory named after its key, holding
+    the cached files plus a `meta.json` file. Entries are written atomically (temp dir + rename), and
+    their mtime is refreshed on every hit, so least recently used entries can be evicted by any
+    process sharing the cache dir without a shared index.
+    """
+
+    def __init__(self, root: Path | str, max_bytes: int, name: str = "cache"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / key
+
+    def get(self, key: str) -> Path | None:
+        """
+        Looks up an entry and marks it as recently used.
+        Arguments:
+            key (str): Entry key.
+        Returns:
+            entry_dir (Path | None): Directory holding the cached files, or `None` on a miss.
+        """
+        entry_dir = self.entry_dir(key)
+        try:
+            os.utime(entry_dir)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry_dir
+
+    def read_metadata(self, key: str) -> dict | None:
+        try:
+            with open(self.entry_dir(key) / METADATA_FILENAME, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, files: dict, metadata: dict = None, move: bool = False) -> Path:
+        """
+        Stores files under `key`, then evicts least recently used entries over the byte budget.
+        Arguments:
+            key (str): Entry key.
+            files (dict): Mapping of cached filename → source file path. Sources are copied unless `move` is set.
+            metadata (dict): _Optional_; JSON-serialisable metadata stored with the entry.
+            move (bool): _Optional_; Move the sources instead of copying them (large files on the cache's filesystem).
+        Returns:
+            entry_dir (Path): Directory holding the cached files.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp_dir.mkdir()
+        try:
+            for filename, src in files.items():
+                if move:
+                    shutil.move(src, tmp_dir / filename)
+                else:
+                    shutil.copyfile(src, tmp_dir / filename)
+            with open(tmp_dir / METADATA_FILENAME, "w", encoding="utf-8") as f:
+                json.dump({**(metadata or {}), "key": key, "stored_at": time.time()}, f)
+            os.rename(tmp_dir, self.entry_dir(key))
+        except OSError:
+            # Another thread/process stored the same key first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not self.entry_dir(key).exists():
+                raise
+        self._count("puts")
+        self.evict()
+        return self.entry_dir(key)
+
+    def delete(self, key: str):
+        """
+        Removes an entry (e.g. one that no longer matches its source).
+        """
+        entry_dir = self.entry_dir(key)
+        tmp_dir = self.root / f".del-{uuid.uuid4().hex}"
+        try:
+            os.rename(entry_dir, tmp_dir)  # readers never see a half-deleted entry
+        except FileNotFoundError:
+            return
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`.
+        Returns:
+            evicted (int): Number of entries removed.
+        """
+        entries = []
+        total_bytes = 0
+        for entry in self._scan():
+            size = dir_size(entry.path)
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total_bytes += size
+
+        evicted = 0
+        for __, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_bytes -= size
+            evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+        return evicted
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters for this process and the current size of the cache.
+        """
+        entries = list(self._scan())
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "puts": self.puts,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": sum(dir_size(entry.path) for entry in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _scan(self):
+        if not self.root.is_dir():
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and not entry.name.startswith("."):
+                yield entry
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+def dir_size(path: Path | str) -> int:
+    """
+    Total size in bytes of the files in a directory (non-recursive).
+    """
+    total = 0
+    for entry in os.scandir(path):
+        try:
+            if entry.is_file():
+                total += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+@dataclass
+class ChatSession:
+    id: str
+    chat: Any
+    last_used: float = field(default_factory=time.monotonic)
+    trimmed: int = 0  # history entries dropped by the `max_history` cap
+    state: dict = field(default_factory=dict)  # JSON-compatible per-session data, stored along with the history
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)  # guards `state` updates
+
+class ChatSessionManager:
+    """
+    Live chats keyed by session id. At most `max_sessions` are kept in memory (least recently used first out), and
+    sessions idle for `ttl` seconds are evicted too. Evicted sessions are written to `store_dir` as JSON and rehydrated
+    on their next message. Each session's own history (after the shared initial turns) is capped to its last `max_history` contents.
+    Chats reported as outdated by `is_outdated` (e.g. built from older prompts) are rebuilt from their own history.
+    """
+    def __init__(self, create_chat: Callable[[list], Any], get_session_history: Callable[[Any], list], dump_content: Callable[[Any], dict],
+                 load_content: Callable[[dict], Any], store_dir: Path | str, max_sessions: int, ttl: float, max_history: int, store_ttl: float,
+                 is_outdated: Callable[[Any], bool] = None):
+        """
+        Arguments:
+            create_chat (Callable): Builds a chat from a session's own history (`[]` for a new session).
+            get_session_history (Callable): Returns a chat's history without the shared initial turns.
+            dump_content (Callable): Serialises one history entry to a JSON-compatible dict.
+            load_content (Callable): Inverse of `dump_content`.
+            store_dir (Path | str): Where evicted sessions are stored.
+            max_sessions (int): Max live sessions.
+            ttl (float): Seconds a session may stay idle in memory.
+            max_history (int): Max history entries kept per session.
+            store_ttl (float): Seconds an evicted session is kept in the store.
+            is_outdated (Callable): _Optional_; Whether a chat must be rebuilt before its next message.
+        """
+        self.create_chat = create_chat
+        self.get_session_history = get_session_history
+        self.dump_content = dump_content
+        self.load_content = load_content
+        self.store_dir = Path(store_dir)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_history = max_history
+        self.store_ttl = store_ttl
+        self.is_outdated = is_outdated
+        self.sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self.evictions = 0
+        self.rehydrations = 0
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()  # serialises session creation, so a stored session is rehydrated once
+
+    def get(self, session_id: str):
+        """
+        Returns the session's chat (see `session`).
+        """
+        return self.session(session_id).chat
+
+    def session(self, session_id: str) -> ChatSession:
+        """
+        Returns the session: live, rehydrated from the store, or new. Rebuilds its chat if it is outdated or its history
+        grew past `max_history`.
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self.sessions.move_to_end(session_id)
+        if session is None:
+            session = self._open(session_id)
+        self._rebuild_if_needed(session)
+        self._evict_over_limits(keep=session_id)
+        return session
+
+    def evict(self, session_id: str):
+        """
+        Writes a live session to the store and drops it from memory.
+        """
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self._save(session)
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = len(self.sessions)
+        stored = len(list(self.store_dir.glob("*.json"))) if self.store_dir.is_dir() else 0
+        return {"live": live, "stored": stored, "evictions": self.evictions, "rehydrations": self.rehydrations}
+
+    def _open(self, session_id: str) -> ChatSession:
+        with self._open_lock:
+            with self._lock:
+                # Another request may have opened it meanwhile
+                session = self.sessions.get(session_id)
+            if session is None:
+                history, trimmed, state = self._load(session_id)
+                session = ChatSession(session_id, self.create_chat(history), trimmed=trimmed, state=state)
+                with self._lock:
+                    self.sessions[session_id] = session
+        return session
+
+    def _rebuild_if_needed(self, session: ChatSession):
+        history = self.get_session_history(session.chat)
+        if len(history) > self.max_history:
+            length = len(history)
+            history = history[-self.max_history:]
+            # Start on a user turn
+            while history and getattr(history[0], "role", None) != "user":
+                history = history[1:]
+            session.trimmed += length - len(history)
+            print(f"✂️ Chat session history trimmed to {len(history)} entries")
+        elif self.is_outdated is None or not self.is_outdated(session.chat):
+            return
+        session.chat = self.create_chat(history)
+
+    def _evict_over_limits(self, keep: str):
+        expiry = time.monotonic() - self.ttl
+        evicted = []
+        with self._lock:
+            while self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if oldest.id == keep or (len(self.sessions) <= self.max_sessions and oldest.last_used >= expiry):
+                    break
+                evicted.append(self.sessions.popitem(last=False)[1])
+        for session in evicted:
+            self._save(session)
+        if evicted:
+            self._cleanup_store()
+
+    def _path(self, session_id: str) -> Path:
+        return self.store_dir / f"{hashlib.sha1(session_id.encode()).hexdigest()}.json"
+
+    def _save(self, session: ChatSession):
+        history = [self.dump_content(content) for content in self.get_session_history(session.chat)]
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(session.id)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"id": session.id, "history": history, "trimmed": session.trimmed, "state": session.state}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.evictions += 1
+
+    def _load(self, session_id: str) -> tuple[list, int, dict]:
+        path = self._path(session_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return [], 0, {}
+        os.unlink(path)
+        with self._lock:
+            self.rehydrations += 1
+        return [self.load_content(content) for content in data["history"]], data.get("trimmed", 0), data.get("state", {})
+
+    def _cleanup_store(self):
+        expiry = time.time() - self.store_ttl
+        for path in self.store_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < expiry:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
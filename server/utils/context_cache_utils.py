@@ -0,0 +1,91 @@
+import threading
+import time
+
+from typing import Callable
+
+class ContextCache:
+    """
+    Explicit Gemini context cache of a static prompt prefix (system instructions and initial history), so chats reference
+    it by name instead of re-sending it on every turn. The cache is recreated when its `key` changes (e.g. the prompt
+    files were edited), its TTL is extended while it is in use, and it is left to expire once idle.
+    """
+    def __init__(self, get_client: Callable, model: str, ttl: int, refresh_margin: int):
+        """
+        Arguments:
+            get_client (Callable): Returns the Gemini client (its `caches` API is used).
+            model (str): Model the cache is created for; chats using it must use the same model.
+            ttl (int): Seconds the cache lives after it is created or refreshed.
+            refresh_margin (int): Seconds before expiry at which a used cache gets its TTL extended.
+        """
+        self.get_client = get_client
+        self.model = model
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.name = None
+        self.key = None
+        self.expires_at = 0.0
+        self.retry_at = 0.0
+        self.creations = 0
+        self.refreshes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, system_instruction: str, contents: list) -> str | None:
+        """
+        Returns the name of the cached content for `key`, creating or refreshing it as needed.
+        Returns `None` if it cannot be created (e.g. the prefix is under the model's minimum cacheable size), in which
+        case the caller should send the prefix inline. Creation is retried after `refresh_margin` seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if key != self.key:
+                self._delete()
+                self.key = key
+                self.retry_at = 0.0
+            if self.name is not None and now < self.expires_at - self.refresh_margin:
+                return self.name
+            if self.name is not None and now < self.expires_at and self._refresh():
+                return self.name
+            if now >= self.retry_at:
+                self._create(system_instruction, contents)
+            return self.name
+
+    def stats(self) -> dict:
+        return {"active": int(self.name is not None), "creations": self.creations, "refreshes": self.refreshes, "failures": self.failures}
+
+    def _create(self, system_instruction: str, contents: list):
+        self.name = None
+        try:
+            cached_content = self.get_client().caches.create(
+                model=self.model,
+                config={"system_instruction": system_instruction, "contents": contents, "ttl": f"{self.ttl}s", "display_name": "agria-system-instructions"},
+            )
+        except Exception as e:
+            self.failures += 1
+            self.retry_at = time.monotonic() + self.refresh_margin
+            print(f"⚠️ Could not create the Gemini context cache, sending system instructions inline: {e}")
+            return
+        self.name = cached_content.name
+        self.expires_at = time.monotonic() + self.ttl
+        self.creations += 1
+        print(f"🗃️ Gemini context cache created: {self.name}")
+
+    def _refresh(self) -> bool:
+        expires_at = time.monotonic() + self.ttl
+        try:
+            self.get_client().caches.update(name=self.name, config={"ttl": f"{self.ttl}s"})
+        except Exception as e:
+            print(f"⚠️ Could not refresh the Gemini context cache: {e}")
+            return False
+        self.expires_at = expires_at
+        self.refreshes += 1
+        return True
+
+    def _delete(self):
+        if self.name is None:
+            return
+        try:
+            self.get_client().caches.delete(name=self.name)
+        except Exception as e:
+            print(f"⚠️ Could not delete the Gemini context cache: {e}")
+        self.name = None
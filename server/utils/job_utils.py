@@ -0,0 +1,32 @@
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..config.env_config import SR_MAX_CONCURRENCY
+
+# Callback `(stage, details)` of the parcel job running in the current context, if any
+stage_listener: ContextVar = ContextVar("stage_listener", default=None)
+
+# Bounds SR inference across all request/job threads, independently of HTTP concurrency
+SR_INFERENCE_SLOTS = threading.BoundedSemaphore(SR_MAX_CONCURRENCY)
+
+def report_stage(stage: str, **details):
+    """
+    Notifies the parcel job running in the current context that the pipeline entered a new stage.
+    Does nothing when called outside of a job (e.g. from the synchronous `/find-parcel` endpoint).
+    Arguments:
+        stage (str): Stage name. One of `PARCEL_JOB_STAGES`.
+        details: Extra JSON-serialisable info about the stage.
+    """
+    listener = stage_listener.get()
+    if listener is not None:
+        listener(stage, details)
+
+@contextmanager
+def sr_inference_slot():
+    """
+    Waits for one of the `SR_MAX_CONCURRENCY` SR inference slots and holds it while the block runs.
+    """
+    with SR_INFERENCE_SLOTS:
+        yield
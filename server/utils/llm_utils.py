@@ -1,7 +1,11 @@
 from ..benchmark.vlm.constants import BM_DIR, BM_PROMPT_LIST_FILE
 from ..config.constants import BASE_CONTEXT_PATH, BASE_PROMPTS_PATH, CALCULATIONS_RULE, CONTEXT_DOCUMENTS_FILE, EXCLUSIVITY_RULE, FULL_DESC_TRIGGER, MIME_TYPES, PROMPT_LIST_FILE, SHORT_DESC_TRIGGER
 from ..services.llm_services import upload_context_document
+from .prompt_registry_utils import PROMPT_REGISTRY
 from google.genai.types import Content, Part
+from pathlib import Path
+from stat import S_ISREG
+import hashlib
 import json
 import os
 
@@ -52,12 +56,25 @@ You will use two external references to construct the report:
 \n---END
 """
     system_instructions = role_prompt + classification_instruction + examples_instructions
+    PROMPT_REGISTRY.record_sections("chat", {"role": role_prompt, "classification": classification_instruction, "examples": examples_instructions})
 
     return system_instructions
 
+def get_prompts_fingerprint(base_path: str = BASE_PROMPTS_PATH) -> str:
+    """
+    Hash of the paths, sizes and modification times of all prompt files, which changes whenever one is edited.
+    """
+    stats = []
+    for path in sorted(Path(base_path).rglob("*")):
+        path_stat = path.stat()
+        if S_ISREG(path_stat.st_mode):
+            stats.append((str(path), path_stat.st_size, path_stat.st_mtime_ns))
+    return hashlib.sha1(json.dumps(stats).encode()).hexdigest()
+
 def load_prompt_from_json(json_path: str, prompt_type_key: str = 'role', is_image_desc_prompt: bool = False, base_path: str = BASE_PROMPTS_PATH) -> dict:
     """
     Reads a JSON file to get the prompt description and returns the content of the specified prompt file.
+    Files are read through `PROMPT_REGISTRY`, so unchanged files aren't read again.
     Args:
         json_path (str): Path to the JSON file containing prompt metadata.
         prompt_type_key (str): JSON key of the prompt info.
@@ -68,14 +85,9 @@ def load_prompt_from_json(json_path: str, prompt_type_key: str = 'role', is_imag
     """
     full_json_path = os.path.join(base_path, json_path).replace("\\", "/")
 
-    # Read JSON content
-    with open(full_json_path, 'r', encoding='utf-8') as json_file:
-        meta = json.load(json_file)
-    prompt_type = prompt_type_key
-
-    prompt_data = meta.get(prompt_type)
+    meta = PROMPT_REGISTRY.read_json(full_json_path)
+    prompt_data = meta.get(prompt_type_key)
     content = get_description_prompt(base_path, prompt_data, is_image_desc_prompt)
-    meta['content'] = content
 
     return content
 
@@ -92,16 +104,11 @@ def get_description_prompt(base_path, prompt_data, is_image_desc_prompt):
     content = "\n"
     if is_image_desc_prompt:
         prompt_example_dir = os.path.join(base_path, prompt_data["examples"]).replace("\\", "/")
-        for prompt_example_path in os.listdir(prompt_example_dir):
-            prompt_example_path = os.path.join(prompt_example_dir, prompt_example_path)
-            with open(prompt_example_path, 'r', encoding='utf-8') as f:
-                content += f.read()
+        content += PROMPT_REGISTRY.read_dir(prompt_example_dir)
     else:
         desc_filename = prompt_data["prompt_filepath"]
         prompt_path = os.path.join(base_path, desc_filename).replace("\\", "/")
-
-        with open(prompt_path, 'r', encoding='utf-8') as pf:
-            content += pf.read()
+        content += PROMPT_REGISTRY.read_text(prompt_path)
 
     return content
 
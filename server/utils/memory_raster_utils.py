@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import rasterio
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from rasterio.io import MemoryFile
+
+from ..config.env_config import RASTER_IO_MODE
+
+@dataclass
+class MemoryRaster:
+    """
+    GeoTIFF kept in memory instead of written to the request's workspace: a `count x height x width` array and its rasterio profile.
+    `name` is the filename it would have on disk, so dates and bands can still be parsed from it.
+    """
+    name: str
+    data: np.ndarray
+    profile: dict
+
+    @classmethod
+    def from_dataset(cls, src, name: str, data: np.ndarray = None, **profile_updates) -> "MemoryRaster":
+        """
+        Builds a raster from an open dataset's profile, with `data` (default: the whole dataset) and the given profile changes.
+        """
+        data = src.read() if data is None else data
+        profile = src.profile.copy()
+        for key in ("blockxsize", "blockysize", "tiled", "interleave", "compress"):
+            profile.pop(key, None)
+        profile.update(driver="GTiff", count=data.shape[0], height=data.shape[1], width=data.shape[2], dtype=data.dtype.name, **profile_updates)
+        return cls(name, data, profile)
+
+    @contextmanager
+    def open(self):
+        """
+        Opens the raster as a rasterio dataset (backed by a `MemoryFile`), for the functions that need one (mask, merge, WarpedVRT...).
+        """
+        profile = {key: value for key, value in self.profile.items() if key != "compress"}  # no need to encode it
+        with MemoryFile() as memfile:
+            with memfile.open(**profile) as dst:
+                dst.write(self.data)
+            with memfile.open() as src:
+                yield src
+
+    def save(self, path) -> str:
+        """
+        Writes the raster to disk (debugging/benchmarking).
+        """
+        os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+        with rasterio.open(path, "w", **self.profile) as dst:
+            dst.write(self.data)
+        return str(path)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+def use_memory_rasters() -> bool:
+    """
+    Whether the SR4S parcel pipeline keeps its intermediate rasters in memory (`RASTER_IO_MODE=memory`).
+    When benchmarking, only the GeoTIFFs the benchmark reads back are written (see `process_band_files`).
+    """
+    return RASTER_IO_MODE == "memory"
+
+def open_raster(source):
+    """
+    `rasterio.open` for either a raster path or a `MemoryRaster`.
+    """
+    return source.open() if isinstance(source, MemoryRaster) else rasterio.open(source)
+
+def raster_name(source) -> str:
+    """
+    Filename of a raster path or `MemoryRaster`.
+    """
+    return source.name if isinstance(source, MemoryRaster) else os.path.basename(str(source))
@@ -0,0 +1,210 @@
+import re
+import threading
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from ..config.constants import METRICS_DURATION_BUCKETS
+from ..config.env_config import OTEL_TRACES_ENABLED
+
+class Counter:
+    """
+    Monotonic counter, one value per label set.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+class Histogram:
+    """
+    Cumulative histogram (Prometheus buckets, sum and count), one per label set.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = METRICS_DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels, cumulative = dict(key), 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+METRICS: dict = {}
+COLLECTORS: list = []
+SPAN_LISTENERS: list = []
+TRACER = None
+TRACER_LOCK = threading.Lock()
+
+def counter(name: str, help: str) -> Counter:
+    """
+    Returns the process-wide counter `name`, creating it on first use.
+    """
+    return METRICS.setdefault(name, Counter(name, help))
+
+def histogram(name: str, help: str, buckets: tuple = METRICS_DURATION_BUCKETS) -> Histogram:
+    """
+    Returns the process-wide histogram `name`, creating it on first use.
+    """
+    return METRICS.setdefault(name, Histogram(name, help, buckets))
+
+SPAN_SECONDS = histogram("agria_span_duration_seconds", "Duration of pipeline stages and LLM calls.")
+SPAN_ERRORS = counter("agria_span_errors_total", "Pipeline stages and LLM calls that raised an error.")
+
+def register_collector(collect):
+    """
+    Registers a callable that returns gauge samples `(name, labels, value)` read at scrape time (cache and model stats...).
+    """
+    COLLECTORS.append(collect)
+
+def stats_samples(prefix: str, stats: dict, **labels) -> list:
+    """
+    Turns the numeric values of a `stats()` dict into gauge samples named `{prefix}_{key}` (camelCase keys in snake_case).
+    """
+    return [
+        (f"{prefix}_{re.sub(r'(?<!^)(?=[A-Z])', '_', key).lower()}", labels, float(value))
+        for key, value in stats.items()
+        if isinstance(value, (int, float))
+    ]
+
+def add_span_listener(listener):
+    """
+    Registers a callable `(name, seconds, status)` called when any span ends (e.g. to keep raw durations for percentiles).
+    """
+    SPAN_LISTENERS.append(listener)
+
+def remove_span_listener(listener):
+    if listener in SPAN_LISTENERS:
+        SPAN_LISTENERS.remove(listener)
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times a pipeline stage: records its duration in `agria_span_duration_seconds{span=name}`, counts its errors and,
+    with `OTEL_TRACES_ENABLED`, exports it as an OpenTelemetry span (nested spans become children).
+    Arguments:
+        name (str): Span name, e.g. `sigpac_lookup`, `download`, `sr`, `llm`.
+        attributes: Extra span attributes (OpenTelemetry only, so they don't multiply the metric series).
+    """
+    start = time.perf_counter()
+    status = "ok"
+    tracer = get_tracer()
+    attributes = {key: value if isinstance(value, (str, int, float, bool)) else str(value) for key, value in attributes.items()}
+    with tracer.start_as_current_span(name, attributes=attributes) if tracer else nullcontext():
+        try:
+            yield
+        except Exception:
+            status = "error"
+            SPAN_ERRORS.inc(span=name)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            SPAN_SECONDS.observe(seconds, span=name, status=status)
+            for listener in list(SPAN_LISTENERS):
+                listener(name, seconds, status)
+            print(f"⏱️ {name}: {seconds:.2f}s")
+
+def timed(name: str):
+    """
+    Decorator version of `span`.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_tracer():
+    """
+    OpenTelemetry tracer, or `None` if tracing is disabled or `opentelemetry` isn't installed.
+    Spans are exported with OTLP when `opentelemetry-exporter-otlp` is installed (configured by the standard `OTEL_*` env vars).
+    """
+    global TRACER
+    if not OTEL_TRACES_ENABLED:
+        return None
+    with TRACER_LOCK:
+        if TRACER is None:
+            try:
+                from opentelemetry import trace
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            except ImportError as e:
+                print(f"⚠️ OpenTelemetry tracing disabled: {e}")
+                TRACER = False
+                return None
+            provider = TracerProvider(resource=Resource.create({"service.name": "agria-server"}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+            TRACER = trace.get_tracer("agria")
+    return TRACER or None
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in list(METRICS.values()):
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+        lines += [format_sample(*sample) for sample in metric.samples()]
+
+    gauges = {}
+    for collect in COLLECTORS:
+        try:
+            for name, labels, value in collect():
+                gauges.setdefault(name, []).append((name, labels, value))
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines += [format_sample(*sample) for sample in samples]
+    return "\n".join(lines) + "\n"
+
+def format_sample(name: str, labels: dict, value: float) -> str:
+    if not labels:
+        return f"{name} {format_value(value)}"
+    label_str = ",".join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+    return f"{name}{{{label_str}}} {format_value(value)}"
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
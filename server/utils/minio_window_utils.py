@@ -0,0 +1,85 @@
+import math
+import os
+
+import rasterio
+
+from rasterio.crs import CRS
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+
+from ..config.constants import MINIO_WINDOW_PAD_PX
+from .memory_raster_utils import MemoryRaster, open_raster
+
+def get_minio_gdal_env() -> dict:
+    """
+    GDAL options to open MinIO objects as `/vsis3/{bucket}/{object}`: path-style S3 requests against `MINIO_ENDPOINT`,
+    no directory listings on open, and merged range requests, so only the blocks of the requested window are fetched.
+    """
+    from ..config.minio_client import MINIO_ACCESS_KEY, MINIO_ENDPOINT, MINIO_SECRET_KEY
+
+    return {
+        "AWS_ACCESS_KEY_ID": MINIO_ACCESS_KEY,
+        "AWS_SECRET_ACCESS_KEY": MINIO_SECRET_KEY,
+        "AWS_S3_ENDPOINT": MINIO_ENDPOINT,
+        "AWS_HTTPS": "NO",  # the MinIO client is built with `secure=False`
+        "AWS_VIRTUAL_HOSTING": "FALSE",
+        "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+        "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+        "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+        "GDAL_HTTP_MULTIPLEX": "YES",
+        "VSI_CACHE": "TRUE",
+    }
+
+def read_minio_window(bucket_name, object_name, bounds, local_file_path, bounds_crs="EPSG:4326", pad_px=MINIO_WINDOW_PAD_PX, in_memory=False):
+    """
+    Reads the window of a MinIO raster covering `bounds` with HTTP range requests and saves it as a small GeoTIFF.
+    Only the internal tiles intersecting the window are transferred for COG/tiled composites (whole rows for striped ones).
+    Arguments:
+        bucket_name (str): MinIO bucket.
+        object_name (str): Raster object name.
+        bounds (tuple): `(minx, miny, maxx, maxy)` of the area to read.
+        local_file_path (str): Path of the output GeoTIFF.
+        bounds_crs (str): _Optional_; CRS of `bounds`. Default is `EPSG:4326`.
+        pad_px (int): _Optional_; Pixels added around the window. Default is `MINIO_WINDOW_PAD_PX`.
+        in_memory (bool): _Optional_; Return the window as a `MemoryRaster` (named after `local_file_path`) instead of writing it.
+    Returns:
+        local_file_path (str | MemoryRaster | None): Output path or raster, or `None` if the window falls outside the raster.
+    """
+    with rasterio.Env(**get_minio_gdal_env()):
+        return read_raster_window(f"/vsis3/{bucket_name}/{object_name}", bounds, local_file_path, bounds_crs, pad_px, in_memory)
+
+def read_raster_window(raster_path, bounds, local_file_path, bounds_crs="EPSG:4326", pad_px=MINIO_WINDOW_PAD_PX, in_memory=False):
+    """
+    Saves the window of `raster_path` covering `bounds` (plus `pad_px` pixels on each side) as a GeoTIFF,
+    keeping the source CRS, resolution and pixel grid. See `read_minio_window`.
+    """
+    with open_raster(raster_path) as src:
+        window = get_bounds_window(src, bounds, bounds_crs, pad_px)
+        if window is None:
+            print(f"⚠️  {raster_path}: requested bounds fall outside the raster, skipping")
+            return None
+        if src.block_shapes[0][1] == src.width:
+            print(f"⚠️  {raster_path} is not tiled: the windowed read fetches whole rows (convert it to a COG)")
+
+        full_px = src.width * src.height
+        raster = MemoryRaster.from_dataset(src, os.path.basename(local_file_path), src.read(window=window), transform=src.window_transform(window))
+
+    print(f"🪟 {os.path.basename(str(raster_path))}: read {window.width}x{window.height} px ({window.width * window.height / full_px:.3%} of the raster)")
+    return raster if in_memory else raster.save(local_file_path)
+
+def get_bounds_window(src, bounds, bounds_crs="EPSG:4326", pad_px=0):
+    """
+    Pixel window of an open raster covering `bounds`, snapped outwards to whole pixels, padded and clipped to the raster.
+    Returns:
+        window (Window | None): `None` if the bounds don't overlap the raster.
+    """
+    if bounds_crs and src.crs and CRS.from_user_input(bounds_crs) != src.crs:
+        bounds = transform_bounds(bounds_crs, src.crs, *bounds, densify_pts=21)
+    window = from_bounds(*bounds, transform=src.transform)
+    col_start = max(0, math.floor(window.col_off) - pad_px)
+    row_start = max(0, math.floor(window.row_off) - pad_px)
+    col_end = min(src.width, math.ceil(window.col_off + window.width) + pad_px)
+    row_end = min(src.height, math.ceil(window.row_off + window.height) + pad_px)
+    if col_end <= col_start or row_end <= row_start:
+        return None
+    return Window(col_start, row_start, col_end - col_start, row_end - row_start)
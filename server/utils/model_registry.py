@@ -0,0 +1,113 @@
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+@dataclass
+class RegisteredModel:
+    """
+    A lazily loaded, process-wide model. `loader` builds the model; `warmup` (optional) runs a dummy inference on it.
+    """
+    name: str
+    loader: Callable[[], Any]
+    warmup: Callable[[Any], None] | None = None
+    model: Any = None
+    load_seconds: float | None = None
+    warmup_seconds: float | None = None
+    memory_bytes: int | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+MODELS: dict[str, RegisteredModel] = {}
+
+def register_model(name: str, loader: Callable[[], Any], warmup: Callable[[Any], None] = None):
+    """
+    Registers a model to be loaded on first use. Re-registering a name replaces (and unloads) the previous one.
+    Arguments:
+        name (str): Registry key.
+        loader (Callable): Returns the loaded model.
+        warmup (Callable): _Optional_; Runs a dummy inference on the loaded model.
+    """
+    MODELS[name] = RegisteredModel(name=name, loader=loader, warmup=warmup)
+
+def get_model(name: str):
+    """
+    Returns the process-wide instance of a registered model, loading it on first use.
+    Concurrent first calls wait on the same load instead of deserialising the model twice.
+    """
+    entry = MODELS[name]
+    if entry.model is None:
+        with entry.lock:
+            if entry.model is None:
+                start = time.perf_counter()
+                model = entry.loader()
+                entry.load_seconds = time.perf_counter() - start
+                entry.memory_bytes = get_model_memory_bytes(model)
+                entry.model = model
+                print(f"📦 Model '{name}' loaded in {entry.load_seconds:.2f}s ({_format_bytes(entry.memory_bytes)})")
+    return entry.model
+
+def warm_up_model(name: str):
+    """
+    Loads a registered model and runs its warm-up inference once, so the first request doesn't pay for lazy CUDA/oneDNN initialisation.
+    """
+    entry = MODELS[name]
+    model = get_model(name)
+    if entry.warmup is None or entry.warmup_seconds is not None:
+        return
+    with entry.lock:
+        if entry.warmup_seconds is None:
+            start = time.perf_counter()
+            entry.warmup(model)
+            entry.warmup_seconds = time.perf_counter() - start
+            print(f"🔥 Model '{name}' warmed up in {entry.warmup_seconds:.2f}s")
+
+def warm_up_models():
+    """
+    Warms up every registered model. Errors are logged, not raised: the model will be loaded again on first use.
+    """
+    for name in list(MODELS):
+        try:
+            warm_up_model(name)
+        except Exception as e:
+            print(f"⚠️ Could not warm up model '{name}': {e}")
+
+def unload_model(name: str):
+    entry = MODELS[name]
+    with entry.lock:
+        entry.model = None
+        entry.load_seconds = entry.warmup_seconds = entry.memory_bytes = None
+
+def get_model_stats() -> dict:
+    """
+    Returns load state, load/warm-up time (s) and memory footprint (bytes) of every registered model.
+    """
+    return {
+        name: {
+            "loaded": entry.is_loaded,
+            "loadSeconds": entry.load_seconds,
+            "warmupSeconds": entry.warmup_seconds,
+            "memoryBytes": entry.memory_bytes,
+        }
+        for name, entry in MODELS.items()
+    }
+
+def get_model_memory_bytes(model) -> int | None:
+    """
+    Size of a torch model's parameters and buffers. Looks into a `.model` attribute for wrappers.
+    Returns `None` if the footprint can't be measured.
+    """
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return None
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def _format_bytes(size: int | None) -> str:
+    if size is None:
+        return "unknown size"
+    return f"{size / 1024 ** 2:.1f} MiB"
@@ -0,0 +1,81 @@
+import os
+
+from contextlib import ExitStack
+from dataclasses import dataclass
+
+from rasterio.crs import CRS
+from rasterio.merge import merge
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import Resampling, transform_bounds
+
+from ..config.constants import MINIO_WINDOW_PAD_PX
+from .memory_raster_utils import MemoryRaster, open_raster
+
+@dataclass
+class MosaicPlan:
+    """
+    Output grid shared by every band of a mosaic: target CRS, bounds (in that CRS) and resolution.
+    """
+    crs: CRS
+    bounds: tuple
+    res: tuple
+
+def plan_mosaic(paths, bounds=None, bounds_crs="EPSG:4326", pad_px=MINIO_WINDOW_PAD_PX) -> MosaicPlan:
+    """
+    Computes the mosaic grid once for all the band files of a parcel.
+    The target CRS and resolution are those of the first file; tiles in other CRSs are warped to it on the fly.
+    Arguments:
+        paths (list): Band files to mosaic.
+        bounds (tuple): _Optional_; `(minx, miny, maxx, maxy)` to restrict the mosaic to (e.g. the parcel bbox). Default: union of the files.
+        bounds_crs (str): _Optional_; CRS of `bounds`. Default is `EPSG:4326`.
+        pad_px (int): _Optional_; Pixels added around `bounds`. Default is `MINIO_WINDOW_PAD_PX`.
+    Returns:
+        plan (MosaicPlan): Output grid.
+    """
+    with open_raster(paths[0]) as src:
+        crs, res = src.crs, src.res
+    if bounds is not None:
+        minx, miny, maxx, maxy = transform_bounds(bounds_crs, crs, *bounds, densify_pts=21)
+        return MosaicPlan(crs, (minx - pad_px * res[0], miny - pad_px * res[1], maxx + pad_px * res[0], maxy + pad_px * res[1]), res)
+
+    tile_bounds = []
+    for path in paths:
+        with open_raster(path) as src:
+            tile_bounds.append(transform_bounds(src.crs, crs, *src.bounds) if src.crs != crs else tuple(src.bounds))
+    minxs, minys, maxxs, maxys = zip(*tile_bounds)
+    return MosaicPlan(crs, (min(minxs), min(minys), max(maxxs), max(maxys)), res)
+
+def mosaic_bands(band_files: dict, output_paths: dict, bounds=None, bounds_crs="EPSG:4326", pad_px=MINIO_WINDOW_PAD_PX, in_memory=False) -> dict:
+    """
+    Mosaics the tiles of several bands onto one grid, in memory: tiles in another CRS are read through a `WarpedVRT`
+    instead of being reprojected to intermediate GeoTIFFs, and only the planned bounds are read.
+    Arguments:
+        band_files (dict): Band → list of tile files (or `MemoryRaster`s) of that band.
+        output_paths (dict): Band → path of the mosaic GeoTIFF.
+        bounds (tuple): _Optional_; Area to restrict the mosaic to, see `plan_mosaic`.
+        bounds_crs (str): _Optional_; CRS of `bounds`. Default is `EPSG:4326`.
+        pad_px (int): _Optional_; Pixels added around `bounds`. Default is `MINIO_WINDOW_PAD_PX`.
+        in_memory (bool): _Optional_; Return the mosaics as `MemoryRaster`s (named after `output_paths`) instead of writing them.
+    Returns:
+        output_paths (dict): Band → mosaic path (or `MemoryRaster`), for the bands that had tiles.
+    """
+    band_files = {band: files for band, files in band_files.items() if files}
+    if not band_files:
+        return {}
+    plan = plan_mosaic([path for files in band_files.values() for path in files], bounds, bounds_crs, pad_px)
+
+    mosaics = {}
+    for band, files in band_files.items():
+        with ExitStack() as stack:
+            datasets = []
+            for path in files:
+                src = stack.enter_context(open_raster(path))
+                if src.crs != plan.crs:
+                    src = stack.enter_context(WarpedVRT(src, crs=plan.crs, resampling=Resampling.nearest))
+                datasets.append(src)
+            mosaic, transform = merge(datasets, bounds=plan.bounds, res=plan.res)
+            raster = MemoryRaster.from_dataset(datasets[0], os.path.basename(str(output_paths[band])), mosaic, crs=plan.crs, transform=transform)
+
+        mosaics[band] = raster if in_memory else raster.save(output_paths[band])
+        print(f"🧩 {band}: {len(files)} tiles mosaicked into {raster.name} ({mosaic.shape[2]}x{mosaic.shape[1]} px)")
+    return mosaics
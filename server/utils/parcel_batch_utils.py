@@ -0,0 +1,92 @@
+import math
+
+from dataclasses import dataclass, field
+
+from shapely.geometry import shape
+
+from ..config.constants import BATCH_CELL_SIZE, BATCH_CUBE_PAD_PX, RESOLUTION
+
+MIN_CUBE_SIZE = 128  # px; SEN2SR patch size
+
+@dataclass
+class ParcelGroup:
+    """
+    Parcels of a batch that share a date, the UTM zone of their Sentinel-2 tiles and a `BATCH_CELL_SIZE` cell:
+    they are super-resolved from a single cube. `bounds` is the union of their bboxes in `crs` (UTM, metres).
+    """
+    date: str
+    crs: str
+    tiles: set = field(default_factory=set)
+    parcels: list = field(default_factory=list)
+    bounds: tuple = None
+
+    def add(self, parcel: dict, tiles: set, bounds: tuple):
+        self.parcels.append(parcel)
+        self.tiles.update(tiles)
+        if self.bounds is None:
+            self.bounds = bounds
+        else:
+            self.bounds = (min(self.bounds[0], bounds[0]), min(self.bounds[1], bounds[1]), max(self.bounds[2], bounds[2]), max(self.bounds[3], bounds[3]))
+
+    @property
+    def center(self) -> tuple:
+        """
+        Center of the group's bounds, in `crs`.
+        """
+        minx, miny, maxx, maxy = self.bounds
+        return (minx + maxx) / 2, (miny + maxy) / 2
+
+    def center_lonlat(self) -> tuple:
+        """
+        Center of the group's bounds, as `(lon, lat)`.
+        """
+        from pyproj import Transformer
+
+        return Transformer.from_crs(self.crs, "EPSG:4326", always_xy=True).transform(*self.center)
+
+    def cube_size(self, resolution=RESOLUTION, pad_px=BATCH_CUBE_PAD_PX) -> int:
+        """
+        Edge of the square cube (px) centered on the group that covers all its parcels.
+        """
+        minx, miny, maxx, maxy = self.bounds
+        return max(MIN_CUBE_SIZE, math.ceil(max(maxx - minx, maxy - miny) / resolution) + 2 * pad_px)
+
+def get_utm_crs(tile: str = None, lon: float = None, lat: float = None) -> str:
+    """
+    UTM CRS of a Sentinel-2 tile (e.g. `30SUF` → `EPSG:32630`), or of a point when there is no tile.
+    """
+    if tile:
+        zone, north = int(tile[:2]), tile[2].upper() >= "N"
+    else:
+        zone, north = int(math.floor((lon + 180) / 6) + 1), lat >= 0
+    return f"EPSG:{(32600 if north else 32700) + zone}"
+
+def plan_parcel_groups(parcels: list[dict], tiles: list[set], cell_size: float = BATCH_CELL_SIZE) -> list[ParcelGroup]:
+    """
+    Groups the parcels of a batch by date, tile and spatial cell, so that each group is fetched and super-resolved once.
+    Cells are laid on the UTM grid of the parcel's tiles, so neighbouring parcels on either side of a tile edge
+    (tiles of the same zone overlap) still share a cube.
+    Arguments:
+        parcels (list[dict]): Parcels with their `geometry` (GeoJSON, EPSG:4326) and `date` (`YYYY-MM-DD`).
+        tiles (list[set]): Tiles of each parcel, as returned by `get_tiles_for_geometries`.
+        cell_size (float): _Optional_; Cell edge in metres. Default is `BATCH_CELL_SIZE`.
+    Returns:
+        groups (list[ParcelGroup]): Groups, in order of their first parcel.
+    """
+    from pyproj import Transformer
+
+    transformers, groups = {}, {}
+    for parcel, parcel_tiles in zip(parcels, tiles):
+        polygon = shape(parcel["geometry"])
+        tile = min(parcel_tiles) if parcel_tiles else None
+        crs = get_utm_crs(tile, polygon.centroid.x, polygon.centroid.y)
+        if crs not in transformers:
+            transformers[crs] = Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+        minx, miny, maxx, maxy = transformers[crs].transform_bounds(*polygon.bounds)
+        cell = (math.floor((minx + maxx) / 2 / cell_size), math.floor((miny + maxy) / 2 / cell_size))
+
+        key = (parcel["date"], crs, cell)
+        if key not in groups:
+            groups[key] = ParcelGroup(parcel["date"], crs)
+        groups[key].add(parcel, parcel_tiles, (minx, miny, maxx, maxy))
+    return list(groups.values())
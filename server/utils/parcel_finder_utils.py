@@ -6,69 +6,65 @@ from flask import jsonify
 from pyproj import Transformer, CRS
 
 from ..services.sr4s.im.get_image_bands import download_from_sentinel_hub
-from ..services.sr4s.sr.get_sr_image import process_directory
+from ..services.sr4s.sr.get_sr_image import process_band_files
 from ..services.sr4s.sr.utils import percentile_stretch, set_reflectance_scale
-from ..config.constants import ANDALUSIA_TILES, SPAIN_ZONES, TEMP_DIR, SR_BANDS, RESOLUTION, BANDS_DIR, MERGED_BANDS_DIR, MASKS_DIR, SR5M_DIR
+from ..config.constants import ANDALUSIA_TILES, SPAIN_JSON, TEMP_DIR, SR_BANDS, RESOLUTION
 
+from ..config.env_config import BAND_CACHE_MAX_BYTES, MINIO_READ_MODE
 from ..config.minio_client import minioClient, bucket_name
+from .job_utils import report_stage
+from .band_cache_utils import fetch_band, get_band_key, get_cached_band
+from .minio_window_utils import read_minio_window, read_raster_window
+from .memory_raster_utils import MemoryRaster, open_raster, raster_name, use_memory_rasters
+from .metrics_utils import timed
+from .mosaic_utils import mosaic_bands
+from .tile_index_utils import get_tile_index
+from .workspace_utils import Workspace
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 from dateutil.relativedelta import relativedelta
+from functools import lru_cache
 from datetime import datetime
 from dotenv import load_dotenv
 from minio.error import S3Error
 from PIL import Image
-from shapely import Point, box, ops, unary_union
-from shapely.geometry import GeometryCollection, MultiPolygon, Polygon, shape, mapping
+from shapely import Point, box, unary_union
+from shapely.geometry import shape, mapping
 from rasterio.mask import mask
-from rasterio.merge import merge
 from shapely.ops import transform as shapely_transform
-from rasterio.warp import calculate_default_transform, reproject, Resampling
+from rasterio.warp import Resampling
 
 import cv2
 import geopandas as gpd
+import json
 import numpy as np
 import os
 import rasterio
+import shapely
 
 load_dotenv()
 
 
 GEOMETRY_FILE = os.getenv("GEOMETRY_FILE")
 
-def extract_polygons_2d(geometry):
-    if isinstance(geometry, GeometryCollection):
-        polygons = [geom for geom in geometry.geoms if isinstance(geom, Polygon)]
-        if polygons:
-            # return the first polygon if there is only one, otherwise return a MultiPolygon
-            return (
-                ops.transform(lambda x, y, z=None: (x, y), polygons[0])
-                if len(polygons) == 1
-                else ops.transform(lambda x, y, z=None: (x, y), MultiPolygon(polygons))
-            )
-    elif isinstance(geometry, Polygon):
-        return ops.transform(lambda x, y, z=None: (x, y), geometry)
-    return None
-
 def get_tiles_polygons(geojson):
-    if not GEOMETRY_FILE or not os.path.exists(GEOMETRY_FILE):
-        raise FileNotFoundError(f"GEOMETRY_FILE is not set or does not exist: {GEOMETRY_FILE}")
-    base_geojson = gpd.read_file(GEOMETRY_FILE)
-    if base_geojson.crs != geojson.crs:
-        geojson = geojson.to_crs(base_geojson.crs)
-
-    base_geojson["geometry"] = base_geojson["geometry"].apply(extract_polygons_2d)
-
-    interseccion = gpd.overlay(base_geojson, geojson, how="intersection")
+    """
+    Gets the names of the Sentinel-2 tiles the parcel(s) in a GeoDataFrame overlap, using the tile grid spatial index.
+    """
+    index = get_tile_index(GEOMETRY_FILE)
+    if geojson.crs is not None and geojson.crs != index.crs:
+        geojson = geojson.to_crs(index.crs)
 
-    tiles_zones_list = set(list(interseccion["Name"]))
+    tiles_zones_list = set().union(*index.query_many(shapely.force_2d(geojson.geometry.values)))
 
     return tiles_zones_list
 
-def download_tile_bands(utm_zones, year, month, bands, geometry):
+def download_tile_bands(utm_zones, year, month, bands, geometry, workspace: Workspace):
     """
-    Download raw band tiles (.tif) for the given UTM zones and date range.
+    Download raw band tiles (.tif) for the given UTM zones and date range into the request's workspace.
+    With `RASTER_IO_MODE=memory`, windowed MinIO reads and mosaics are kept in memory (`MemoryRaster`) instead.
     """
+    report_stage("download", source="sr4s")
     year_month_pairs = generate_date_range_last_n_months(year, month)
     downloaded_files = {band: [] for band in bands}
     band_files_list = [] 
@@ -77,12 +73,15 @@ def download_tile_bands(utm_zones, year, month, bands, geometry):
     
     if is_zone_in_andalusia:
         print("Parcel located in Andalusia...")
-        band_files_list = download_from_minio(utm_zones, year_month_pairs, bands)
+        in_memory = use_memory_rasters()
+        band_files_list = download_from_minio(utm_zones, year_month_pairs, bands, workspace.bands_dir, geometry, in_memory=in_memory)
+        if len(utm_zones) > 1:
+            band_files_list = merge_zone_tiles(band_files_list, workspace.merged_bands_dir, shape(bbox_from_polygon(geometry)).bounds, in_memory)
     else:
         print("Getting parcel outside of Andalusia...")
         # Download image bands using Sentinel Hub
         parcel_center  = shape(geometry).representative_point()
-        band_files_list = download_from_sentinel_hub(parcel_center.y, parcel_center.x, f"{year}_{month}")
+        band_files_list = download_from_sentinel_hub(parcel_center.y, parcel_center.x, f"{year}_{month}", workspace.bands_dir)
         for path in band_files_list:
             for band in downloaded_files:
                 if band in path:
@@ -90,10 +89,33 @@ def download_tile_bands(utm_zones, year, month, bands, geometry):
     
     return band_files_list[-4:]
 
-def download_from_minio(utm_zones, year_month_pairs, bands):
-    # Download image bands from MinIO DB:
+@timed("minio_download")
+def download_from_minio(utm_zones, year_month_pairs, bands, download_dir, geometry=None, read_mode=MINIO_READ_MODE, in_memory=False):
+    """
+    Gets the raw band composites of the given UTM zones and months from MinIO.
+
+    Arguments:
+        utm_zones (list): Sentinel-2 tiles (e.g. `30STG`).
+        year_month_pairs (list): `(year, month name)` tuples, see `generate_date_range_last_n_months`.
+        bands (list): Bands to get (e.g. `["B02", "B03", "B04", "B08"]`).
+        download_dir (str | Path): Dir where the band files are saved.
+        geometry (dict): _Optional_; Parcel GeoJSON geometry (EPSG:4326). Required for windowed reads.
+        read_mode (str): _Optional_; `window` reads only the parcel window of each composite (HTTP range requests, see
+            `minio_window_utils.py`), `full` downloads whole tiles. Default is `MINIO_READ_MODE`.
+        in_memory (bool): _Optional_; Keep windowed reads in memory as `MemoryRaster`s instead of writing them. Default is `False`.
+
+    Returns:
+        res (list): Local band file paths (`{year}_{month}-{band}.tif`), or `MemoryRaster`s with the same names.
+    """
+    if read_mode not in ("window", "full"):
+        raise ValueError(f"Unknown MinIO read mode '{read_mode}', expected `window` or `full`")
+    windowed = read_mode == "window" and geometry is not None
+    # Same bbox that `cut_from_geometry` crops for SR, so the window always contains it
+    window_bounds = shape(bbox_from_polygon(geometry)).bounds if windowed else None
+
     res = []
     download_tasks = []
+    object_bytes = 0
     with ThreadPoolExecutor(max_workers=10) as executor:
         for zone in utm_zones:
             for year, month_folder in year_month_pairs:
@@ -104,22 +126,32 @@ def download_from_minio(utm_zones, year_month_pairs, bands):
                         if file.object_name.endswith(".tif") and "raw" in file.object_name:
                             band = file.object_name.split("/")[-1].split(".")[0]
                             if band in bands:
-                                # Assign and generate local download dir
-                                download_dir = BANDS_DIR
-                                download_dir.mkdir(parents=True, exist_ok=True)
-                                os.makedirs(download_dir, exist_ok=True)
+                                # Generate local download dir
+                                if not (windowed and in_memory):
+                                    os.makedirs(os.path.join(download_dir, zone), exist_ok=True)
                                 # Generate filename
                                 month_number = datetime.strptime(month_folder, "%B").month
-                                local_file_path = os.path.join(download_dir, f"{year}_{month_number}-{band}.tif")
+                                # One subdir per zone: tiles of the same band and month are mosaicked afterwards
+                                local_file_path = os.path.join(download_dir, zone, f"{year}_{month_number}-{band}.tif")
+                                object_bytes += file.size or 0
                                 # Set the download file task
-                                task = executor.submit(download_image_file, minioClient, file, local_file_path)
+                                band_key = get_band_key(zone, year, month_folder, band)
+                                if windowed:
+                                    task = executor.submit(read_band_window, file, band_key, window_bounds, local_file_path, in_memory)
+                                else:
+                                    task = executor.submit(download_image_file, minioClient, file, local_file_path, band_key)
                                 download_tasks.append((task, local_file_path))
                 except S3Error as exc:
                     print(f"Error when accessing {composites_path}: {exc}")
         # Run all download tasks and append resulting local file paths
         for task, local_file_path in download_tasks:
-            task.result()
-            res.append(local_file_path)
+            result = task.result()
+            if result is None:
+                continue  # parcel window outside this composite
+            res.append(result)
+
+    local_bytes = sum(band.nbytes if isinstance(band, MemoryRaster) else os.path.getsize(band) for band in res)
+    print(f"💾 MinIO ({'window' if windowed else 'full'}): {len(res)} band files, {local_bytes / 1024 ** 2:.2f} MB {'in memory' if in_memory and windowed else 'on disk'} (full composites: {object_bytes / 1024 ** 2:.2f} MB)")
     return res
 
 def generate_date_range_last_n_months(year, month, month_range=2):
@@ -144,135 +176,67 @@ def generate_date_range_last_n_months(year, month, month_range=2):
 
     return date_range
 
-def download_image_file(client, file, local_file_path):
-    client.fget_object(bucket_name, file.object_name, local_file_path)
-
-def merge_tifs(input_dir, year, band, month_number):
+def download_image_file(client, file, local_file_path, cache_key=None):
     """
-    Merge all GeoTIFF tiles for a band into one mosaic. 
-    If only one file is found, copy/re-save it. 
-    Returns the merged GeoTIFF path.
-
-    Args:
-        input_dir (str): Local directory where band images are stored.
-        year (str): Year of the desired image.
-        band (str): Band name (e.g., "B02", "B03", "B04", "B08").
-        month_number (str): Month of the desired image (e.g., "02").
+    Downloads a MinIO object. With a `cache_key` (see `band_cache_utils.get_band_key`) it goes through the shared band cache.
+    """
+    if cache_key is None or BAND_CACHE_MAX_BYTES <= 0:
+        client.fget_object(bucket_name, file.object_name, local_file_path)
+    else:
+        fetch_band(client, bucket_name, file, cache_key, local_file_path)
+    return local_file_path
 
+def read_band_window(file, cache_key, window_bounds, local_file_path, in_memory=False):
+    """
+    Reads the parcel window of a band composite: from the band cache if it holds the current version, otherwise from MinIO.
+    Windowed reads never fill the band cache (that would mean downloading the whole composite); only `MINIO_READ_MODE=full`
+    does, so the cache is only hit here if full-mode requests put the composite there.
     Returns:
-        str: Local file path to the resulting merged image.
+        local_file_path (str | MemoryRaster | None): Output path (or raster with `in_memory`), or `None` if the window falls outside the composite.
     """
-    # Reproject tiles (ensures consistent CRS/res)
-    all_files = reproject_tiles(input_dir)
-    band_files = [f for f in all_files if band in Path(f).name]
-
-    if not band_files:
-        print(f"⚠️ No files found for band {band} in {input_dir}")
-        return None
-
-    out_path = MERGED_BANDS_DIR
-    os.makedirs(out_path, exist_ok=True)
-    merged_image_path = out_path / f"RGB_{year}_{month_number}-{band}.tif"
-
-    # Case 1: Only one file → just copy/re-save
-    if len(band_files) == 1:
-        with rasterio.open(band_files[0]) as src:
-            meta = src.meta.copy()
-            with rasterio.open(merged_image_path, "w", **meta) as dst:
-                dst.write(src.read())
-        return str(merged_image_path)
+    band_path = get_cached_band(cache_key, file.etag) if BAND_CACHE_MAX_BYTES > 0 else None
+    if band_path is not None:
+        try:
+            return read_raster_window(str(band_path), window_bounds, local_file_path, in_memory=in_memory)
+        except rasterio.errors.RasterioIOError:
+            pass  # evicted meanwhile
+    return read_minio_window(bucket_name, file.object_name, window_bounds, local_file_path, in_memory=in_memory)
 
-    # Case 2: Multiple files → mosaic
-    src_files = [rasterio.open(f) for f in band_files]
-    mosaic, out_transform = merge(src_files)
-
-    out_meta = src_files[0].meta.copy()
-    out_meta.update({
-        "driver": "GTiff",
-        "height": mosaic.shape[1],
-        "width": mosaic.shape[2],
-        "transform": out_transform,
-        "count": mosaic.shape[0]  # preserves multi-band mosaics
-    })
-
-    with rasterio.open(merged_image_path, "w", **out_meta) as dest:
-        dest.write(mosaic)
-
-    # Cleanup
-    for src in src_files:
-        src.close()
+def merge_zone_tiles(band_files_list, output_dir, bounds=None, in_memory=False):
+    """
+    Mosaics band files downloaded for several UTM zones (same `{year}_{month}-{band}.tif` name in one subdir per zone)
+    into one file per month and band. The mosaic grid is planned once for all of them.
 
-    return str(merged_image_path)
+    Args:
+        band_files_list (list of str): Downloaded band files.
+        output_dir (str | Path): Directory where the mosaics are saved.
+        bounds (tuple): _Optional_; EPSG:4326 `(minx, miny, maxx, maxy)` to restrict the mosaics to.
+        in_memory (bool): _Optional_; Keep the mosaics in memory as `MemoryRaster`s. Default is `False`.
 
-def reproject_tiles(input_dir):
-    """
-    Reproject tile files to the same Cooridinates Reference System (CRS) if needed.
-    Arguments:
-        input_dir (`str`): Input directory where the files are
     Returns:
-        all_files (list of `str`): list of reporjected / default file paths
+        list of str: One file (or `MemoryRaster`) per month and band, in chronological order.
     """
-    files = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(".tif")]
-    if not files:
-        print("No .tif files found in:", input_dir)
-        return None
+    grouped = defaultdict(list)
+    for path in band_files_list:
+        grouped[raster_name(path)].append(path)
 
-    crs_groups = defaultdict(list)
+    to_merge = {name: paths for name, paths in grouped.items() if len(paths) > 1}
+    merged = mosaic_bands(to_merge, {name: os.path.join(output_dir, name) for name in to_merge}, bounds, in_memory=in_memory) if to_merge else {}
 
-    for f in files:
-        with rasterio.open(f) as src:
-            print(f"File: {f} CRS: {src.crs}")
-            crs_groups[str(src.crs)].append(f)
+    def month_order(name):
+        year, month_number = name.split("-")[0].split("_")[:2]
+        return int(year), int(month_number)
 
-    # If all files share the same CRS → use directly
-    if len(crs_groups) == 1:
-        all_files = files
-    else:
-        print("Multiple CRS detected, reprojection needed...")
-        # Pick the CRS of the first file as the target
-        with rasterio.open(files[0]) as src:
-            target_crs = src.crs
-
-        reprojected_files = []
-
-        for crs, group_files in crs_groups.items():
-            for f in group_files:
-                with rasterio.open(f) as src:
-                    transform, width, height = calculate_default_transform(
-                        src.crs, target_crs, src.width, src.height, *src.bounds)
-                    kwargs = src.meta.copy()
-                    kwargs.update({
-                        'crs': target_crs,
-                        'transform': transform,
-                        'width': width,
-                        'height': height
-                    })
-
-                    # Create new path for reprojected version
-                    reprojected_path = f.replace(".tif", "_reprojected.tif")
-                    print(f"Reprojecting {f} → {reprojected_path}")
-
-                    with rasterio.open(reprojected_path, 'w', **kwargs) as dst:
-                        for i in range(1, src.count + 1):
-                            reproject(
-                                source=rasterio.band(src, i),
-                                destination=rasterio.band(dst, i),
-                                src_transform=src.transform,
-                                src_crs=src.crs,
-                                dst_transform=transform,
-                                dst_crs=target_crs,
-                                resampling=Resampling.nearest
-                            )
-                    reprojected_files.append(reprojected_path)
-        all_files = reprojected_files
-    return all_files
-
-def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
+    return [merged.get(name, paths[0]) for name, paths in sorted(grouped.items(), key=lambda item: month_order(item[0]))]
+
+def get_rgb_composite(cropped_parcel_band_paths, geojson_data, workspace: Workspace):
     """
     Generates RGB composite images from a list of merged band file paths, saves them as GeoTIFF and PNG files, and returns their paths.
     This function groups input file paths by year and month, combines the corresponding red, green, and blue bands into RGB GeoTIFF images, normalizes and applies gamma correction, then saves enlarged PNG images with alpha transparency. It also creates an animated sequence if multiple frames are generated.
     Args:
-        cropped_parcel_band_paths (list of str): List of file paths to band images, expected to follow naming convention (`year`_`month_number`-`band`_`RESOLUTION`').
+        cropped_parcel_band_paths (list of str): List of file paths (or `MemoryRaster`s) to band images, expected to follow naming convention (`year`_`month_number`-`band`_`RESOLUTION`').
+        geojson_data (dict): A GeoJSON-like dictionary with the parcel's features.
+        workspace (Workspace): Request-scoped working dir.
     Returns:
         tuple:
             out_dir (str): Output directory where images are saved.
@@ -280,13 +244,15 @@ def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
             rgb_tif_paths (list of tuple): List of tuples containing (GeoTIFF file path, year, month) for each generated RGB composite.
     """
 
-    out_dir = TEMP_DIR
+    out_dir = workspace.root
 
     # Check for the RBG + B08 bands for L1BSR upscale
-    get_sr_image = len(cropped_parcel_band_paths) == 4 and any(SR_BANDS[-1] in path for path in cropped_parcel_band_paths)
+    get_sr_image = len(cropped_parcel_band_paths) == 4 and any(SR_BANDS[-1] in raster_name(path) for path in cropped_parcel_band_paths)
+    in_memory = any(isinstance(path, MemoryRaster) for path in cropped_parcel_band_paths)
     if get_sr_image:
-        out_dir = SR5M_DIR
-        out_dir.mkdir(parents=True, exist_ok=True)
+        out_dir = workspace.sr5m_dir
+        if not in_memory:
+            out_dir.mkdir(parents=True, exist_ok=True)
         
     png_paths = []
     rgb_tif_paths = []
@@ -295,7 +261,7 @@ def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
     grouped = {}
     for file in cropped_parcel_band_paths:
         # Generate id from filename
-        filename = os.path.basename(file)
+        filename = raster_name(file)
         filename_no_ext = os.path.splitext(filename)[0]
         filename_parts = re.split(r'[_-]', filename_no_ext)
         year = filename_parts[0]
@@ -308,19 +274,20 @@ def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
 
     if get_sr_image:
         # Apply SR upscaling (x10)
-        input_dir = Path(cropped_parcel_band_paths[0]).parent
-        print(f"\nProcessing {input_dir} directory for SR upscale...\n")
-        sr_tif_path = process_directory(input_dir)
-        sr_tif = os.path.join(SR5M_DIR, os.path.splitext(os.path.basename(sr_tif_path))[0] + '.tif')
+        print(f"\nProcessing {len(cropped_parcel_band_paths)} band crops for SR upscale{' (in memory)' if in_memory else ''}...\n")
+        report_stage("sr", source="sr4s")
+        sr_result = process_band_files(cropped_parcel_band_paths, workspace.sr5m_dir, in_memory=in_memory)
+        sr_tif = sr_result if in_memory else os.path.join(workspace.sr5m_dir, os.path.splitext(os.path.basename(sr_result))[0] + '.tif')
         
         # Crop parcel from SR RGB
+        report_stage("crop", source="sr4s")
         cropped_sr = crop_raster_to_geometry(
             image_path=sr_tif,
             geometry=gpd.GeoDataFrame.from_features(
                 geojson_data["features"], crs="EPSG:4326"
             ),
-            geometry_id="",
-            output_dir=TEMP_DIR,
+            geometry_id=workspace.id,
+            output_dir=workspace.public_dir,
             fmt="png"
         )
 
@@ -336,9 +303,9 @@ def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
             except KeyError:
                 continue
 
-            with rasterio.open(blue_band_04) as src4, \
-                rasterio.open(green_band_03) as src3, \
-                rasterio.open(red_band_02) as src2:
+            with open_raster(blue_band_04) as src4, \
+                open_raster(green_band_03) as src3, \
+                open_raster(red_band_02) as src2:
 
                 red = handle_nodata(src4.read(1), src4.nodata)
                 green = handle_nodata(src3.read(1), src3.nodata)
@@ -388,7 +355,7 @@ def get_rgb_composite(cropped_parcel_band_paths, geojson_data):
                 overlay = Image.new("RGBA", upscaled_image.size, (255, 255, 255, 0))
                 final_img = Image.alpha_composite(upscaled_image, overlay)
 
-                png_file = os.path.join(out_dir, f"{year}_{month_number}.png")
+                png_file = str(workspace.public_path(f"{year}_{month_number}.png"))
                 final_img.save(png_file)
                 png_paths.append(png_file)
 
@@ -450,17 +417,20 @@ def save_raster(image, temp_file, src, transform, format):
     except Exception as e:
         raise Exception(f"Failed to save raster: {str(e)}")
 
-def cut_from_geometry(gdf_parcel, format, image_paths, geometry_id):
+def cut_from_geometry(gdf_parcel, format, image_paths, geometry_id, masks_dir, in_memory=False):
     """
     Cuts multiple rasters based on a parcel geometry and returns a list of temporary files.
 
     Args:
         gdf_parcel (GeoDataFrame or dict): GeoDataFrame containing the geometry, or a dictionary representing the parcel geometry.
         format (str): Format for output raster files, e.g., 'tif' or 'jp2'.
-        image_paths (list of str): List of paths to raster files to be cut.
+        image_paths (list of str): List of paths to raster files (or `MemoryRaster`s) to be cut.
+        geometry_id (str): Unique identifier for geometry (added to filenames).
+        masks_dir (str | Path): Directory where the cropped rasters are saved.
+        in_memory (bool): _Optional_; Return the crops as `MemoryRaster`s instead of saving them. Default is `False`.
 
     Returns:
-        list: List of file paths to the cropped raster images.
+        list: List of file paths (or `MemoryRaster`s) to the cropped raster images.
 
     Raises:
         FileNotFoundError: If no raster files match the format.
@@ -470,7 +440,7 @@ def cut_from_geometry(gdf_parcel, format, image_paths, geometry_id):
         geometry = gdf_parcel
         
         # Check for the RBG + B08 bands for L1BSR upscale
-        get_sr_image = len(image_paths) == 4 and any(SR_BANDS[-1] in path for path in image_paths)
+        get_sr_image = len(image_paths) == 4 and any(SR_BANDS[-1] in raster_name(path) for path in image_paths)
 
         if get_sr_image:
             if geometry:
@@ -493,13 +463,12 @@ def cut_from_geometry(gdf_parcel, format, image_paths, geometry_id):
 
         cropped_parcel_files = []
 
-        valid_files = [f for f in image_paths if f.endswith(f".{format}")]
+        valid_files = [f for f in image_paths if raster_name(f).endswith(f".{format}")]
         if not valid_files:
             raise FileNotFoundError(f"No files found with the .{format} format.")
         
         # Extract geom mask for each band file
-        masks_dir = MASKS_DIR
-        cropped_parcel_files = crop_directory(valid_files, geometry, geometry_id, masks_dir)
+        cropped_parcel_files = crop_directory(valid_files, geometry, geometry_id, masks_dir, in_memory=in_memory)
 
         return cropped_parcel_files
 
@@ -510,24 +479,24 @@ def cut_from_geometry(gdf_parcel, format, image_paths, geometry_id):
         print(f"An error occurred: {str(e)}")
         raise
 
-def crop_raster_to_geometry(image_path, geometry, geometry_id, output_dir, fmt="tif", target_size = (300, 300)):
+def crop_raster_to_geometry(image_path, geometry, geometry_id, output_dir, fmt="tif", target_size = (300, 300), in_memory=False):
     """
     Crop either a single-band or multi-band raster (e.g., Sentinel bands or True Color RGB) to a geometry.
 
     Args:
-        image_path (str | Path): Path to the raster file.
+        image_path (str | Path | MemoryRaster): Path to the raster file, or raster held in memory.
         geometry (GeoDataFrame or shapely object): Crop geometry.
         geometry_id (str): Unique identifier for geometry (added to filename).
         output_dir (str | Path): Directory where cropped file will be saved.
         fmt (str): Output format ("tif" or "png"). Default is "tif".
+        in_memory (bool): If `True`, a "tif" crop is returned as a `MemoryRaster` instead of being saved. Default is `False`.
 
     Returns:
-        str: Path to cropped file.
+        str: Path to cropped file (or the `MemoryRaster`).
     """
     output_dir = Path(output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    with rasterio.open(image_path) as src:
+    with open_raster(image_path) as src:
         # Ensure geometry in same CRS
         if hasattr(geometry, "to_crs"):
             geometry = geometry.to_crs(src.crs)
@@ -544,10 +513,15 @@ def crop_raster_to_geometry(image_path, geometry, geometry_id, output_dir, fmt="
 
         # Prepare output filename
         ext = fmt.lower()
-        original_filename = Path(image_path).name
+        original_filename = raster_name(image_path)
         new_filename = original_filename.replace(".tif", f"_{geometry_id}.{ext}").replace(".jp2", f"_{geometry_id}.{ext}")
         out_path = output_dir / new_filename
 
+        # Keep in memory, with georeferencing
+        if fmt.lower() == "tif" and in_memory:
+            return MemoryRaster.from_dataset(src, new_filename, out_image, transform=out_transform)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
         # Save with georeferencing if GeoTIFF
         if fmt.lower() == "tif":
             out_meta = src.meta.copy()
@@ -623,14 +597,14 @@ def upscale_to_minimum(img, target_size):
         img = img.resize(new_size, Image.Resampling.LANCZOS)
     return img
 
-def crop_directory(valid_files, geometry, geometry_id, output_dir, fmt="tif"):
+def crop_directory(valid_files, geometry, geometry_id, output_dir, fmt="tif", in_memory=False):
     """
     Apply crop_raster_to_geometry to all files in a directory.
     Works for both single-band Sentinel bands and multi-band RGB tiffs.
     """
     cropped_files = []
     for image_path in valid_files:
-        cropped = crop_raster_to_geometry(image_path, geometry, geometry_id, output_dir, fmt)
+        cropped = crop_raster_to_geometry(image_path, geometry, geometry_id, output_dir, fmt, in_memory=in_memory)
         if cropped:
             cropped_files.append(cropped)
     return cropped_files
@@ -948,18 +922,27 @@ def polygon_pixel_size(geojson_polygon, resolution=RESOLUTION):
 
     return max_dim_px
 
-def is_coord_in_zones(lon: float, lat: float, zones_json: dict = SPAIN_ZONES) -> str | None:
+@lru_cache(maxsize=1)
+def load_spain_zones() -> dict:
+    """
+    Reads the Spain zones bounding boxes (`SPAIN_JSON`) once per process.
+    """
+    with open(SPAIN_JSON, 'r') as file:
+        return json.load(file)
+
+def is_coord_in_zones(lon: float, lat: float, zones_json: dict = None) -> str | None:
     """
     Checks if a (lon, lat) coordinate falls within any given zone's bounding box.
 
     Args:
         lon (float): Longitude in decimal degrees
         lat (float): Latitude in decimal degrees
-        zones_json (dict): Dictionary with "zones" list, each containing "bbox"
+        zones_json (dict): Dictionary with "zones" list, each containing "bbox". Default: Spain zones (`SPAIN_JSON`).
 
     Returns:
         bool: Whether the coordinates are within any of the given zones.
     """
+    zones_json = zones_json or load_spain_zones()
     is_in_zone = False
     zones_list = zones_json["zones"]
     i = 0
@@ -0,0 +1,91 @@
+import json
+import math
+import os
+import threading
+
+from dataclasses import dataclass
+from typing import Any
+
+from ..config.constants import PROMPT_CHARS_PER_TOKEN
+
+@dataclass
+class PromptFile:
+    mtime_ns: int
+    size: int
+    text: str
+    data: Any = None  # parsed JSON, for `read_json`
+
+class PromptRegistry:
+    """
+    In-memory cache of prompt files keyed by path, re-read only when their modification time or size changes, so
+    assembling system instructions doesn't re-read every prompt and example file each time.
+    Also keeps the estimated token count of each section of the assembled instructions.
+    """
+    def __init__(self):
+        self.files: dict[str, PromptFile] = {}
+        self.dirs: dict[str, tuple[int, list[str]]] = {}  # path → (mtime_ns, entries)
+        self.sections: dict[str, dict[str, int]] = {}  # instructions → section → tokens
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def read_text(self, path: str) -> str:
+        return self._get(path).text
+
+    def read_json(self, path: str) -> Any:
+        """
+        Parsed content of a JSON file. It's shared: don't modify it.
+        """
+        entry = self._get(path)
+        if entry.data is None:
+            entry.data = json.loads(entry.text)
+        return entry.data
+
+    def read_dir(self, path: str) -> str:
+        """
+        Concatenated content of the files in a directory (in `os.listdir` order).
+        """
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self.dirs.get(path)
+        if cached is None or cached[0] != mtime_ns:
+            cached = (mtime_ns, os.listdir(path))
+            with self._lock:
+                self.dirs[path] = cached
+        return "".join(self.read_text(os.path.join(path, name)) for name in cached[1])
+
+    def record_sections(self, instructions: str, sections: dict[str, str]):
+        """
+        Stores the estimated token count of each section of `instructions` (plus their `total`), for monitoring.
+        """
+        tokens = {name: estimate_tokens(text) for name, text in sections.items()}
+        tokens["total"] = sum(tokens.values())
+        with self._lock:
+            self.sections[instructions] = tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self.files), "hits": self.hits, "misses": self.misses}
+
+    def _get(self, path: str) -> PromptFile:
+        stat = os.stat(path)
+        with self._lock:
+            entry = self.files.get(path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                return entry
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = PromptFile(stat.st_mtime_ns, stat.st_size, f.read())
+        with self._lock:
+            self.files[path] = entry
+            self.misses += 1
+        return entry
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate Gemini token count of `text` (`PROMPT_CHARS_PER_TOKEN` characters per token), without an API call.
+    """
+    return math.ceil(len(text) / PROMPT_CHARS_PER_TOKEN)
+
+# Prompt files shared by the chat and the VLM benchmark
+PROMPT_REGISTRY = PromptRegistry()
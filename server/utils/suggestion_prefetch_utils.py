@@ -0,0 +1,91 @@
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable
+
+@dataclass
+class Prefetch:
+    marker: int  # history position the suggestion answers
+    lang: str
+    future: Future
+
+class SuggestionPrefetcher:
+    """
+    Computes the next input suggestion of a session in the background as soon as the model replies, so the suggestion
+    endpoint can usually answer from memory. A prefetch is only used for the history position (`marker`) and language
+    it was computed for, and is cancelled when the session sends a new message.
+    """
+    def __init__(self, generate: Callable[[Any, str], str], workers: int, max_entries: int, timeout: float = 10.0):
+        """
+        Arguments:
+            generate (Callable): Computes a suggestion from a session and a language.
+            workers (int): Background worker threads.
+            max_entries (int): Max sessions with a prefetched suggestion kept (oldest dropped first).
+            timeout (float): _Optional_; Max seconds `get` waits for a prefetch that is already running.
+        """
+        self.generate = generate
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="suggestion-prefetch")
+        self.prefetches: OrderedDict[str, Prefetch] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cancellations = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, session, marker: int, lang: str):
+        """
+        Starts computing the suggestion for `session` at history position `marker`, replacing any previous prefetch.
+        """
+        future = self.executor.submit(self.generate, session, lang)
+        with self._lock:
+            previous = self.prefetches.pop(session.id, None)
+            self.prefetches[session.id] = Prefetch(marker, lang, future)
+            while len(self.prefetches) > self.max_entries:
+                self.prefetches.popitem(last=False)[1].future.cancel()
+        if previous is not None:
+            previous.future.cancel()
+
+    def cancel(self, session_id: str):
+        """
+        Drops the session's prefetch (a new message makes it stale). A call already running finishes, but its suggestion is discarded.
+        """
+        with self._lock:
+            prefetch = self.prefetches.pop(session_id, None)
+            if prefetch is not None:
+                self.cancellations += 1
+        if prefetch is not None:
+            prefetch.future.cancel()
+
+    def get(self, session_id: str, marker: int, lang: str) -> str | None:
+        """
+        Returns the prefetched suggestion for `marker` and `lang`, waiting up to `timeout` seconds if it's being computed.
+        Returns `None` if there is none, it hasn't started yet (it's cancelled), it failed or it timed out, so the caller
+        computes it.
+        """
+        with self._lock:
+            prefetch = self.prefetches.pop(session_id, None)
+        suggestion = None
+        if prefetch is not None and prefetch.marker == marker and prefetch.lang == lang and not prefetch.future.cancel():
+            try:
+                suggestion = prefetch.future.result(timeout=self.timeout)
+            except CancelledError:
+                pass
+            except TimeoutError:
+                print(f"⏱️ Suggestion prefetch took over {self.timeout}s, computing it again")
+            except Exception as e:
+                print(f"⚠️ Suggestion prefetch failed: {e}")
+        elif prefetch is not None:
+            prefetch.future.cancel()
+        with self._lock:
+            if suggestion is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return suggestion
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending": len(self.prefetches), "hits": self.hits, "misses": self.misses, "cancellations": self.cancellations}
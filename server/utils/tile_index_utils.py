@@ -0,0 +1,140 @@
+import os
+import threading
+
+import numpy as np
+import shapely
+
+from pathlib import Path
+from shapely import STRtree
+from shapely.geometry import GeometryCollection, MultiPolygon, Polygon, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import transform as shapely_transform
+
+from ..config.constants import TILE_INDEX_FILE
+
+class TileIndex:
+    """
+    Sentinel-2 (MGRS) tile grid as 2D polygons in an STRtree, so finding the tiles a parcel falls in is an index query.
+    """
+
+    def __init__(self, names: list[str], polygons: list, crs: str):
+        self.names = np.asarray(names, dtype=str)
+        self.polygons = np.asarray(polygons, dtype=object)
+        self.crs = crs
+        self.tree = STRtree(self.polygons)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_geometry_file(cls, geometry_file: str | Path) -> "TileIndex":
+        """
+        Builds the index from the tile grid file (`GEOMETRY_FILE`, KML). Tiles without polygons are skipped.
+        """
+        import geopandas as gpd
+
+        tiles = gpd.read_file(geometry_file)
+        names, polygons = [], []
+        for name, geometry in zip(tiles["Name"], tiles.geometry):
+            polygon = to_2d_polygon(geometry)
+            if polygon is not None:
+                names.append(name)
+                polygons.append(polygon)
+        return cls(names, polygons, tiles.crs.to_string() if tiles.crs else "EPSG:4326")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TileIndex":
+        """
+        Loads an index saved with `save`.
+        """
+        with np.load(path) as data:
+            wkb = data["wkb"].tobytes()
+            offsets = data["offsets"]
+            polygons = shapely.from_wkb([wkb[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+            return cls(data["names"].tolist(), polygons, str(data["crs"]))
+
+    def save(self, path: str | Path):
+        """
+        Saves the tile names and polygons (as WKB) to a compressed `.npz` file. The STRtree is rebuilt on load (milliseconds).
+        """
+        wkbs = shapely.to_wkb(self.polygons)
+        offsets = np.cumsum([0] + [len(wkb) for wkb in wkbs])
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(path).with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp_path, names=self.names, wkb=np.frombuffer(b"".join(wkbs), dtype=np.uint8), offsets=offsets, crs=self.crs)
+        os.replace(tmp_path, path)
+
+    def query(self, geometry: BaseGeometry) -> set[str]:
+        """
+        Names of the tiles overlapping a geometry (in the index CRS). Tiles only touching it at the border are left out.
+        """
+        return self.query_many([geometry])[0]
+
+    def query_many(self, geometries: list) -> list[set[str]]:
+        """
+        Batch version of `query`: one STRtree query for all the geometries.
+        Returns:
+            tiles (list[set[str]]): Tile names overlapping each geometry, in input order.
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        geometry_idx, tile_idx = self.tree.query(geometries, predicate="intersects")
+        overlapping = ~shapely.touches(geometries[geometry_idx], self.polygons[tile_idx])
+        tiles = [set() for __ in range(len(geometries))]
+        for i, j in zip(geometry_idx[overlapping], tile_idx[overlapping]):
+            tiles[i].add(str(self.names[j]))
+        return tiles
+
+TILE_INDEX: TileIndex | None = None
+TILE_INDEX_LOCK = threading.Lock()
+
+def get_tile_index(geometry_file: str | Path = None, index_file: str | Path = TILE_INDEX_FILE) -> TileIndex:
+    """
+    Returns the process-wide tile index. It is loaded from `index_file` if it's newer than the grid file,
+    and otherwise built from the grid file (`GEOMETRY_FILE`) and saved to `index_file`.
+    """
+    global TILE_INDEX
+    if TILE_INDEX is None:
+        with TILE_INDEX_LOCK:
+            if TILE_INDEX is None:
+                geometry_file = geometry_file or os.getenv("GEOMETRY_FILE")
+                if not geometry_file or not os.path.exists(geometry_file):
+                    raise FileNotFoundError(f"GEOMETRY_FILE is not set or does not exist: {geometry_file}")
+                if os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(geometry_file):
+                    TILE_INDEX = TileIndex.load(index_file)
+                else:
+                    TILE_INDEX = TileIndex.from_geometry_file(geometry_file)
+                    TILE_INDEX.save(index_file)
+                    print(f"🗺️  Tile index built from {geometry_file} ({len(TILE_INDEX)} tiles) and saved to {index_file}")
+    return TILE_INDEX
+
+def get_tiles_for_geometries(geometries: list, crs: str = None) -> list[set[str]]:
+    """
+    Resolves the Sentinel-2 tiles of many parcels at once.
+    Arguments:
+        geometries (list): Parcel geometries, as GeoJSON dicts or shapely geometries.
+        crs (str): _Optional_; CRS of the geometries. Defaults to the tile grid's CRS (EPSG:4326).
+    Returns:
+        tiles (list[set[str]]): Tile names overlapping each geometry, in input order.
+    """
+    index = get_tile_index()
+    geometries = [geometry if isinstance(geometry, BaseGeometry) else shape(geometry) for geometry in geometries]
+    if crs and crs != index.crs:
+        from pyproj import Transformer
+
+        transformer = Transformer.from_crs(crs, index.crs, always_xy=True)
+        geometries = [shapely_transform(transformer.transform, geometry) for geometry in geometries]
+    return index.query_many(shapely.force_2d(geometries))
+
+def to_2d_polygon(geometry):
+    """
+    Drops Z coordinates and non-polygon parts (KML placemarks are often GeometryCollections of polygons and points).
+    Returns `None` if the geometry has no polygon.
+    """
+    if isinstance(geometry, GeometryCollection):
+        polygons = [geom for geom in geometry.geoms if isinstance(geom, Polygon)]
+        if not polygons:
+            return None
+        geometry = polygons[0] if len(polygons) == 1 else MultiPolygon(polygons)
+    elif not isinstance(geometry, (Polygon, MultiPolygon)):
+        return None
+    return shapely.force_2d(geometry)
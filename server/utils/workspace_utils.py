@@ -0,0 +1,215 @@
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ..config.constants import TEMP_DIR, WORKSPACES_DIR, WORKSPACE_CLEANUP_INTERVAL, WORKSPACE_TTL
+
+LAST_USED_MARKER = ".last_used"
+WORKSPACE_ID_LENGTH = 12
+# Files published by a workspace (see `Workspace.public_path`): `{stem}_{workspace id}{ext}`
+PUBLISHED_FILE_PATTERN = re.compile(rf".+_[0-9a-f]{{{WORKSPACE_ID_LENGTH}}}\.\w+")
+
+# Last run of `cleanup_expired_workspaces_throttled` in this process
+CLEANUP_LOCK = threading.Lock()
+last_cleanup = 0.0
+
+@dataclass
+class Workspace:
+    """
+    Request-scoped working directory for the parcel image pipeline.
+
+    Every stage (band download, masks, SR outputs, parcel GeoJSON) writes inside `root`, so
+    concurrent requests never share intermediate files. Only the final images served through
+    `/uploads/<filename>` are written to `public_dir`, tagged with the workspace id.
+    """
+    root: Path
+    id: str
+    public_dir: Path = TEMP_DIR
+    created_at: float = field(default_factory=time.time)
+    stac_decoded_bytes: int = 0  # decoded size of the imagery read from the STAC source by this request
+
+    @property
+    def bands_dir(self) -> Path:
+        return self.root / "bands"
+
+    @property
+    def merged_bands_dir(self) -> Path:
+        return self.root / "merged_bands"
+
+    @property
+    def masks_dir(self) -> Path:
+        return self.root / "masks"
+
+    @property
+    def sr5m_dir(self) -> Path:
+        return self.root / "sr_5m"
+
+    @property
+    def sen2sr_sr_dir(self) -> Path:
+        return self.root / "sr_2.5m"
+
+    @property
+    def png_dir(self) -> Path:
+        return self.sen2sr_sr_dir / "png"
+
+    @property
+    def tif_dir(self) -> Path:
+        return self.sen2sr_sr_dir / "tif"
+
+    @property
+    def og_tif_filepath(self) -> Path:
+        return self.tif_dir / "original.tif"
+
+    @property
+    def sr_tif_filepath(self) -> Path:
+        return self.tif_dir / "superres.tif"
+
+    @property
+    def og_png_filepath(self) -> Path:
+        return self.png_dir / "original.png"
+
+    @property
+    def sr_png_filepath(self) -> Path:
+        return self.png_dir / "superres.png"
+
+    @property
+    def comparison_png_filepath(self) -> Path:
+        return self.sen2sr_sr_dir / "OG-SR_comparison.png"
+
+    @property
+    def geojson_filepath(self) -> Path:
+        return self.sen2sr_sr_dir / "polygon.geojson"
+
+    def public_path(self, filename: str) -> Path:
+        """
+        Path in the public uploads dir for a final image, tagged with the workspace id so that
+        concurrent requests never overwrite each other's results.
+        """
+        stem, ext = os.path.splitext(filename)
+        os.makedirs(self.public_dir, exist_ok=True)
+        return self.public_dir / f"{stem}_{self.id}{ext}"
+
+    def write_geometry(self, geometry: dict) -> Path:
+        """
+        Stores the parcel's geometry as GeoJSON for the cropping stages.
+        """
+        os.makedirs(self.sen2sr_sr_dir, exist_ok=True)
+        with open(self.geojson_filepath, "w") as file:
+            file.write(str(geometry).replace("'", '"').replace("(","[").replace(")","]"))  # format GeoJSON correctly
+        return self.geojson_filepath
+
+    def touch(self):
+        """
+        Marks the workspace as in use, postponing its garbage collection.
+        """
+        (self.root / LAST_USED_MARKER).touch()
+
+    def discard_intermediates(self):
+        """
+        Removes the intermediate files (bands, mosaics, masks, SR outputs) once the final images are published.
+        The (empty) workspace dir and the published images are kept until the workspace expires.
+        """
+        if not self.root.is_dir():
+            return
+        for entry in os.scandir(self.root):
+            if entry.name == LAST_USED_MARKER:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def cleanup(self):
+        """
+        Removes the workspace dir and the images it published.
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+        for published in Path(self.public_dir).glob(f"*_{self.id}.*"):
+            try:
+                os.unlink(published)
+            except FileNotFoundError:
+                pass
+
+def create_workspace(base_dir: Path | str = WORKSPACES_DIR, public_dir: Path | str = TEMP_DIR) -> Workspace:
+    """
+    Creates a new, uniquely named workspace. Safe to call from any thread or process.
+    Arguments:
+        base_dir (Path | str): Dir where workspaces are created. Default is `WORKSPACES_DIR`.
+        public_dir (Path | str): Dir where final images are published. Default is `TEMP_DIR`.
+    Returns:
+        workspace (Workspace): The new workspace.
+    """
+    workspace_id = uuid.uuid4().hex[:WORKSPACE_ID_LENGTH]
+    root = Path(base_dir) / workspace_id
+    root.mkdir(parents=True, exist_ok=False)
+    workspace = Workspace(root=root, id=workspace_id, public_dir=Path(public_dir))
+    workspace.touch()
+    return workspace
+
+def cleanup_expired_workspaces(ttl: int = WORKSPACE_TTL, base_dir: Path | str = WORKSPACES_DIR, public_dir: Path | str = TEMP_DIR) -> int:
+    """
+    Garbage-collects workspaces and published files that have not been used for `ttl` seconds.
+    Only expired entries are touched, so requests still in flight in other threads or processes are left alone.
+    In `public_dir`, only files published by a workspace (`PUBLISHED_FILE_PATTERN`) are removed: chat uploads and
+    parcel descriptions stored there are left alone.
+    Arguments:
+        ttl (int): Time to live in seconds. Default is `WORKSPACE_TTL`.
+        base_dir (Path | str): Dir where workspaces are created. Default is `WORKSPACES_DIR`.
+        public_dir (Path | str): Dir where final images are published. Default is `TEMP_DIR`.
+    Returns:
+        removed (int): Number of workspaces removed.
+    """
+    expiry = time.time() - ttl
+    removed = 0
+
+    if os.path.isdir(base_dir):
+        for entry in os.scandir(base_dir):
+            if not entry.is_dir():
+                continue
+            marker = os.path.join(entry.path, LAST_USED_MARKER)
+            try:
+                last_used = os.stat(marker).st_mtime
+            except FileNotFoundError:
+                last_used = entry.stat().st_mtime
+            if last_used < expiry:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+
+    if os.path.isdir(public_dir):
+        for entry in os.scandir(public_dir):
+            try:
+                if PUBLISHED_FILE_PATTERN.fullmatch(entry.name) and entry.is_file() and entry.stat().st_mtime < expiry:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+    return removed
+
+def cleanup_expired_workspaces_throttled(interval: int = WORKSPACE_CLEANUP_INTERVAL) -> int:
+    """
+    Runs `cleanup_expired_workspaces` at most once every `interval` seconds, so it can be called on every request.
+    Requests that arrive while another one is cleaning up don't wait for it.
+    Arguments:
+        interval (int): Minimum seconds between two runs. Default is `WORKSPACE_CLEANUP_INTERVAL`.
+    Returns:
+        removed (int): Number of workspaces removed, `0` if the cleanup was skipped.
+    """
+    global last_cleanup
+    if time.time() - last_cleanup < interval or not CLEANUP_LOCK.acquire(blocking=False):
+        return 0
+    try:
+        if time.time() - last_cleanup < interval:
+            return 0
+        last_cleanup = time.time()
+        return cleanup_expired_workspaces()
+    finally:
+        CLEANUP_LOCK.release()
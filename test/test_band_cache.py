@@ -0,0 +1,44 @@
+import threading
+import time
+
+from types import SimpleNamespace
+
+from server.utils import band_cache_utils
+from server.utils.cache_utils import DiskLRUCache
+
+class FakeMinio:
+    """Stand-in for the MinIO client: writes the object's content and counts downloads."""
+    def __init__(self, content=b"band"):
+        self.content = content
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def fget_object(self, bucket_name, object_name, file_path):
+        with self.lock:
+            self.downloads += 1
+        time.sleep(0.05)  # long enough for concurrent callers to pile up
+        with open(file_path, "wb") as f:
+            f.write(self.content)
+
+def test_fetch_band_downloads_once_and_revalidates_etag(tmp_path, monkeypatch):
+    monkeypatch.setattr(band_cache_utils, "BAND_CACHE", DiskLRUCache(tmp_path / "cache", max_bytes=10 ** 6))
+    client = FakeMinio()
+    file = SimpleNamespace(object_name="30STG/2025/May/composites/raw/B04.tif", etag="v1", size=4)
+    key = band_cache_utils.get_band_key("30STG", 2025, "May", "B04")
+
+    threads = [threading.Thread(target=band_cache_utils.fetch_band, args=(client, "bucket", file, key, str(tmp_path / f"req{i}" / "B04.tif")))
+               for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.downloads == 1
+    assert all((tmp_path / f"req{i}" / "B04.tif").read_bytes() == b"band" for i in range(5))
+
+    # The object changed in MinIO: the cached copy is dropped and downloaded again
+    client.content = b"new band"
+    file.etag = "v2"
+    band_cache_utils.fetch_band(client, "bucket", file, key, str(tmp_path / "req5" / "B04.tif"))
+    assert client.downloads == 2
+    assert (tmp_path / "req5" / "B04.tif").read_bytes() == b"new band"
+    assert band_cache_utils.get_cached_band(key, "v2").read_bytes() == b"new band"
@@ -0,0 +1,24 @@
+import os
+import time
+
+from server.utils.cache_utils import DiskLRUCache
+
+def test_cache_hits_misses_and_evicts_least_recently_used(tmp_path):
+    src = tmp_path / "image.png"
+    src.write_bytes(b"x" * 100)
+    cache = DiskLRUCache(tmp_path / "cache", max_bytes=400)
+
+    assert cache.get("a") is None
+    cache.put("a", {"image.png": src})
+    cache.put("b", {"image.png": src})
+    old = time.time() - 60
+    os.utime(cache.entry_dir("b"), (old, old))
+    os.utime(cache.entry_dir("a"), (old - 60, old - 60))
+    assert (cache.get("a") / "image.png").read_bytes() == src.read_bytes()
+
+    cache.put("c", {"image.png": src})  # over budget: "b" is the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (3, 2, 1, 2)
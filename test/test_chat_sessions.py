@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from server.utils.chat_session_utils import ChatSessionManager
+
+class FakeChat:
+    def __init__(self, history):
+        self.history = list(history)
+
+    def send_message(self, text):
+        self.history += [SimpleNamespace(role="user", text=text), SimpleNamespace(role="model", text=text.upper())]
+
+def get_manager(tmp_path, **kwargs):
+    options = {"max_sessions": 2, "ttl": 3600, "max_history": 4, "store_ttl": 3600, **kwargs}
+    return ChatSessionManager(
+        FakeChat,
+        lambda chat: chat.history,
+        lambda content: {"role": content.role, "text": content.text},
+        lambda data: SimpleNamespace(**data),
+        tmp_path / "sessions",
+        **options,
+    )
+
+def test_sessions_are_isolated_and_evicted_lru(tmp_path):
+    manager = get_manager(tmp_path)
+    manager.get("a").send_message("hello")
+    manager.get("b").send_message("hi")
+    assert [c.text for c in manager.get("b").history] == ["hi", "HI"]
+
+    manager.get("c")  # evicts "a", the least recently used
+    assert list(manager.sessions) == ["b", "c"]
+    assert manager.stats()["stored"] == 1
+
+    # Rehydrated from the store, evicting "b"
+    assert [c.text for c in manager.get("a").history] == ["hello", "HELLO"]
+    assert manager.stats() == {"live": 2, "stored": 1, "evictions": 2, "rehydrations": 1}
+
+def test_history_is_capped_on_a_user_turn(tmp_path):
+    manager = get_manager(tmp_path, max_history=3)
+    chat = manager.get("a")
+    for text in ("one", "two", "three"):
+        chat.send_message(text)
+    assert [c.text for c in manager.get("a").history] == ["three", "THREE"]
+    assert manager.session("a").trimmed == 4
+
+def test_idle_sessions_expire(tmp_path):
+    manager = get_manager(tmp_path, ttl=0)
+    manager.get("a").send_message("hello")
+    manager.session("a").state["summary"] = "Greetings"
+    manager.get("b")
+    assert list(manager.sessions) == ["b"]
+    assert [c.text for c in manager.get("a").history] == ["hello", "HELLO"]
+    assert manager.session("a").state == {"summary": "Greetings"}
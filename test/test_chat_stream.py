@@ -0,0 +1,65 @@
+import json
+import pytest
+
+pytest.importorskip("google.genai")
+
+from types import SimpleNamespace
+
+from server.services import chat_service
+
+class FakeChat:
+    """
+    Chat whose replies are `chunks`; `send_message_stream` raises `error` after them if set.
+    """
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def send_message(self, message):
+        return SimpleNamespace(text="".join(self.chunks), usage_metadata=None)
+
+    def send_message_stream(self, message):
+        for text in self.chunks:
+            yield SimpleNamespace(text=text, usage_metadata=None)
+        if self.error:
+            raise self.error
+
+@pytest.fixture
+def fake_chat(monkeypatch):
+    chat = FakeChat(["Hola", "", ", agricultor."])
+    monkeypatch.setattr(chat_service, "get_chat", lambda session_id=None: chat)
+    monkeypatch.setattr(chat_service, "prefetch_suggestion", lambda session_id, lang=None: None)
+    return chat
+
+def read_events(response) -> list[tuple[str, dict]]:
+    events = []
+    for message in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines())
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def get_ttft_count(call: str) -> float:
+    samples = {name: value for name, labels, value in chat_service.LLM_TTFT_SECONDS.samples() if labels.get("call") == call}
+    return samples.get("agria_llm_ttft_seconds_count", 0)
+
+def test_stream_user_input(client, fake_chat):
+    ttft_count = get_ttft_count("llm_chat_stream")
+    response = client.post('/send-user-input/stream', data={'userInput': 'Hola'})
+    assert response.mimetype == "text/event-stream"
+
+    events = read_events(response)
+    assert events[:-1] == [("chunk", {"text": "Hola"}), ("chunk", {"text": ", agricultor."})]  # empty chunks are skipped
+    assert events[-1] == ("done", client.post('/send-user-input', data={'userInput': 'Hola'}).get_json())
+    assert get_ttft_count("llm_chat_stream") == ttft_count + 1
+
+def test_stream_error_event(client, fake_chat):
+    fake_chat.error = RuntimeError("Quota exceeded")
+    events = read_events(client.post('/send-user-input/stream', data={'userInput': 'Hola'}))
+
+    assert [name for name, __ in events] == ["chunk", "chunk", "error"]
+    assert events[-1][1] == {"error": "Quota exceeded"}
+
+def test_stream_user_input_missing_field(client):
+    response = client.post('/send-user-input/stream', data={})
+    assert response.status_code == 400
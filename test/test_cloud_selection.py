@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+pytest.importorskip("rioxarray")
+
+from server.services.sen2sr.utils import get_cloudless_time_indices
+
+def make_scl(slices):
+    return xr.DataArray(np.stack(slices), dims=("time", "y", "x"))
+
+def test_cloud_fractions_are_scored_inside_the_parcel_and_skip_no_data():
+    clear, cloudy, no_data = np.full((4, 4), 4), np.full((4, 4), 9), np.zeros((4, 4))
+    half_cloudy = clear.copy()
+    half_cloudy[:, 2:] = 9  # clouds over the right half only
+    scl = make_scl([clear, half_cloudy, no_data, cloudy])
+
+    # Whole image: only the first date is clear; an all no-data date is never picked
+    indices, valid_counts = get_cloudless_time_indices(scl, cloud_threshold=0.01)
+    assert indices == [0]
+    assert valid_counts.tolist() == [16, 16, 0, 16]
+
+    # Parcel on the left half: the half-cloudy date is clear over it
+    parcel_mask = np.zeros((4, 4), dtype=bool)
+    parcel_mask[:, :2] = True
+    indices, valid_counts = get_cloudless_time_indices(scl, cloud_threshold=0.01, parcel_mask=parcel_mask)
+    assert indices == [0, 1]
+    assert valid_counts.tolist() == [8, 8, 0, 8]
+
+def test_least_cloudy_date_is_used_when_none_is_clear():
+    partly = np.full((4, 4), 4)
+    partly[0, 0] = 8
+    indices, __ = get_cloudless_time_indices(make_scl([np.full((4, 4), 8), partly]), cloud_threshold=0.01)
+    assert indices == [1]
+
+def test_two_phase_fetch_skips_the_spectral_bands_of_a_cached_date(monkeypatch):
+    pytest.importorskip("cubo")
+    from server.services.sen2sr import get_sr_image
+
+    calls = []
+    def create_cubo(lat, lon, bands, start_date, end_date, size, resolution=10):
+        calls.append(bands)
+        times = np.array(["2025-06-20", "2025-06-25"], dtype="datetime64[ns]")
+        return xr.DataArray(np.full((2, len(bands), 4, 4), 4), dims=("time", "band", "y", "x"), coords={"time": times, "band": bands})
+
+    monkeypatch.setattr(get_sr_image, "create_cubo", create_cubo)
+    args = (37.5, -4.5, ["B08", "B02", "B03", "B04", "SCL"], "2025-06-15", "2025-06-30", 128, "EPSG:32630", 0.01)
+
+    image, acq_date, __ = get_sr_image.fetch_cloudless_image_two_phase(*args, skip_date=lambda date: date == "2025-06-25")
+    assert image is None and acq_date == "2025-06-25"
+    assert calls == [["SCL"]]  # no spectral fetch
+
+    image, acq_date, __ = get_sr_image.fetch_cloudless_image_two_phase(*args, skip_date=lambda date: False)
+    assert image is not None and calls[-1] == ["B08", "B02", "B03", "B04"]
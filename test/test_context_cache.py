@@ -0,0 +1,54 @@
+import time
+
+from types import SimpleNamespace
+
+from server.utils.context_cache_utils import ContextCache
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def create(self, model, config):
+        self.calls.append(("create", config["ttl"]))
+        if self.fail:
+            raise ValueError("Cached content is too small")
+        return SimpleNamespace(name=f"cachedContents/{len(self.calls)}")
+
+    def update(self, name, config):
+        self.calls.append(("update", name))
+
+    def delete(self, name):
+        self.calls.append(("delete", name))
+
+def get_cache(caches, ttl=3600, refresh_margin=600):
+    client = SimpleNamespace(caches=caches)
+    return ContextCache(lambda: client, "gemini-test", ttl, refresh_margin)
+
+def test_cache_is_reused_refreshed_and_invalidated():
+    caches = FakeCaches()
+    cache = get_cache(caches)
+    name = cache.get("v1", "instructions", [])
+    assert cache.get("v1", "instructions", []) == name
+    assert caches.calls == [("create", "3600s")]
+
+    cache.expires_at = time.monotonic() + 60  # about to expire: TTL extended, same cache
+    assert cache.get("v1", "instructions", []) == name
+    assert caches.calls[-1] == ("update", name)
+
+    # Prompt files changed: old cache deleted, new one created
+    new_name = cache.get("v2", "new instructions", [])
+    assert new_name != name
+    assert caches.calls[-2:] == [("delete", name), ("create", "3600s")]
+    assert cache.stats() == {"active": 1, "creations": 2, "refreshes": 1, "failures": 0}
+
+def test_failed_creation_falls_back_and_waits_to_retry():
+    caches = FakeCaches(fail=True)
+    cache = get_cache(caches)
+    assert cache.get("v1", "instructions", []) is None
+    assert cache.get("v1", "instructions", []) is None
+    assert len(caches.calls) == 1
+
+    caches.fail = False
+    cache.retry_at = 0.0
+    assert cache.get("v1", "instructions", []) is not None
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+pytest.importorskip("geopandas")
+pytest.importorskip("torch")
+pytest.importorskip("minio")
+
+from types import SimpleNamespace
+
+from rasterio.transform import from_origin
+from rasterio.warp import transform
+
+from server.config.constants import ANDALUSIA_TILES
+from server.services import parcel_finder_service
+from server.services.sr4s.sr import get_sr_image
+from server.utils import memory_raster_utils, parcel_finder_utils
+from server.utils.minio_window_utils import read_raster_window
+from server.utils.workspace_utils import LAST_USED_MARKER, create_workspace
+
+LON, LAT = -4.5, 37.5
+
+def write_band(path, value, size=600, resolution=10):
+    xs, ys = transform("EPSG:4326", "EPSG:32630", [LON], [LAT])
+    west, north = xs[0] - size * resolution / 2, ys[0] + size * resolution / 2
+    with rasterio.open(path, "w", driver="GTiff", width=size, height=size, count=1, dtype="uint16", crs="EPSG:32630",
+                       transform=from_origin(west, north, resolution, resolution)) as dst:
+        dst.write(np.full((1, size, size), value, dtype=np.uint16) + np.arange(size, dtype=np.uint16))
+
+class FakeMinio:
+    """
+    Lists one raw composite per band under every `{zone}/{year}/{month}/composites/` prefix.
+    """
+    def __init__(self, bands):
+        self.bands = bands
+
+    def list_objects(self, bucket_name, prefix, recursive=False):
+        return [SimpleNamespace(object_name=f"{prefix}raw/{band}.tif", size=1, etag="etag") for band in self.bands]
+
+def test_memory_mode_writes_only_the_published_image(monkeypatch, tmp_path):
+    bands = ["B02_10m", "B03_10m", "B04_10m", "B08_10m"]
+    for value, band in enumerate(bands, start=1):
+        write_band(tmp_path / f"{band}.tif", value * 500)
+
+    monkeypatch.setattr(memory_raster_utils, "RASTER_IO_MODE", "memory")
+    monkeypatch.setattr(parcel_finder_utils, "BAND_CACHE_MAX_BYTES", 0)
+    monkeypatch.setattr(parcel_finder_utils, "minioClient", FakeMinio(bands))
+    monkeypatch.setattr(parcel_finder_utils, "read_minio_window", lambda bucket_name, object_name, bounds, local_file_path, in_memory=False:
+                        read_raster_window(str(tmp_path / object_name.split("/")[-1]), bounds, local_file_path, in_memory=in_memory))
+    # Pixel-wise x2 upscaling instead of the L1BSR model
+    monkeypatch.setattr(get_sr_image, "get_l1bsr_engine", lambda: SimpleNamespace(super_resolve=lambda img: np.repeat(np.repeat(img, 2, axis=0), 2, axis=1)))
+
+    edge = 0.002
+    geometry = {"type": "Polygon", "coordinates": [[[LON, LAT], [LON + edge, LAT], [LON + edge, LAT + edge], [LON, LAT + edge], [LON, LAT]]]}
+    geojson_data = {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": geometry, "properties": {}}]}
+    workspace = create_workspace(tmp_path / "workspaces", tmp_path / "public")
+
+    band_files = parcel_finder_utils.download_tile_bands([ANDALUSIA_TILES[0]], "2025", "6", bands, geometry, workspace)
+    __, png_paths, __ = parcel_finder_service.get_rgb_parcel_image("ref", geojson_data, band_files, workspace)
+
+    assert all(isinstance(band, memory_raster_utils.MemoryRaster) for band in band_files)
+    assert [path.name for path in workspace.root.rglob("*")] == [LAST_USED_MARKER]  # no intermediate files or dirs
+    assert [path.name for path in (tmp_path / "public").iterdir()] == [png_paths[0].split("/")[-1]]
@@ -0,0 +1,31 @@
+import pytest
+
+from server.utils.metrics_utils import Histogram, render_metrics, span, stats_samples
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value, span="x")
+    samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+
+    assert samples[("test_seconds_bucket", "1")] == 2
+    assert samples[("test_seconds_bucket", "5")] == 3
+    assert samples[("test_seconds_bucket", "+Inf")] == 4
+    assert samples[("test_seconds_count", None)] == 4
+    assert samples[("test_seconds_sum", None)] == 14.5
+
+def test_span_records_duration_and_errors():
+    with span("test_ok"):
+        pass
+    with pytest.raises(ValueError):
+        with span("test_fail"):
+            raise ValueError("boom")
+
+    text = render_metrics()
+    assert 'agria_span_duration_seconds_count{span="test_ok",status="ok"} 1' in text
+    assert 'agria_span_duration_seconds_count{span="test_fail",status="error"} 1' in text
+    assert 'agria_span_errors_total{span="test_fail"} 1' in text
+
+def test_stats_samples():
+    samples = stats_samples("agria_model", {"loaded": True, "loadSeconds": 1.5, "memoryBytes": None}, model="sen2sr")
+    assert samples == [("agria_model_loaded", {"model": "sen2sr"}, 1.0), ("agria_model_load_seconds", {"model": "sen2sr"}, 1.5)]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+
+from rasterio.transform import from_origin
+
+from server.utils.minio_window_utils import read_raster_window
+
+def write_tile(path, size=1000, resolution=10):
+    data = np.arange(size * size, dtype=np.uint16).reshape(1, size, size)
+    with rasterio.open(path, "w", driver="GTiff", width=size, height=size, count=1, dtype="uint16", crs="EPSG:32630",
+                       transform=from_origin(300000, 4100000, resolution, resolution), tiled=True, blockxsize=256, blockysize=256) as dst:
+        dst.write(data)
+    return data
+
+def test_read_raster_window_keeps_the_pixel_grid(tmp_path):
+    data = write_tile(tmp_path / "B04.tif")
+    # 100 m x 50 m starting 1000 m east and 2000 m south of the tile origin
+    bounds = (301000, 4097950, 301100, 4098000)
+    out = read_raster_window(str(tmp_path / "B04.tif"), bounds, str(tmp_path / "window.tif"), bounds_crs="EPSG:32630", pad_px=2)
+
+    with rasterio.open(out) as window:
+        assert (window.width, window.height) == (10 + 4, 5 + 4)
+        assert window.crs.to_string() == "EPSG:32630"
+        assert window.transform.c == 301000 - 20 and window.transform.f == 4098000 + 20
+        np.testing.assert_array_equal(window.read(1), data[0, 198:207, 98:112])
+
+def test_read_raster_window_clips_and_skips(tmp_path):
+    write_tile(tmp_path / "B04.tif")
+    # Overlaps the top-left corner: clipped to the raster
+    out = read_raster_window(str(tmp_path / "B04.tif"), (299950, 4099950, 300050, 4100050), str(tmp_path / "corner.tif"), bounds_crs="EPSG:32630", pad_px=0)
+    with rasterio.open(out) as window:
+        assert (window.width, window.height) == (5, 5)
+    # Outside the raster
+    assert read_raster_window(str(tmp_path / "B04.tif"), (0, 0, 10, 10), str(tmp_path / "none.tif"), bounds_crs="EPSG:32630") is None
+
+def test_read_raster_window_in_memory_matches_the_saved_window(tmp_path):
+    write_tile(tmp_path / "B04.tif")
+    bounds = (301000, 4097950, 301100, 4098000)
+    saved = read_raster_window(str(tmp_path / "B04.tif"), bounds, str(tmp_path / "window.tif"), bounds_crs="EPSG:32630")
+    raster = read_raster_window(str(tmp_path / "B04.tif"), bounds, str(tmp_path / "memory.tif"), bounds_crs="EPSG:32630", in_memory=True)
+
+    assert raster.name == "memory.tif" and not (tmp_path / "memory.tif").exists()
+    with rasterio.open(saved) as on_disk, raster.open() as in_memory:
+        assert in_memory.transform == on_disk.transform and in_memory.crs == on_disk.crs
+        np.testing.assert_array_equal(in_memory.read(), on_disk.read())
@@ -0,0 +1,26 @@
+import threading
+import time
+
+from server.utils.model_registry import get_model, get_model_stats, register_model, warm_up_model
+
+def test_model_is_loaded_once_across_threads():
+    loads, warmups = [], []
+    def loader():
+        time.sleep(0.05)
+        loads.append(1)
+        return object()
+    register_model("fake", loader, warmups.append)
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(get_model("fake"))) for __ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    warm_up_model("fake")
+    warm_up_model("fake")
+
+    assert len(loads) == 1 and len(warmups) == 1
+    assert all(model is models[0] for model in models)
+    stats = get_model_stats()["fake"]
+    assert stats["loaded"] and stats["loadSeconds"] >= 0.05 and stats["warmupSeconds"] is not None
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+
+from rasterio.transform import from_origin
+from rasterio.warp import transform
+
+from server.utils.mosaic_utils import mosaic_bands
+
+def write_tile(path, crs, west, north, value, size=200, resolution=10):
+    with rasterio.open(path, "w", driver="GTiff", width=size, height=size, count=1, dtype="uint16", crs=crs,
+                       transform=from_origin(west, north, resolution, resolution), nodata=0) as dst:
+        dst.write(np.full((1, size, size), value, dtype=np.uint16))
+
+def test_mosaic_bands_warps_other_crs_in_memory(tmp_path):
+    # Two tiles on both sides of the 29/30 UTM zone border (6°W), overlapping the same area
+    xs, ys = transform("EPSG:4326", "EPSG:32630", [-6.01], [37.4])
+    write_tile(tmp_path / "30.tif", "EPSG:32630", xs[0] - 1000, ys[0] + 1000, value=30)
+    xs, ys = transform("EPSG:4326", "EPSG:32629", [-6.01], [37.4])
+    write_tile(tmp_path / "29.tif", "EPSG:32629", xs[0] - 1000, ys[0] + 1000, value=29)
+
+    bounds = (-6.012, 37.398, -6.008, 37.402)
+    outputs = mosaic_bands({"B04": [str(tmp_path / "30.tif"), str(tmp_path / "29.tif")]}, {"B04": tmp_path / "out" / "B04.tif"}, bounds, pad_px=0)
+
+    with rasterio.open(outputs["B04"]) as mosaic:
+        assert mosaic.crs.to_string() == "EPSG:32630"  # CRS of the first tile
+        assert mosaic.res == (10, 10)
+        assert mosaic.width < 60 and mosaic.height < 60  # parcel window, not the whole tiles
+        assert np.all(mosaic.read(1) == 30)  # first tile wins where tiles overlap
+    assert sorted(p.name for p in tmp_path.glob("*.tif")) == ["29.tif", "30.tif"]  # no reprojected copies
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pyproj")
+
+from server.utils.parcel_batch_utils import get_utm_crs, plan_parcel_groups
+
+def square(lon, lat, edge=0.001):
+    return {"type": "Polygon", "coordinates": [[[lon, lat], [lon + edge, lat], [lon + edge, lat + edge], [lon, lat + edge], [lon, lat]]]}
+
+def test_get_utm_crs():
+    assert get_utm_crs("30SUF") == "EPSG:32630"
+    assert get_utm_crs("29TNG") == "EPSG:32629"
+    assert get_utm_crs(lon=-3.7, lat=40.4) == "EPSG:32630"
+
+def test_plan_parcel_groups_by_tile_date_and_cell():
+    parcels = [
+        {"geometry": square(-4.500, 37.500), "date": "2025-06-30"},
+        {"geometry": square(-4.505, 37.502), "date": "2025-06-30"},  # same cell
+        {"geometry": square(-4.505, 37.502), "date": "2025-05-31"},  # other date
+        {"geometry": square(-4.000, 37.500), "date": "2025-06-30"},  # ~44 km east
+    ]
+    tiles = [{"30SUG"}, {"30SUG", "30SUF"}, {"30SUG"}, {"30SUG"}]
+    groups = plan_parcel_groups(parcels, tiles, cell_size=20_000)
+
+    assert [len(group.parcels) for group in groups] == [2, 1, 1]
+    assert groups[0].parcels == parcels[:2]
+    assert groups[0].tiles == {"30SUG", "30SUF"}
+    assert groups[0].crs == "EPSG:32630"
+    assert 128 <= groups[0].cube_size() < 200
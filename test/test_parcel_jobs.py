@@ -0,0 +1,94 @@
+import json
+import pytest
+
+pytest.importorskip("rasterio")
+pytest.importorskip("pyproj")
+
+from server.endpoints import parcel_finder
+from server.services import parcel_job_service
+from server.services.parcel_job_service import ParcelJob, run_parcel_job
+from server.utils.job_utils import report_stage
+from server.utils.workspace_utils import create_workspace
+
+PARCEL_FORM = {"cadastralReference": "14048A001001990000RR", "selectedDate": "2025-06-30", "isFromCadastralReference": "False", "parcelGeometry": "None"}
+
+@pytest.fixture
+def fake_pipeline(monkeypatch, tmp_path):
+    """
+    Replaces `get_parcel_image` with a fake that reports two stages, and records the status of `fake_pipeline.job`
+    while it runs. Set `fake_pipeline.error` to make it raise.
+    """
+    class FakePipeline:
+        def __init__(self):
+            self.job = None
+            self.error = None
+            self.statuses = []
+
+        def __call__(self, workspace, **parcel_args):
+            self.statuses.append(self.job.status if self.job else None)
+            report_stage("geometry")
+            report_stage("download", source="test")
+            workspace.stac_decoded_bytes += 1024
+            if self.error:
+                raise self.error
+            return {"type": "Polygon"}, {"area": 1.0}, "/uploads/parcel.png"
+
+    pipeline = FakePipeline()
+    monkeypatch.setattr(parcel_job_service, "get_parcel_image", pipeline)
+    monkeypatch.setattr(parcel_job_service, "create_workspace", lambda: create_workspace(tmp_path / "workspaces", tmp_path / "public"))
+    monkeypatch.setattr(parcel_finder, "cleanup_expired_workspaces_throttled", lambda: None)
+    return pipeline
+
+def read_events(response) -> list[tuple[str, dict]]:
+    events = []
+    for message in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_job_status_and_stage_events(fake_pipeline):
+    job = ParcelJob(id="job")
+    fake_pipeline.job = job
+    assert job.status == "queued"
+    run_parcel_job(job, {"cadastral_reference": "ref", "date": "2025-06-30"})
+
+    assert fake_pipeline.statuses == ["running"]
+    assert job.status == "done"
+    assert [event["stage"] for event in job.events] == ["geometry", "download", "done"]
+    assert job.events[1]["source"] == "test"
+    assert job.result["imagePath"] == "/uploads/parcel.png"
+    assert job.result["stacDecodedBytes"] == 1024
+
+def test_failed_job(fake_pipeline):
+    fake_pipeline.error = ValueError("No images available")
+    job = ParcelJob(id="job")
+    run_parcel_job(job, {"cadastral_reference": "ref", "date": "2025-06-30"})
+
+    assert job.status == "failed"
+    assert job.error == "No images available"
+    assert [event["stage"] for event in job.events] == ["geometry", "download", "failed"]
+
+def test_events_stream_ends_after_final_event(client, fake_pipeline):
+    response = client.post('/parcel-jobs', data=PARCEL_FORM)
+    assert response.status_code == 202
+    job_id = response.get_json()['response']['jobId']
+
+    events = read_events(client.get(f'/parcel-jobs/{job_id}/events'))
+    assert [stage for stage, __ in events] == ["geometry", "download", "done"]
+    assert events[-1][1]["result"]["cadastralReference"] == PARCEL_FORM["cadastralReference"]
+
+    response = client.get(f'/parcel-jobs/{job_id}')
+    assert response.get_json()['response']['status'] == "done"
+
+def test_events_stream_of_failed_job(client, fake_pipeline):
+    fake_pipeline.error = ValueError("No images available")
+    job_id = client.post('/parcel-jobs', data=PARCEL_FORM).get_json()['response']['jobId']
+
+    events = read_events(client.get(f'/parcel-jobs/{job_id}/events'))
+    assert events[-1][0] == "failed"
+    assert events[-1][1]["error"] == "No images available"
+
+def test_unknown_job_returns_404(client):
+    assert client.get('/parcel-jobs/unknown').status_code == 404
+    assert client.get('/parcel-jobs/unknown/events').status_code == 404
@@ -0,0 +1,31 @@
+import json
+
+from server.benchmark.perf.run_perf import compare_results, summarize
+from server.benchmark.perf.stand_ins import FixtureStore
+
+def test_fixture_store_replays_sequences_in_order(tmp_path):
+    store = FixtureStore(tmp_path, "gemini")
+    store.append("chat", {"text": "a", "latency_s": 0.1})
+    store.append("chat", {"text": "b", "latency_s": 0.2})
+    store.put("30STG", {"latency_s": 0.3})
+
+    replayed = FixtureStore(tmp_path, "gemini")
+    assert [replayed.next("chat")["text"] for _ in range(3)] == ["a", "b", "a"]
+    assert replayed.get("30STG") == {"latency_s": 0.3}
+    assert replayed.next("generate_content") is None
+
+def test_summarize_and_compare(tmp_path):
+    summary = summarize([1.0, 2.0, 3.0, 4.0])
+    assert summary["count"] == 4 and summary["p50"] == 2.5 and summary["max"] == 4.0
+    assert summarize([]) == {"count": 0}
+
+    def save(name, request_s, sr_s):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({
+            "commit": name, "throughput_rps": 1.0, "peak_rss_mb": 100,
+            "latency": summarize([request_s]), "stages": {"sen2sr_inference": summarize([sr_s])},
+        }))
+        return str(path)
+
+    deltas = compare_results(save("base", 10.0, 4.0), save("new", 8.0, 2.0))
+    assert deltas == {"request": -0.2, "sen2sr_inference": -0.5}
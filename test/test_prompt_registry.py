@@ -0,0 +1,30 @@
+import os
+
+from server.utils.prompt_registry_utils import PromptRegistry
+
+def test_files_are_reread_only_when_changed(tmp_path):
+    registry = PromptRegistry()
+    prompt = tmp_path / "role.txt"
+    prompt.write_text("You are AgrIA.")
+    assert registry.read_text(str(prompt)) == "You are AgrIA."
+    assert registry.read_text(str(prompt)) == "You are AgrIA."
+    assert registry.stats() == {"files": 1, "hits": 1, "misses": 1}
+
+    prompt.write_text("You are AgrIA, an assistant.")
+    os.utime(prompt, ns=(1, 1))
+    assert registry.read_text(str(prompt)) == "You are AgrIA, an assistant."
+    assert registry.stats()["misses"] == 2
+
+def test_dirs_and_section_tokens(tmp_path):
+    registry = PromptRegistry()
+    examples = tmp_path / "examples"
+    examples.mkdir()
+    (examples / "a.md").write_text("a" * 8)
+    assert registry.read_dir(str(examples)) == "a" * 8
+
+    (examples / "b.md").write_text("b" * 4)
+    os.utime(examples, ns=(1, 1))
+    assert sorted(registry.read_dir(str(examples))) == sorted("a" * 8 + "b" * 4)
+
+    registry.record_sections("chat", {"role": "a" * 8, "examples": "b" * 5})
+    assert registry.sections["chat"] == {"role": 2, "examples": 2, "total": 4}
@@ -0,0 +1,65 @@
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentinelhub")
+pytest.importorskip("rasterio")
+
+from server.services.sr4s.im import get_image_bands
+
+class FakeSentinelHubRequest:
+    """Stand-in for `SentinelHubRequest`: returns a constant image per requested band and records every request."""
+    calls = []
+    empty_before = None  # time intervals ending before this date have no imagery
+
+    def __init__(self, evalscript, input_data, responses, bbox, size, config):
+        self.bands = re.findall(r"sample\.(B\d\w)", evalscript)
+        self.time_interval = input_data[0]["time_interval"]
+        self.size = size
+        FakeSentinelHubRequest.calls.append(self)
+
+    @staticmethod
+    def input_data(collection, time_interval, maxcc):
+        return {"time_interval": time_interval, "maxcc": maxcc}
+
+    @staticmethod
+    def output_response(identifier, mime_type):
+        return identifier
+
+    def get_data(self):
+        width, height = self.size
+        if self.empty_before and self.time_interval[1] >= self.empty_before:
+            image = np.zeros((height, width, len(self.bands)), dtype=np.uint8)
+        else:
+            image = np.stack([np.full((height, width), int(band[1:3]), dtype=np.uint8) for band in self.bands], axis=-1)
+        # Like Sentinel Hub, single-band evalscripts return 2D arrays
+        return [image[..., 0] if len(self.bands) == 1 else image]
+
+@pytest.fixture
+def fake_sentinel_hub(monkeypatch):
+    FakeSentinelHubRequest.calls = []
+    FakeSentinelHubRequest.empty_before = None
+    monkeypatch.setattr(get_image_bands, "SentinelHubRequest", FakeSentinelHubRequest)
+    monkeypatch.setattr(get_image_bands, "get_sh_config", lambda: SimpleNamespace(sh_base_url="http://sentinel-hub.stub"))
+    get_image_bands.request_date.set("2025-06-06")
+    return FakeSentinelHubRequest
+
+@pytest.mark.parametrize("mode, n_requests", [("multiband", 1), ("concurrent", 4), ("sequential", 4)])
+def test_download_modes_save_one_file_per_band(fake_sentinel_hub, tmp_path, mode, n_requests):
+    bands = ["B02", "B03", "B04", "B08"]
+    files = get_image_bands.download_image_bands(42.46, -2.29, (64, 64), "2025_06", bands, tmp_path, mode=mode)
+    import rasterio
+    for band, path in zip(bands, files):
+        with rasterio.open(path) as src:
+            assert band in path and int(src.read(1)[0, 0]) == int(band[1:])
+    assert len(fake_sentinel_hub.calls) == n_requests
+
+def test_concurrent_mode_shares_the_first_band_date_range(fake_sentinel_hub, tmp_path):
+    fake_sentinel_hub.empty_before = "2025-05-27"  # the first window is cloudy, the search has to go back
+    get_image_bands.download_image_bands(42.46, -2.29, (64, 64), "2025_06", ["B02", "B03", "B04", "B08"], tmp_path, mode="concurrent")
+    first_band_calls = [call for call in fake_sentinel_hub.calls if call.bands == ["B02"]]
+    other_calls = [call for call in fake_sentinel_hub.calls if call.bands != ["B02"]]
+    assert len(first_band_calls) == 2 and len(other_calls) == 3
+    assert all(call.time_interval == first_band_calls[-1].time_interval for call in other_calls)
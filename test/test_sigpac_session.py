@@ -0,0 +1,54 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from server.services.sigpac_tools_v2 import _globals
+from server.services.sigpac_tools_v2.session import RESPONSE_CACHE, get_json
+
+class StubSigpacHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    failures_left = 0
+
+    def do_GET(self):
+        StubSigpacHandler.requests_seen.append(self.path)
+        if StubSigpacHandler.failures_left > 0:
+            StubSigpacHandler.failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps([{"provincia": 26, "municipio": 2, "poligono": 1, "parcela": 1}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_sigpac(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSigpacHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(_globals, "BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    StubSigpacHandler.requests_seen = []
+    RESPONSE_CACHE.clear()
+    yield StubSigpacHandler
+    server.shutdown()
+
+def test_repeated_lookups_are_served_from_cache(stub_sigpac):
+    endpoint = "servicioconsultassigpac/query/recinfobypoint/4258/-2.29263/42.46577.json"
+    first = get_json(endpoint, cache_key=("recinfobypoint", "4258", 42.46577, -2.29263))
+    first[0]["parcela"] = 999  # callers get copies, the cached response stays intact
+    second = get_json(endpoint, cache_key=("recinfobypoint", "4258", 42.46577, -2.29263))
+    assert second[0]["parcela"] == 1
+    assert len(stub_sigpac.requests_seen) == 1
+    assert RESPONSE_CACHE.stats()["hits"] == 1
+
+def test_server_errors_are_retried(stub_sigpac):
+    stub_sigpac.failures_left = 1
+    assert get_json("servicioconsultassigpac/query/recinfoparc/26/2/0/0/1/1.geojson")[0]["provincia"] == 26
+    assert len(stub_sigpac.requests_seen) == 2
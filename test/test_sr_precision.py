@@ -0,0 +1,31 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+nn = torch.nn
+
+from server.services.sr4s.sr.precision import QuantizedConv, quantize_conv_layers
+
+def get_tiny_net():
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(4, 8, 3, padding=1), nn.ReLU(),
+        nn.Conv2d(8, 8, 3, padding=1), nn.ReLU(),
+        nn.Conv2d(8, 4, 3, padding=1),
+    ).eval()
+
+def test_int8_conv_layers_match_fp32():
+    model = get_tiny_net()
+    inputs = [torch.rand(1, 4, 32, 32) for _ in range(4)]
+    try:
+        quantized_model = quantize_conv_layers(model, inputs)
+    except RuntimeError as e:  # no x86 quantized engine on this CPU
+        pytest.skip(str(e))
+
+    wrapped = [module for module in quantized_model.modules() if isinstance(module, QuantizedConv)]
+    assert len(wrapped) == 2  # output conv stays in float32
+    assert not any(isinstance(module, QuantizedConv) for module in model.modules())  # original left untouched
+
+    with torch.no_grad():
+        expected, actual = model(inputs[0]), quantized_model(inputs[0])
+    relative_error = (actual - expected).abs().max() / expected.abs().max()
+    assert relative_error < 0.05
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from server.services.sr4s.sr.tiling import TilingConfig, get_tile_origins, get_tiling_error, tiled_super_resolve
+
+def upscale(batch):
+    # Pixel-wise stand-in for the SR model: tiling must reproduce its output exactly
+    return np.repeat(np.repeat(batch * 2.0, 2, axis=-2), 2, axis=-1)
+
+def test_tile_origins_cover_image_with_equal_tiles():
+    origins = get_tile_origins(1000, 256, 32)
+    assert origins[0] == 0 and origins[-1] + 256 == 1000
+    assert all(b - a <= 256 - 32 for a, b in zip(origins, origins[1:]))
+    assert get_tile_origins(100, 256, 32) == [0]
+
+def test_tiled_output_matches_untiled_output():
+    image = np.random.default_rng(0).random((4, 150, 97), dtype=np.float32)
+    for workers in (1, 3):
+        tiled = tiled_super_resolve(upscale, image, 2, TilingConfig(tile_size=64, overlap=16, batch_size=3, workers=workers))
+        error = get_tiling_error(tiled, upscale(image[None])[0])
+        assert error["maxAbsError"] < 1e-5 and error["withinTolerance"]
+
+def test_rcan_tiling_error_within_tolerance():
+    pytest.importorskip("torch")
+    pytest.importorskip("rasterio")
+    from server.services.sr4s.sr.L1BSR_wrapper import L1BSR
+
+    weights_path = Path("server/services/sr4s/sr/REC_Real_L1B.safetensors")
+    if not weights_path.is_file():
+        pytest.skip("L1BSR weights not downloaded")
+    engine = L1BSR(weights_path, device="cpu", tiling=TilingConfig(tile_size=128, overlap=32, batch_size=4))
+
+    # Parcel-like reflectances: smooth fields plus sensor noise
+    rng = np.random.default_rng(0)
+    fields = np.kron(rng.uniform(500, 3500, (5, 5, 4)), np.ones((64, 64, 1)))[:300, :300]
+    image = np.clip(fields + rng.normal(0, 50, fields.shape), 0, 10000).astype(np.uint16)
+
+    error = engine.tiling_error(image)
+    print(f"RCAN tiling error: {error}")
+    assert error["withinTolerance"]
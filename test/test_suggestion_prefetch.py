@@ -0,0 +1,46 @@
+import threading
+
+from types import SimpleNamespace
+
+from server.utils.suggestion_prefetch_utils import SuggestionPrefetcher
+
+def test_prefetched_suggestion_is_used_for_its_turn_and_language():
+    prefetcher = SuggestionPrefetcher(lambda session, lang: f"{session.id}-{lang}", workers=1, max_entries=10)
+    session = SimpleNamespace(id="a")
+    prefetcher.schedule(session, marker=2, lang="en")
+    prefetcher.prefetches["a"].future.result(5)  # a prefetch that hasn't started yet would be cancelled
+    assert prefetcher.get("a", marker=2, lang="en") == "a-en"
+    assert prefetcher.get("a", marker=2, lang="en") is None  # consumed
+
+    prefetcher.schedule(session, marker=4, lang="en")
+    assert prefetcher.get("a", marker=4, lang="es") is None
+    assert prefetcher.stats() == {"pending": 0, "hits": 1, "misses": 2, "cancellations": 0}
+
+def test_new_message_cancels_prefetch():
+    started, release = threading.Event(), threading.Event()
+    def generate(session, lang):
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    prefetcher = SuggestionPrefetcher(generate, workers=1, max_entries=10)
+    prefetcher.schedule(SimpleNamespace(id="a"), marker=2, lang="en")
+    started.wait(5)
+    prefetcher.cancel("a")
+    release.set()
+    assert prefetcher.get("a", marker=2, lang="en") is None
+    assert prefetcher.stats()["cancellations"] == 1
+
+def test_queued_prefetch_is_cancelled_and_slow_one_times_out():
+    release = threading.Event()
+    def generate(session, lang):
+        release.wait(5)
+        return session.id
+
+    prefetcher = SuggestionPrefetcher(generate, workers=1, max_entries=10, timeout=0.05)
+    prefetcher.schedule(SimpleNamespace(id="a"), marker=2, lang="en")  # takes the only worker
+    prefetcher.schedule(SimpleNamespace(id="b"), marker=2, lang="en")  # queued behind it
+    assert prefetcher.get("b", marker=2, lang="en") is None  # not started: cancelled, computed by the caller
+    assert prefetcher.get("a", marker=2, lang="en") is None  # running: gave up after `timeout`
+    release.set()
+    assert prefetcher.stats()["misses"] == 2
@@ -0,0 +1,51 @@
+import json
+import threading
+import pytest
+
+pytest.importorskip("google.genai")
+
+from types import SimpleNamespace
+
+from server.services import chat_service
+from server.utils.chat_session_utils import ChatSession
+
+def message(role, text):
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text)])
+
+class FakeModels:
+    """
+    Suggestion calls that summarise the number of history entries they were sent. Calls made while `slow` is set
+    wait for `release`.
+    """
+    def __init__(self):
+        self.slow = False
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def generate_content(self, model, contents, config):
+        summary = f"{contents[2].count('role')} messages"
+        if self.slow:
+            self.started.set()
+            self.release.wait(5)
+        return SimpleNamespace(text=json.dumps({"summary": summary, "suggestion": "¿Y el riego?"}), usage_metadata=None)
+
+def test_slow_prefetch_does_not_roll_back_the_summary(monkeypatch):
+    models = FakeModels()
+    monkeypatch.setattr(chat_service, "get_client", lambda: SimpleNamespace(models=models))
+    monkeypatch.setattr(chat_service, "get_session_history", lambda chat: chat.history)
+    chat = SimpleNamespace(history=[message("user", "Hola"), message("model", "Hola, agricultor.")])
+    chat.get_history = lambda: chat.history
+    session = ChatSession("a", chat)
+
+    # Prefetch for the first turn, still running when the next turn's suggestion is computed inline
+    models.slow = True
+    prefetch = threading.Thread(target=chat_service.generate_suggestion, args=(session, "es"))
+    prefetch.start()
+    models.started.wait(5)
+    models.slow = False
+    chat.history = chat.history + [message("user", "¿Qué cultivo es?"), message("model", "Olivar.")]
+    chat_service.generate_suggestion(session, "es")
+    assert session.state == {"summary": "4 messages", "summarised": 4}
+
+    models.release.set()
+    prefetch.join(5)
+    assert session.state == {"summary": "4 messages", "summarised": 4}
@@ -0,0 +1,27 @@
+from shapely.geometry import Polygon, box
+
+from server.utils.tile_index_utils import TileIndex, to_2d_polygon
+
+def make_index():
+    # 3x3 grid of 1°x1° tiles, given as 3D polygons like the KML grid
+    names, polygons = [], []
+    for x in range(3):
+        for y in range(3):
+            names.append(f"T{x}{y}")
+            polygons.append(to_2d_polygon(Polygon([(x, y, 0), (x + 1, y, 0), (x + 1, y + 1, 0), (x, y + 1, 0)])))
+    return TileIndex(names, polygons, "EPSG:4326")
+
+def test_query_returns_overlapping_tiles_only():
+    index = make_index()
+    assert index.query(box(0.2, 0.2, 0.4, 0.4)) == {"T00"}
+    assert index.query(box(0.8, 0.8, 1.2, 1.2)) == {"T00", "T01", "T10", "T11"}
+    assert index.query(box(1.0, 0.2, 1.5, 0.4)) == {"T10"}  # only touches T00
+    assert index.query(box(10, 10, 11, 11)) == set()
+
+def test_saved_index_answers_batch_queries_like_the_original(tmp_path):
+    index = make_index()
+    index.save(tmp_path / "tile_index.npz")
+    loaded = TileIndex.load(tmp_path / "tile_index.npz")
+    parcels = [box(0.2, 0.2, 0.4, 0.4), box(1.8, 2.2, 2.2, 2.4), box(5, 5, 6, 6)]
+    assert loaded.crs == "EPSG:4326"
+    assert loaded.query_many(parcels) == index.query_many(parcels) == [{"T00"}, {"T12", "T22"}, set()]
@@ -0,0 +1,54 @@
+import os
+import time
+
+from server.utils import workspace_utils
+from server.utils.workspace_utils import cleanup_expired_workspaces, create_workspace
+
+def test_workspaces_are_isolated(tmp_path):
+    ws1 = create_workspace(tmp_path / "workspaces", tmp_path)
+    ws2 = create_workspace(tmp_path / "workspaces", tmp_path)
+    assert ws1.root != ws2.root
+    assert ws1.public_path("SR_2025-06-06.png") != ws2.public_path("SR_2025-06-06.png")
+
+def test_cleanup_only_removes_expired_workspaces(tmp_path):
+    expired = create_workspace(tmp_path / "workspaces", tmp_path)
+    active = create_workspace(tmp_path / "workspaces", tmp_path)
+    published = expired.public_path("SR_2025-06-06.png")
+    published.write_bytes(b"png")
+    chat_upload = tmp_path / "field.jpg"
+    chat_upload.write_bytes(b"jpg")
+    parcel_desc = tmp_path / "parcel_desc-en.txt"
+    parcel_desc.write_text("...")
+
+    old = time.time() - 7200
+    os.utime(expired.root / ".last_used", (old, old))
+    for path in (published, chat_upload, parcel_desc):
+        os.utime(path, (old, old))
+
+    assert cleanup_expired_workspaces(3600, tmp_path / "workspaces", tmp_path) == 1
+    assert not expired.root.exists()
+    assert not published.exists()
+    assert chat_upload.exists() and parcel_desc.exists()
+    assert active.root.exists()
+
+def test_intermediates_are_discarded_after_publishing(tmp_path):
+    workspace = create_workspace(tmp_path / "workspaces", tmp_path)
+    workspace.bands_dir.mkdir()
+    (workspace.bands_dir / "B02.tif").write_bytes(b"tif")
+    published = workspace.public_path("SR_2025-06-06.png")
+    published.write_bytes(b"png")
+
+    workspace.discard_intermediates()
+    assert not workspace.bands_dir.exists()
+    assert published.exists() and (workspace.root / ".last_used").exists()
+
+def test_cleanup_is_throttled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(workspace_utils, "cleanup_expired_workspaces", lambda: calls.append(1) or 1)
+    monkeypatch.setattr(workspace_utils, "last_cleanup", 0.0)
+
+    assert workspace_utils.cleanup_expired_workspaces_throttled(60) == 1
+    assert workspace_utils.cleanup_expired_workspaces_throttled(60) == 0
+    monkeypatch.setattr(workspace_utils, "last_cleanup", time.time() - 61)
+    assert workspace_utils.cleanup_expired_workspaces_throttled(60) == 1
+    assert len(calls) == 2